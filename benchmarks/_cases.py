@@ -0,0 +1,163 @@
+from functools import lru_cache
+
+from numpy import (
+    asarray,
+    diag,
+    empty,
+    exp,
+    inf,
+    log,
+    pi,
+    random,
+    round,
+    sort,
+    sqrt,
+    sum,
+)
+from scipy.integrate import quad
+from scipy.optimize import brentq
+
+from chiscore import saddlepoint_sf
+
+KERNELS = [10, 100, 1000, 10000]
+BATCHES = [1, 100, 10000, 1000000]
+PVALUES = [0.5, 1e-2, 1e-4, 1e-6, 1e-8, 1e-10, 1e-12]
+
+# Sizes held fixed while another one varies.
+KERNEL = 100
+PVALUE = 1e-2
+# Number of statistics of a batch checked against the reference.
+CHECKED = 16
+
+
+def spectrum(k, seed=0):
+    """
+    Weights λᵢ of a mixture of k chi-squared variables.
+
+    They are drawn from a gamma distribution with shape ½, which gives the skewed
+    spectrum of a kernel of rare variants: a few large eigenvalues and many small ones.
+    """
+    lambs = random.RandomState(seed).gamma(0.5, 1.0, k)
+    return sort(lambs / lambs.sum())[::-1]
+
+
+@lru_cache(maxsize=2)
+def factor(k):
+    """
+    Factor 𝙶 of the weight matrix diag(λ) = 𝙶𝙶ᵀ of the spectrum of size k, for
+    ``factor=True``.
+
+    No factor with fewer than k columns has the k eigenvalues, so it is square; it
+    is built once per size, shared by the cases of that size.
+    """
+    G = diag(sqrt(spectrum(k)))
+    G.flags.writeable = False
+    return G
+
+
+def statistic(lambs, pvalue):
+    """Statistic 𝑞 whose saddlepoint p-value, Pr(∑λᵢχ²(1) > 𝑞), is ``pvalue``."""
+    lo, hi = 0.0, sum(lambs)
+    while saddlepoint_sf(hi, lambs) > pvalue:
+        lo, hi = hi, 2 * hi
+
+    def f(q):
+        return saddlepoint_sf(q, lambs, log=True) - log(pvalue)
+
+    return brentq(f, lo, hi, xtol=1e-14 * hi, rtol=1e-14)
+
+
+def null_sample(lambs, n, seed=0, chunk=10000):
+    """Statistics drawn from the null distribution ∑λᵢχ²(1)."""
+    rng = random.RandomState(seed)
+    q = empty(n)
+    for i in range(0, n, chunk):
+        m = len(q[i : i + chunk])
+        q[i : i + chunk] = rng.standard_normal((m, len(lambs))) ** 2 @ lambs
+    return q
+
+
+@lru_cache(maxsize=None)
+def case(kernel, pvalue):
+    """Spectrum of the given size, statistic at the given p-value, and reference."""
+    lambs = spectrum(kernel)
+    q = statistic(lambs, pvalue)
+    return lambs, q, reference_sf([q], lambs)
+
+
+@lru_cache(maxsize=None)
+def null_batch(size):
+    """
+    Spectrum, statistics drawn from the null, indices of those checked against the
+    reference, and reference.
+    """
+    lambs = spectrum(KERNEL)
+    q = null_sample(lambs, size)
+    index = round(range(0, size, max(size // CHECKED, 1))).astype(int)
+    return lambs, q, index, reference_sf(q[index], lambs)
+
+
+def reference_sf(q, lambs):
+    """
+    Pr(∑λᵢχ²(1) > 𝑞), to about ten significant digits at any depth of the tail.
+
+    The moment generating function 𝑀(𝑠) = exp(𝐾(𝑠)) is inverted along the vertical
+    line through the saddlepoint 𝑐, 𝐾′(𝑐) = 𝑞 [1]:
+
+        Pr(𝑋 > 𝑞) = exp(𝐾(𝑐) - 𝑐𝑞)/π ⋅ ∫₀^∞ Re[exp(𝐾(𝑐 + 𝑖𝑦) - 𝐾(𝑐) - 𝑖𝑦𝑞) / (𝑐 + 𝑖𝑦)] d𝑦
+
+    for 𝑐 > 0, and the same expression gives -Pr(𝑋 ≤ 𝑞) for 𝑐 < 0. The integrand
+    has the magnitude of the probability itself, so, unlike Imhof's formula, no
+    digits are lost to cancellation in the tail.
+
+    [1] Helstrom, C. W. (1983). Comment: Distribution of quadratic forms in normal
+        random variables—evaluation by numerical integration. SIAM Journal on
+        Scientific and Statistical Computing, 4(2), 353-356.
+    """
+    return asarray([_reference_sf(qi, asarray(lambs, float)) for qi in asarray(q)])
+
+
+def _reference_sf(q, lambs):
+    def k1(s):
+        return sum(lambs / (1 - 2 * lambs * s))
+
+    lmax = lambs.max()
+    k2 = 2 * sum(lambs ** 2)
+    if q > k1(0):
+        hi = 1 / (2 * lmax)
+        c = brentq(lambda s: k1(s) - q, 0, hi * (1 - 1e-12), xtol=1e-300)
+    else:
+        c = brentq(lambda s: k1(s) - q, -1e3 / lmax, 0, xtol=1e-300)
+    # Away from the pole of 1/s at the origin.
+    if abs(c) * sqrt(k2) < 0.1:
+        c = (0.1 if q > k1(0) else -0.1) / sqrt(k2)
+
+    kc = -sum(log(1 - 2 * lambs * c)) / 2
+    scale = 1 / sqrt(2 * sum(lambs ** 2 / (1 - 2 * lambs * c) ** 2))
+
+    def amplitude(u):
+        s = c + 1j * u * scale
+        k = -sum(log(1 - 2 * lambs * s)) / 2
+        return exp(k - kc) / s * scale
+
+    # The integrand, Re[amplitude(u)⋅exp(-iωu)], is Gaussian-like over the first
+    # few units of u, then decays algebraically while it oscillates: the tail is
+    # integrated as a Fourier integral.
+    w = scale * q
+
+    def integrand(u):
+        return (amplitude(u) * exp(-1j * w * u)).real
+
+    value = quad(integrand, 0, 5, epsrel=1e-12)[0]
+    tol = 1e-13 * abs(value)
+    for part, weight in [("real", "cos"), ("imag", "sin")]:
+
+        def f(u):
+            return getattr(amplitude(u), part)
+
+        value += quad(f, 5, inf, weight=weight, wvar=w, epsabs=tol)[0]
+
+    value *= exp(kc - c * q) / pi
+    if c > 0:
+        return value
+    return 1 + value
@@ -0,0 +1,92 @@
+import json
+import platform
+import time
+
+import pytest
+from numpy import abs, asarray, errstate, isnan, median, where
+
+_RESULTS = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("chiscore benchmarks")
+    group.addoption(
+        "--bench-json", default=None, help="write the benchmark results to this file"
+    )
+    group.addoption(
+        "--bench-min-time",
+        type=float,
+        default=0.5,
+        help="seconds spent repeating each benchmark (default: %(default)s)",
+    )
+
+
+@pytest.fixture
+def bench(request):
+    """
+    Times a function and compares its p-values with a reference.
+
+    ``bench(func, reference, index=slice(None), **params)`` calls ``func()`` until
+    ``--bench-min-time`` seconds have passed, and at least once. The p-values it
+    returns, selected by ``index``, are compared with ``reference``. ``params``
+    describe the case in the report.
+    """
+    min_time = request.config.getoption("--bench-min-time", 0.5)
+
+    def run(func, reference, index=slice(None), **params):
+        times = []
+        while len(times) == 0 or sum(times) < min_time and len(times) < 100:
+            start = time.perf_counter()
+            pvals = func()
+            times.append(time.perf_counter() - start)
+
+        pvals = asarray(pvals, float).ravel()[index]
+        reference = asarray(reference, float).ravel()
+        err = abs(pvals - reference)
+        with errstate(divide="ignore", invalid="ignore"):
+            rel = where(reference > 0, err / reference, err)
+        rel = where(isnan(rel), float("inf"), rel)
+
+        result = {
+            "test": request.node.nodeid,
+            "params": params,
+            "rounds": len(times),
+            "min": min(times),
+            "median": float(median(times)),
+            "max_abs_err": float(err.max()),
+            "max_rel_err": float(rel.max()),
+        }
+        _RESULTS.append(result)
+        return result
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if len(_RESULTS) == 0:
+        return
+
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(
+        "{:<60} {:>12} {:>12} {:>12}".format("test", "min (s)", "abs err", "rel err")
+    )
+    for r in _RESULTS:
+        terminalreporter.write_line(
+            "{:<60} {:>12.4g} {:>12.3g} {:>12.3g}".format(
+                r["test"].split("::")[-1], r["min"], r["max_abs_err"], r["max_rel_err"]
+            )
+        )
+
+    path = config.getoption("--bench-json", None)
+    if path is not None:
+        import chiscore
+
+        report = {
+            "chiscore": chiscore.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": _RESULTS,
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        terminalreporter.write_line("benchmark results written to {}".format(path))
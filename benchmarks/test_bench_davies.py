@@ -0,0 +1,84 @@
+import pytest
+from _cases import (
+    BATCHES,
+    KERNEL,
+    KERNELS,
+    PVALUE,
+    PVALUES,
+    case,
+    factor,
+    null_batch,
+)
+from numpy import full, load
+
+from chiscore import davies_pvalue_batch
+from chiscore._data import data_file
+
+pytestmark = pytest.mark.bench
+
+METHODS = [
+    ("davies", "chi2comb"),
+    ("davies", "numpy"),
+    ("saddlepoint", "chi2comb"),
+    ("auto", "chi2comb"),
+]
+
+
+@pytest.mark.parametrize("backend", ["chi2comb", "numpy"])
+@pytest.mark.parametrize("kernel", KERNELS)
+def test_davies_kernel(bench, kernel, backend):
+    lambs, q, ref = case(kernel, PVALUE)
+    G = factor(kernel)
+
+    def func():
+        return davies_pvalue_batch(q, G, factor=True, backend=backend)
+
+    bench(func, ref, kernel=kernel, backend=backend)
+
+
+@pytest.mark.parametrize("kernel", KERNELS[2:])
+def test_davies_kernel_truncated(bench, kernel):
+    lambs, q, ref = case(kernel, PVALUE)
+    G = factor(kernel)
+
+    def func():
+        return davies_pvalue_batch(q, G, factor=True, k=50, tol=1e-3)
+
+    bench(func, ref, kernel=kernel, k=50, tol=1e-3)
+
+
+@pytest.mark.parametrize("method,backend", METHODS)
+@pytest.mark.parametrize("batch", BATCHES)
+def test_davies_batch(bench, batch, method, backend):
+    lambs, q, index, ref = null_batch(batch)
+    G = factor(KERNEL)
+
+    def func():
+        return davies_pvalue_batch(q, G, factor=True, backend=backend, method=method)
+
+    bench(func, ref, index, batch=batch, method=method, backend=backend)
+
+
+@pytest.mark.parametrize("method,backend", METHODS)
+@pytest.mark.parametrize("pvalue", PVALUES)
+def test_davies_tail(bench, pvalue, method, backend):
+    lambs, q, ref = case(KERNEL, pvalue)
+    G = factor(KERNEL)
+
+    def func():
+        return davies_pvalue_batch(q, G, factor=True, backend=backend, method=method)
+
+    bench(func, ref, pvalue=pvalue, method=method, backend=backend)
+
+
+@pytest.mark.parametrize("method,backend", METHODS)
+def test_davies_fixture(bench, method, backend):
+    with data_file("davies_pvalue.npz") as filepath:
+        data = load(filepath, allow_pickle=True)
+        q, w = data["args"]
+        ref = full(1, data["pval"])
+
+    def func():
+        return davies_pvalue_batch(q, w, backend=backend, method=method)
+
+    bench(func, ref, fixture="davies_pvalue.npz", method=method, backend=backend)
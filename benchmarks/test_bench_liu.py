@@ -0,0 +1,40 @@
+import pytest
+from _cases import (
+    BATCHES,
+    KERNEL,
+    KERNELS,
+    PVALUE,
+    PVALUES,
+    case,
+    null_batch,
+)
+from numpy import ones, zeros
+
+from chiscore import liu_sf
+
+pytestmark = pytest.mark.bench
+
+
+def _liu(q, lambs):
+    def func():
+        return liu_sf(q, lambs, ones(len(lambs)), zeros(len(lambs)))[0]
+
+    return func
+
+
+@pytest.mark.parametrize("kernel", KERNELS)
+def test_liu_kernel(bench, kernel):
+    lambs, q, ref = case(kernel, PVALUE)
+    bench(_liu(q, lambs), ref, kernel=kernel)
+
+
+@pytest.mark.parametrize("batch", BATCHES)
+def test_liu_batch(bench, batch):
+    lambs, q, index, ref = null_batch(batch)
+    bench(_liu(q, lambs), ref, index, batch=batch)
+
+
+@pytest.mark.parametrize("pvalue", PVALUES)
+def test_liu_tail(bench, pvalue):
+    lambs, q, ref = case(KERNEL, pvalue)
+    bench(_liu(q, lambs), ref, pvalue=pvalue)
@@ -0,0 +1,77 @@
+import pytest
+from numpy import full, load, tile
+
+from chiscore import (
+    optimal_davies_pvalue,
+    optimal_davies_pvalue_batch,
+    optimal_davies_pvalue_many,
+)
+from chiscore._data import data_file
+
+pytestmark = pytest.mark.bench
+
+# Parameters of the optimal test held by the fixtures, in the order of the arguments
+# of optimal_davies_pvalue.
+KEYS = ["qmin", "MuQ", "VarQ", "KerQ", "eigh", "vareta", "Df", "tau_rho", "rho_list"]
+# Their reference p-values range from about 0.95 down to 1e-231.
+FIXTURES = [
+    "optimal_davies_pvalue.npz",
+    "danilo_nan.npz",
+    "bound.npz",
+    "inf.npz",
+]
+OPTIONS = {
+    "default": {},
+    "gk": {"integrator": "gk"},
+    "table": {"table": True},
+    "saddlepoint": {"method": "saddlepoint"},
+    "auto": {"method": "auto"},
+    "numpy": {"backend": "numpy"},
+}
+PROBLEMS = [1, 16, 256]
+ROWS = [1, 16, 256, 4096]
+
+
+def _fixture(name):
+    # Arguments of optimal_davies_pvalue, and the reference p-value.
+    with data_file(name) as filepath:
+        data = load(filepath, allow_pickle=True)
+        if "args" in data.files:
+            return list(data["args"]), data["pval"]
+        return [data[k] for k in KEYS], data["pvalue"]
+
+
+@pytest.mark.parametrize("name", OPTIONS)
+@pytest.mark.parametrize("fixture", FIXTURES)
+def test_optimal_fixture(bench, fixture, name):
+    args, ref = _fixture(fixture)
+    options = OPTIONS[name]
+
+    def func():
+        return optimal_davies_pvalue(*args, **options)
+
+    bench(func, full(1, ref), fixture=fixture, **options)
+
+
+@pytest.mark.parametrize("problems", PROBLEMS)
+def test_optimal_many(bench, problems):
+    cases = [_fixture(f) for f in FIXTURES[1:]]
+    cases = [cases[i % len(cases)] for i in range(problems)]
+    params = [list(p) for p in zip(*[args for args, _ in cases])]
+
+    def func():
+        return optimal_davies_pvalue_many(*params)
+
+    bench(func, [ref for _, ref in cases], problems=problems)
+
+
+@pytest.mark.parametrize("rows", ROWS)
+def test_optimal_batch(bench, rows):
+    # Rows of the same statistics, as many permutations would give.
+    args, ref = _fixture("bound.npz")
+    q = tile(args[0], (rows, 1))
+
+    def func():
+        return optimal_davies_pvalue_batch(q, *args[1:])
+
+    bench(func, full(rows, ref), rows=rows)
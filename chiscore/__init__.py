@@ -5,11 +5,25 @@ Chiscore package
 Estimate the joint significance of test statistics derived from linear combination
 of chi-squared distributions.
 
+Classes
+-------
+ChiSquaredMixture
+
 Functions
 ---------
+cache
 davies_pvalue
+davies_pvalue_batch
+iter_pvalues
 optimal_davies_pvalue
+optimal_davies_pvalue_batch
+optimal_davies_pvalue_many
+optimal_score_pvalue
 liu_sf
+montecarlo_optimal_pvalue
+montecarlo_sf
+profile
+saddlepoint_sf
 
 References
 ----------
@@ -19,11 +33,39 @@ References
 [2] Lee, Seunggeun, Michael C. Wu, and Xihong Lin. "Optimal tests for rare variant
     effects in sequencing association studies." Biostatistics 13.4 (2012): 762-775.
 """
-from ._davies import davies_pvalue
+from ._cache import cache
+from ._davies import davies_pvalue, davies_pvalue_batch
 from ._liu import liu_sf
-from ._optimal import optimal_davies_pvalue
+from ._mixture import ChiSquaredMixture
+from ._montecarlo import montecarlo_optimal_pvalue, montecarlo_sf
+from ._optimal import (
+    optimal_davies_pvalue,
+    optimal_davies_pvalue_batch,
+    optimal_davies_pvalue_many,
+)
+from ._profile import profile
+from ._saddlepoint import saddlepoint_sf
+from ._score import optimal_score_pvalue
+from ._stream import iter_pvalues
 from ._testit import test
 
 __version__ = "0.2.2"
 
-__all__ = ["__version__", "davies_pvalue", "liu_sf", "optimal_davies_pvalue", "test"]
+__all__ = [
+    "ChiSquaredMixture",
+    "__version__",
+    "cache",
+    "davies_pvalue",
+    "davies_pvalue_batch",
+    "iter_pvalues",
+    "liu_sf",
+    "montecarlo_optimal_pvalue",
+    "montecarlo_sf",
+    "optimal_davies_pvalue",
+    "optimal_davies_pvalue_batch",
+    "optimal_davies_pvalue_many",
+    "optimal_score_pvalue",
+    "profile",
+    "saddlepoint_sf",
+    "test",
+]
@@ -0,0 +1,207 @@
+import os
+import re
+import time
+from contextlib import contextmanager
+from hashlib import sha256
+from tempfile import mkstemp
+
+import numpy as np
+
+from ._profile import _count
+
+# Caches of the cache() contexts being entered; the innermost one is used.
+_active = []
+# Rows of an array hashed at a time, so that memory maps are read in blocks.
+_BLOCK = 1024
+# Hexadecimal digest ending the name of an entry.
+_HASH = re.compile("[0-9a-f]{64}")
+# Seconds after which a temporary file is taken as left by a writer that died.
+_STALE = 3600
+
+
+@contextmanager
+def cache(path, max_size=2 ** 30):
+    """
+    Cache the computations on the null distributions in a directory.
+
+    Inside the context, the spectra of weight matrices and of their factors, the
+    parameters derived from the covariance by :func:`optimal_score_pvalue`, and the
+    upper bound and cdf table of the integral of :func:`optimal_davies_pvalue` are
+    looked up in ``path`` before being computed, and saved there after. Entries are
+    keyed by a SHA-256 hash of the content of their inputs, and stored as ``.npy``
+    files, memory-mapped when read, or ``.npz`` files.
+
+    Files are written under a temporary name and renamed, so that the directory can
+    be shared by processes and, through a shared file system, by nodes. Reading an
+    entry updates its modification time; once the entries exceed ``max_size``
+    bytes, the least recently used ones are removed. Worker processes of
+    :func:`optimal_davies_pvalue_many` use the same directory.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the cache, created if missing.
+    max_size : int, optional
+        Size in bytes above which entries are removed. Defaults to ``2 ** 30``.
+
+    Returns
+    -------
+    Cache
+        The cache.
+
+    Example
+    -------
+
+    .. doctest::
+
+        >>> from tempfile import mkdtemp
+        >>> from chiscore import cache, davies_pvalue_batch
+        >>>
+        >>> w = [[0.5, 0.1], [0.1, 0.4]]
+        >>> with cache(mkdtemp()):
+        ...     pvals = davies_pvalue_batch([1.0, 3.0], w)
+        ...     pvals = davies_pvalue_batch([2.0], w)
+    """
+    store = Cache(path, max_size)
+    _active.append(store)
+    try:
+        yield store
+    finally:
+        _active.remove(store)
+
+
+class Cache(object):
+    """
+    Directory of cached arrays, used by :func:`cache`.
+
+    Attributes
+    ----------
+    path : str
+        Directory of the entries.
+    max_size : int
+        Size in bytes above which entries are removed.
+    """
+
+    def __init__(self, path, max_size=2 ** 30):
+        os.makedirs(path, exist_ok=True)
+        self.path = os.fspath(path)
+        self.max_size = int(max_size)
+
+    def load(self, name):
+        # Array, memory-mapped, or dict of arrays saved under `name`, or None.
+        for suffix in [".npy", ".npz"]:
+            filepath = os.path.join(self.path, name + suffix)
+            try:
+                if suffix == ".npy":
+                    value = np.load(filepath, mmap_mode="r").view(np.ndarray)
+                else:
+                    with np.load(filepath) as data:
+                        value = dict(data)
+            except (OSError, ValueError, EOFError):
+                continue
+            try:
+                os.utime(filepath)
+            except OSError:
+                pass
+            return value
+        return None
+
+    def save(self, name, value):
+        # The entry is written to a temporary file of the same directory, then
+        # renamed over its name, which readers see either whole or not at all.
+        # Concurrent writers of an entry write the same content.
+        suffix = ".npz" if isinstance(value, dict) else ".npy"
+        fd, tmp = mkstemp(".tmp", "." + name, self.path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(value, dict):
+                    np.savez(f, **value)
+                else:
+                    np.save(f, value)
+            os.replace(tmp, os.path.join(self.path, name + suffix))
+        except OSError:
+            _remove(tmp)
+            return
+        self.evict()
+
+    def evict(self):
+        # Least recently used entries first, until the others fit in max_size.
+        # Temporary files are being written by other processes, unless stale.
+        entries = []
+        now = time.time()
+        for entry in _entries(self.path):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith(".tmp"):
+                if now - stat.st_mtime > _STALE:
+                    _remove(entry.path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(e[1] for e in entries)
+        for _, nbytes, filepath in sorted(entries):
+            if size <= self.max_size:
+                break
+            _remove(filepath)
+            size -= nbytes
+
+    def clear(self):
+        for entry in _entries(self.path):
+            _remove(entry.path)
+
+
+def _cached(name, compute, *parts):
+    # Result of compute(), an array or a dict of arrays, taken from the innermost
+    # active cache under the hash of `parts` if it is there.
+    if not _active:
+        return compute()
+    store = _active[-1]
+    key = "{}-{}".format(name, _hash(parts))
+    value = store.load(key)
+    if value is not None:
+        _count("cache_hit")
+        return value
+    _count("cache_miss")
+    value = compute()
+    store.save(key, value)
+    return value
+
+
+def _hash(parts):
+    h = sha256()
+    for part in parts:
+        if part is None or isinstance(part, str):
+            h.update(repr(part).encode())
+        else:
+            a = np.asarray(part)
+            h.update("{}{}".format(a.dtype.str, a.shape).encode())
+            if a.ndim == 0:
+                h.update(a.tobytes())
+            else:
+                for i in range(0, len(a), _BLOCK):
+                    h.update(np.ascontiguousarray(a[i : i + _BLOCK]).data)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _entries(path):
+    # Files of the directory written by the cache, entries or temporary files, and
+    # no others.
+    with os.scandir(path) as it:
+        for entry in it:
+            name, suffix = os.path.splitext(entry.name)
+            if suffix in [".npy", ".npz"]:
+                ours = _HASH.fullmatch(name.rpartition("-")[2]) is not None
+            else:
+                ours = suffix == ".tmp" and name.startswith(".")
+            if ours and entry.is_file():
+                yield entry
+
+
+def _remove(filepath):
+    # Another process may have removed it first.
+    try:
+        os.remove(filepath)
+    except OSError:
+        pass
@@ -0,0 +1,249 @@
+import argparse
+import os
+
+from numpy import asarray, load, ndim, stack
+
+# Keys of the optimal-test parameters, as in the .npz files of chiscore._data, in
+# the order of the arguments of optimal_davies_pvalue.
+_OPTIMAL_KEYS = [
+    "qmin",
+    "MuQ",
+    "VarQ",
+    "KerQ",
+    "eigh",
+    "vareta",
+    "Df",
+    "tau_rho",
+    "rho_list",
+]
+# Optional key of the smallest p-value, pmin, of the tests.
+_PMIN_KEY = "T"
+
+
+def main(argv=None):
+    """
+    Command-line scan driver, run by ``python -m chiscore``.
+
+    ``davies`` computes the p-values of statistics sharing one weight matrix, and
+    ``optimal`` the p-values of independent optimal tests. Inputs are memory-mapped
+    and processed in chunks, whose results are appended to a tab-separated output
+    file. Running the same command again resumes after the last complete row. With
+    ``--cache``, the computations on the null distributions are cached in a
+    directory, as by :func:`cache`.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command-line arguments. Defaults to ``None``, reading them from
+        :data:`sys.argv`.
+
+    Returns
+    -------
+    int
+        Exit code: ``0`` for success.
+    """
+    from ._cache import cache
+
+    args = _parser().parse_args(argv)
+    command = _davies if args.command == "davies" else _optimal
+    if args.cache is None:
+        return command(args)
+    with cache(args.cache, args.cache_size):
+        return command(args)
+
+
+def _parser():
+    from ._davies import _BACKENDS, _METHODS
+    from ._optimal import _INTEGRATORS
+
+    parser = argparse.ArgumentParser(
+        prog="python -m chiscore",
+        description="Joint significance of statistics derived from chi-squared "
+        "distributions.",
+    )
+    sub = parser.add_subparsers(dest="command")
+    sub.required = True
+
+    p = sub.add_parser("davies", help="statistics sharing one weight matrix")
+    p.add_argument("stats", help=".npy vector of statistics, or .npz with key q")
+    p.add_argument("weights", help=".npy weight matrix, or its factor with --factor")
+    p.add_argument("--factor", action="store_true", help="weights are a factor 𝙶")
+    p.add_argument("--method", default="davies", choices=_METHODS)
+    p.add_argument("--backend", default="chi2comb", choices=_BACKENDS)
+    p.add_argument("--threshold", type=float, default=1e-3)
+    _common(p, 100000)
+
+    p = sub.add_parser("optimal", help="independent optimal tests")
+    p.add_argument(
+        "params",
+        help=".npz file or directory of .npy files holding the parameters stacked "
+        "along their first axis, or directory of .npz files with one test each",
+    )
+    p.add_argument("--method", default="davies", choices=_METHODS)
+    p.add_argument("--backend", default="chi2comb", choices=_BACKENDS)
+    p.add_argument("--integrator", default="quad", choices=_INTEGRATORS)
+    p.add_argument("--table", action="store_true", help="interpolate a cdf table")
+    p.add_argument("--threshold", type=float, default=1e-3)
+    _common(p, 1000)
+    return parser
+
+
+def _common(parser, chunk_size):
+    parser.add_argument(
+        "--rtol", type=float, default=None, help="relative accuracy of the p-values"
+    )
+    parser.add_argument("-o", "--output", required=True, help="output .tsv file")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=chunk_size,
+        help="number of tests read and written at a time (default: %(default)s)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="pool size")
+    parser.add_argument("--cache", default=None, help="cache directory")
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=2 ** 30,
+        help="cache size in bytes (default: %(default)s)",
+    )
+
+
+def _davies(args):
+    from ._mixture import ChiSquaredMixture
+
+    q = _load(args.stats)
+    if isinstance(q, dict):
+        q = q["q"]
+    null = ChiSquaredMixture(
+        load(args.weights, mmap_mode="r"),
+        args.factor,
+        backend=args.backend,
+        workers=args.workers,
+    )
+
+    with _Output(args.output, ["index", "p_value", "status"]) as out:
+        for start in range(out.done, len(q), args.chunk_size):
+            chunk = asarray(q[start : start + args.chunk_size], float)
+            pvals, info = null.sf(
+                chunk,
+                return_info=True,
+                method=args.method,
+                threshold=args.threshold,
+                rtol=args.rtol,
+            )
+            status = _status(args.method, info)
+            rows = zip(range(start, start + len(chunk)), pvals, status)
+            out.write(rows)
+    return 0
+
+
+def _status(method, info):
+    status = info.get("tier", [method] * len(info["p_value"]))
+    return ["liu" if c == 0 else s for s, c in zip(status, info["is_converge"])]
+
+
+def _optimal(args):
+    from ._optimal import optimal_davies_pvalue_many
+
+    names, read = _optimal_params(args.params)
+    with _Output(args.output, ["index", "p_value", "status"]) as out:
+        for start in range(out.done, len(names), args.chunk_size):
+            stop = min(start + args.chunk_size, len(names))
+            *params, pmin = read(start, stop)
+            pvals, info = optimal_davies_pvalue_many(
+                *params,
+                pmin=pmin,
+                backend=args.backend,
+                integrator=args.integrator,
+                table=args.table,
+                method=args.method,
+                threshold=args.threshold,
+                processes=args.workers,
+                return_info=True,
+                rtol=args.rtol,
+            )
+            out.write(zip(names[start:stop], pvals, info["status"]))
+    return 0
+
+
+def _optimal_params(path):
+    # Names of the tests, and a function reading the parameters of a range of them:
+    # one list per parameter, with one entry per test, followed by pmin, which is None
+    # where the files have no key T.
+    if os.path.isdir(path):
+        files = sorted(f for f in os.listdir(path) if f.endswith(".npz"))
+        if not os.path.exists(os.path.join(path, "qmin.npy")) and len(files) > 0:
+
+            def read_files(start, stop):
+                params = [[] for _ in _OPTIMAL_KEYS]
+                pmin = []
+                for f in files[start:stop]:
+                    with load(os.path.join(path, f)) as data:
+                        for p, k in zip(params, _OPTIMAL_KEYS):
+                            p.append(data[k])
+                        pmin.append(
+                            data[_PMIN_KEY] if _PMIN_KEY in data.files else None
+                        )
+                return params + [pmin]
+
+            return [f[:-4] for f in files], read_files
+
+    data = _load(path)
+    keys = [k for k in _OPTIMAL_KEYS + [_PMIN_KEY] if k in data]
+    if ndim(data["MuQ"]) == 0:
+        data = {k: stack([data[k]]) for k in keys}
+
+    def read(start, stop):
+        params = [list(asarray(data[k][start:stop])) for k in _OPTIMAL_KEYS]
+        if _PMIN_KEY in data:
+            return params + [list(asarray(data[_PMIN_KEY][start:stop]))]
+        return params + [None]
+
+    return list(range(len(data["MuQ"]))), read
+
+
+def _load(path):
+    # .npy files are memory-mapped. The members of a .npz file cannot be, and are
+    # read whole.
+    if os.path.isdir(path):
+        files = [f for f in os.listdir(path) if f.endswith(".npy")]
+        return {f[:-4]: load(os.path.join(path, f), mmap_mode="r") for f in files}
+    data = load(path, mmap_mode="r")
+    if hasattr(data, "files"):
+        return {k: data[k] for k in data.files}
+    return data
+
+
+class _Output(object):
+    # Tab-separated output, appended to. A row is written only once its whole chunk
+    # is done, and a partial last line, left by an interrupted run, is discarded.
+
+    def __init__(self, path, header):
+        self._path = path
+        self._header = header
+        self.done = 0
+
+    def __enter__(self):
+        if os.path.exists(self._path):
+            nlines, end = 0, 0
+            with open(self._path, "rb+") as f:
+                for block in iter(lambda: f.read(2 ** 20), b""):
+                    if b"\n" in block:
+                        end = f.tell() - len(block) + block.rfind(b"\n") + 1
+                    nlines += block.count(b"\n")
+                f.truncate(end)
+            self.done = max(nlines - 1, 0)
+        self._file = open(self._path, "a")
+        if self._file.tell() == 0:
+            self._file.write("\t".join(self._header) + "\n")
+        return self
+
+    def write(self, rows):
+        lines = ["{}\t{!r}\t{}\n".format(i, float(p), s) for i, p, s in rows]
+        self._file.write("".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def __exit__(self, *_):
+        self._file.close()
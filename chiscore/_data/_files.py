@@ -1,6 +1,4 @@
-import shutil
-import tempfile
-import warnings
+from contextlib import ExitStack
 from os.path import dirname, join, realpath
 
 _filenames = [
@@ -14,8 +12,6 @@ _filenames = [
 
 class data_file(object):
     def __init__(self, filenames):
-        global _filenames
-
         self._unlist = False
         if not isinstance(filenames, (tuple, list)):
             filenames = [filenames]
@@ -29,32 +25,27 @@ class data_file(object):
                     )
                 )
 
-        self._dirpath = tempfile.mkdtemp()
         self._filenames = filenames
+        self._stack = ExitStack()
 
     def __enter__(self):
-        import pkg_resources
-
-        filepaths = [join(self._dirpath, fn) for fn in self._filenames]
-
-        for fn, fp in zip(self._filenames, filepaths):
-            if __name__ == "__main__":
-                shutil.copy(join(dirname(realpath(__file__)), fn), fp)
-            else:
-                resource_path = "_data/{}".format(fn)
-                content = pkg_resources.resource_string(
-                    __name__.split(".")[0], resource_path
-                )
-
-                with open(fp, "wb") as f:
-                    f.write(content)
+        # The files are read in place. Only a package imported from an archive has
+        # them extracted, by importlib.resources, for as long as the context lasts.
+        try:
+            from importlib.resources import as_file, files
+        except ImportError:
+            here = dirname(realpath(__file__))
+            filepaths = [join(here, fn) for fn in self._filenames]
+        else:
+            root = files(__name__.rsplit(".", 1)[0])
+            filepaths = [
+                str(self._stack.enter_context(as_file(root.joinpath(fn))))
+                for fn in self._filenames
+            ]
 
         if self._unlist:
             return filepaths[0]
         return filepaths
 
     def __exit__(self, *_):
-        try:
-            shutil.rmtree(self._dirpath)
-        except PermissionError as e:
-            warnings.warn(str(e) + "\n. I will ignore it and proceed.")
+        self._stack.close()
@@ -1,13 +1,67 @@
 import sys
+from os import cpu_count
 
 import numpy as np
-from chi2comb import ChiSquared, chi2comb_cdf
-from numpy import asarray, atleast_1d, clip, finfo, mean, sqrt, where, zeros
-from numpy.linalg import eigvalsh
-from scipy.stats import chi2
-
-
-def davies_pvalue(q, w, return_info=False):
+from numpy import (
+    arange,
+    array_split,
+    asarray,
+    atleast_1d,
+    clip,
+    concatenate,
+    count_nonzero,
+    errstate,
+    exp,
+    finfo,
+    flatnonzero,
+    floor,
+    full,
+    log,
+    log10,
+    mean,
+    minimum,
+    ones,
+    sqrt,
+    unique,
+    where,
+    zeros,
+)
+
+from . import _cache
+from ._profile import _count, _start, _stop
+from ._qf import qf
+from ._saddlepoint import _saddlepoint_logsf
+
+_BACKENDS = ["chi2comb", "numpy"]
+_METHODS = ["davies", "saddlepoint", "auto"]
+# Relative difference between the Liu and saddlepoint p-values up to which
+# method="auto" trusts the former.
+_AGREEMENT = 0.1
+# Factor above the threshold up to which method="auto" checks Liu's p-values against
+# the saddlepoint approximation.
+_NEAR = 10
+# Rows of a matrix cast to float64 at a time by the blocked computations.
+_BLOCK = 1024
+# Range of the absolute tolerances derived from a relative one.
+_ATOL_RANGE = (1e-14, 1e-3)
+# Davies' auxiliary integration takes about 3/√atol terms. The limit on the number of
+# terms is ten times 1/√atol, 10000 at the default tolerance, and never less.
+_LIM = 10000
+
+
+def davies_pvalue(
+    q,
+    w,
+    return_info=False,
+    factor=False,
+    k=None,
+    tol=None,
+    backend="chi2comb",
+    method="davies",
+    threshold=1e-3,
+    workers=None,
+    rtol=None,
+):
     """
     Joint significance of statistics derived from chi2-squared distributions.
 
@@ -16,28 +70,211 @@ def davies_pvalue(q, w, return_info=False):
     q : float
         Test statistics.
     w : array_like
-        Weights of the linear combination.
+        Weights of the linear combination. Floating-point arrays, such as ``float32``
+        ones or memory maps, are read in place: the whole spectrum of an 𝑛×𝑛 matrix
+        needs a single 𝑛×𝑛 ``float64`` copy, which the eigendecomposition overwrites.
+    factor : bool, optional
+        ``True`` if ``w`` is a factor 𝙶 of the weights, 𝙶𝙶ᵀ. The spectrum is then
+        computed from the smaller of 𝙶ᵀ𝙶 and 𝙶𝙶ᵀ, accumulated in ``float64`` over
+        blocks of 𝙶, so that 𝙶 itself is never copied. Defaults to ``False``.
+    k : int, optional
+        Number of leading eigenvalues to compute. The remaining ones are replaced by a
+        single scaled chi-squared variable that matches their exact mean and variance,
+        obtained from traces. Besides ``w``, it takes one ``float64`` copy of ``w`` if
+        it has another type, and blocks of 1024 of its rows. Defaults to ``None``,
+        computing the whole spectrum.
+    tol : float, optional
+        Maximum fraction of the variance left to the remainder term. The number of
+        eigenvalues is doubled, starting from ``k``, until it is met. Defaults to
+        ``None``.
+    backend : str, optional
+        Implementation of Davies' method: ``"chi2comb"`` evaluates the statistics one
+        at a time through the chi2comb library, ``"numpy"`` evaluates all of them at
+        once on a shared integration grid. Defaults to ``"chi2comb"``.
+    method : str, optional
+        ``"davies"`` for Davies' method with Liu fallback. ``"saddlepoint"`` for the
+        saddlepoint approximation of :func:`saddlepoint_sf`, whose relative error
+        stays small in the extreme tail, where Davies' method is limited by its
+        absolute accuracy. ``"auto"`` screens with Liu's approximation and runs
+        Davies' method only where it gives a p-value below ``threshold``, or less
+        than ten times above it and disagrees with the saddlepoint approximation.
+        Defaults to ``"davies"``.
+    threshold : float, optional
+        P-values from the screening of ``method="auto"`` below which Davies' method is
+        run. Defaults to ``1e-3``.
+    workers : int, Executor, optional
+        Number of threads over which the statistics are split for Davies' method, or
+        an executor, of threads or processes, to run them on, in one chunk per
+        worker. The chi2comb library releases the GIL while it integrates. Defaults
+        to ``None``, evaluating them in the calling thread.
+    rtol : float, optional
+        Relative accuracy targeted for the p-values of Davies' method, such as
+        ``1e-3`` for about three significant digits. Each statistic gets an absolute
+        tolerance of ``rtol`` times its Liu p-value, rounded down to a power of ten,
+        and is evaluated again with a tighter one where its p-value turns out to be
+        smaller. Large p-values are thus computed with loose tolerances, and small
+        ones with tolerances tighter than the default. Defaults to ``None``, a fixed
+        absolute tolerance of ``1e-6``.
 
     Returns
     -------
     float
         Estimated p-value.
     """
-
-    q = asarray(atleast_1d(q), float)
-    w = asarray(w, float)
-    maxq = q.max()
-    if maxq > 0:
-        q = q / maxq
-        w = w / maxq
-
-    re = _pvalue_lambda(_lambda(w), q)
+    re = _davies_pvalue(q, w, factor, k, tol, backend, method, threshold, workers, rtol)
     if return_info:
         return re["p_value"][0], re
     return re["p_value"][0]
 
 
-def _pvalue_lambda(lambda_, Q):
+def davies_pvalue_batch(
+    q,
+    w,
+    return_info=False,
+    factor=False,
+    k=None,
+    tol=None,
+    backend="chi2comb",
+    method="davies",
+    threshold=1e-3,
+    workers=None,
+    rtol=None,
+):
+    """
+    Joint significance of many statistics sharing the same weights.
+
+    The eigendecomposition of ``w`` is computed once and reused for every statistic.
+
+    Parameters
+    ----------
+    q : array_like
+        Test statistics.
+    w : array_like
+        Weights of the linear combination, read in place if it is a floating-point
+        array; see :func:`davies_pvalue`.
+    return_info : bool, optional
+        ``True`` to also return the Liu p-values and the convergence flags. Defaults
+        to ``False``.
+    factor : bool, optional
+        ``True`` if ``w`` is a factor 𝙶 of the weights, 𝙶𝙶ᵀ. Defaults to ``False``.
+    k : int, optional
+        Number of leading eigenvalues to compute; see :func:`davies_pvalue`.
+        Defaults to ``None``.
+    tol : float, optional
+        Maximum fraction of the variance left to the remainder term. Defaults to
+        ``None``.
+    backend : str, optional
+        Implementation of Davies' method, ``"chi2comb"`` or ``"numpy"``; see
+        :func:`davies_pvalue`. Defaults to ``"chi2comb"``.
+    method : str, optional
+        ``"davies"``, ``"saddlepoint"`` or ``"auto"``; see :func:`davies_pvalue`.
+        Defaults to ``"davies"``.
+    threshold : float, optional
+        Screening threshold of ``method="auto"``. Defaults to ``1e-3``.
+    workers : int, Executor, optional
+        Threads, or executor, over which the statistics are split; see
+        :func:`davies_pvalue`. Defaults to ``None``.
+    rtol : float, optional
+        Relative accuracy targeted for the p-values of Davies' method; see
+        :func:`davies_pvalue`. Defaults to ``None``.
+
+    Returns
+    -------
+    ndarray
+        Estimated p-values, aligned with ``q``.
+    dict
+        Returned only if ``return_info=True``. ``p_val_liu`` holds the Liu p-values
+        used as fallback and ``is_converge`` the convergence flags, both aligned with
+        ``q``. ``truncation`` describes the remainder term when ``k`` or ``tol`` is
+        given. With ``method="saddlepoint"``, ``p_val_log`` holds the logarithms of
+        the p-values, which remain finite where the p-values are clipped to the
+        smallest positive float. With ``method="auto"``, ``tier`` holds the method
+        that produced each p-value, ``"liu"`` or ``"davies"``.
+    """
+    re = _davies_pvalue(q, w, factor, k, tol, backend, method, threshold, workers, rtol)
+    if return_info:
+        return re["p_value"], re
+    return re["p_value"]
+
+
+def _davies_pvalue(
+    q,
+    w,
+    factor=False,
+    k=None,
+    tol=None,
+    backend="chi2comb",
+    method="davies",
+    threshold=1e-3,
+    workers=None,
+    rtol=None,
+):
+    if method not in _METHODS:
+        raise ValueError(
+            "Unrecognized method {}. Choose one of these: {}".format(method, _METHODS)
+        )
+    q = asarray(atleast_1d(q), float).ravel()
+    w = _as_float(w)
+    # The spectrum is rescaled along with the statistics, rather than the weights,
+    # which may be too large to copy.
+    maxq = q.max()
+    scale = maxq if maxq > 0 else 1.0
+    q = q / scale
+
+    if k is None and tol is None:
+        lambda_ = _spectrum(w, factor) / scale
+        cdf = _DaviesCDF(lambda_, backend=backend, workers=workers)
+        return _pvalue_method(lambda_, q, cdf, None, None, method, threshold, rtol)
+
+    lambda_, dofs, c, info = _truncated_spectrum(_gram(w, factor), k, tol)
+    lambda_ = lambda_ / scale
+    c = c / scale ** arange(1, 5)
+    param = _liu_params_mod_cumulants(c)
+    cdf = _DaviesCDF(lambda_, dofs, backend, workers=workers)
+    re = _pvalue_method(lambda_, q, cdf, dofs, param, method, threshold, rtol)
+    re["truncation"] = info
+    return re
+
+
+def _pvalue_method(lambda_, Q, cdf, dofs, param, method, threshold, rtol=None):
+    if method == "saddlepoint":
+        return _saddlepoint_pvalue_lambda(lambda_, Q, dofs, param)
+    if method == "auto":
+        return _auto_pvalue_lambda(lambda_, Q, cdf, dofs, param, threshold, rtol)
+    return _pvalue_lambda(lambda_, Q, cdf=cdf, param=param, rtol=rtol)
+
+
+def _auto_pvalue_lambda(
+    lambda_, Q, cdf, dofs=None, param=None, threshold=1e-3, rtol=None
+):
+    # Liu's p-values are kept where they are above the threshold, and, near it,
+    # agree with the saddlepoint approximation; Davies' method is run on the rest.
+    if param is None:
+        param = _liu_params_mod_lambda(lambda_)
+    p_val_liu = _liu_pvalue_mod_lambda(Q, lambda_, param=param)
+    refine = p_val_liu < threshold
+    near = flatnonzero(~refine & (p_val_liu < _NEAR * threshold))
+    if len(near) > 0:
+        logsf, converged = _saddlepoint_logsf(Q[near], lambda_, dofs)
+        agree = abs(logsf - log(p_val_liu[near])) <= log(1 + _AGREEMENT)
+        refine[near] = ~(agree & converged)
+
+    re = dict(
+        p_value=clip(p_val_liu, finfo(float).tiny, 1.0),
+        p_val_liu=p_val_liu,
+        is_converge=ones(len(Q)),
+        p_val_log=None,
+        pval_zero_msg=None,
+        tier=where(refine, "davies", "liu"),
+    )
+    if refine.any():
+        sub = _pvalue_lambda(lambda_, Q[refine], cdf=cdf, param=param, rtol=rtol)
+        re["p_value"][refine] = sub["p_value"]
+        re["is_converge"][refine] = sub["is_converge"]
+    return re
+
+
+def _pvalue_lambda(lambda_, Q, cdf=None, param=None, rtol=None):
 
     n1 = len(Q)
 
@@ -45,26 +282,31 @@ def _pvalue_lambda(lambda_, Q):
     p_val_liu = zeros(n1)
     is_converge = zeros(n1)
 
-    p_val_liu = _liu_pvalue_mod_lambda(Q, lambda_)
+    p_val_liu = _liu_pvalue_mod_lambda(Q, lambda_, param=param)
 
-    for i in range(n1):
-        chi2s = [ChiSquared(w, 0.0, 1) for w in lambda_]
-        out = chi2comb_cdf(Q[i], chi2s, 0.0, lim=10000, atol=10 ** -6)
+    if cdf is None:
+        cdf = _DaviesCDF(lambda_)
+    if rtol is None:
+        cdf, errno = cdf(Q)
+    else:
+        cdf, errno = _relative_cdf(cdf, Q, p_val_liu, rtol)
 
-        p_val[i] = 1 - out[0]
+    for i in range(n1):
+        p_val[i] = 1 - cdf[i]
 
         is_converge[i] = 1
 
         # check convergence
         if len(lambda_) == 1:
             p_val[i] = p_val_liu[i]
-        elif out[1] != 0:
+        elif errno[i] != 0:
             is_converge[i] = 0
 
         # check p-value
         if p_val[i] > 1 or p_val[i] <= 0:
             is_converge[i] = 0
             p_val[i] = p_val_liu[i]
+            _count("liu_fallback")
 
     p_val[:] = clip(p_val, finfo(float).tiny, 1.0)
     p_val_msg = None
@@ -92,8 +334,273 @@ def _pvalue_lambda(lambda_, Q):
     )
 
 
-def _lambda(K):
-    lambda1 = eigvalsh(K)
+def _relative_cdf(cdf, Q, p_val, rtol):
+    # Davies' method bounds the absolute error of the cdf, so each statistic is
+    # evaluated with rtol times its estimated p-value as tolerance. Those whose
+    # p-value turns out smaller than that allows are evaluated again. A tolerance
+    # that fails never replaces a looser one that converged: the statistics keep
+    # the last converged estimate, loosening the tolerance ten times at a time up
+    # to the fixed one of cdf if the first fails, and are not tightened further.
+    atol = _relative_atol(rtol * p_val)
+    re, errno = cdf(Q, atol)
+    final = zeros(len(Q), bool)
+    while True:
+        loosen = flatnonzero((errno != 0) & (atol < cdf._atol))
+        if len(loosen) == 0:
+            break
+        final[loosen] = True
+        atol[loosen] = minimum(atol[loosen] * 10, cdf._atol)
+        re[loosen], errno[loosen] = cdf(Q[loosen], atol[loosen])
+    while True:
+        redo = flatnonzero((atol > rtol * (1 - re)) & (atol > _ATOL_RANGE[0]) & ~final)
+        if len(redo) == 0:
+            return re, errno
+        tighter = _relative_atol(minimum(rtol * (1 - re[redo]), atol[redo] / 10))
+        out, err = cdf(Q[redo], tighter)
+        ok = err == 0
+        re[redo[ok]], errno[redo[ok]], atol[redo[ok]] = out[ok], 0, tighter[ok]
+        final[redo[~ok]] = True
+
+
+def _relative_atol(atol):
+    # Rounded down to a power of ten, so that the numpy backend integrates the
+    # statistics sharing a tolerance together.
+    with errstate(divide="ignore", invalid="ignore"):
+        atol = 10 ** floor(log10(atol))
+    return clip(where(atol > 0, atol, 0), *_ATOL_RANGE)
+
+
+def _saddlepoint_pvalue_lambda(lambda_, Q, dofs=None, param=None):
+    # Same output as _pvalue_lambda, with p-values from the saddlepoint
+    # approximation, falling back to Liu's where it could not be computed.
+    p_val_liu = _liu_pvalue_mod_lambda(Q, lambda_, param=param)
+    p_val_log, is_converge = _saddlepoint_logsf(Q, lambda_, dofs)
+    p_val_log[~is_converge] = _liu_pvalue_mod_lambda(
+        Q[~is_converge], lambda_, log_p=True, param=param
+    )
+    _count("liu_fallback", count_nonzero(~is_converge))
+
+    return dict(
+        p_value=clip(exp(p_val_log), finfo(float).tiny, 1.0),
+        p_val_liu=p_val_liu,
+        is_converge=is_converge.astype(float),
+        p_val_log=p_val_log,
+        pval_zero_msg=None,
+    )
+
+
+class _DaviesCDF(object):
+    # Distribution function of a linear combination of chi-squared variables,
+    # estimated by Davies' method through the chosen backend.
+
+    def __init__(
+        self, lambda_, dofs=None, backend="chi2comb", atol=10 ** -6, workers=None
+    ):
+        if backend not in _BACKENDS:
+            raise ValueError(
+                "Unrecognized backend {}. Choose one of these: {}".format(
+                    backend, _BACKENDS
+                )
+            )
+        self._lambda = lambda_
+        self._dofs = dofs
+        self._backend = backend
+        self._atol = atol
+        self._workers = workers
+        # One chunk per thread of the pool created for each call, or per CPU for an
+        # executor given by the caller, whose size is not public.
+        if isinstance(workers, int):
+            self._nchunks = workers
+        else:
+            self._nchunks = cpu_count() or 1
+        if backend == "chi2comb":
+            self._chi2s = _chi2s(lambda_, dofs)
+
+    def __call__(self, Q, atol=None):
+        # atol, aligned with Q, overrides the tolerance given at construction.
+        Q = atleast_1d(Q)
+        if atol is None:
+            atol = full(len(Q), self._atol)
+        if self._workers is None or len(Q) < 2:
+            return self._evaluate(Q, atol)
+
+        # One contiguous chunk per worker. Threads share the weights, so that the
+        # chi-squared variables are built once, at construction; processes receive
+        # a pickled copy of the distribution.
+        from concurrent.futures import Executor, ThreadPoolExecutor
+
+        if isinstance(self._workers, Executor):
+            executor = self._workers
+        else:
+            executor = ThreadPoolExecutor(self._workers)
+        nchunks = min(self._nchunks, len(Q))
+        try:
+            chunks = (array_split(Q, nchunks), array_split(atol, nchunks))
+            out = list(executor.map(self._evaluate, *chunks))
+        finally:
+            if executor is not self._workers:
+                executor.shutdown()
+        return concatenate([o[0] for o in out]), concatenate([o[1] for o in out])
+
+    def rescaled(self, scale):
+        # Distribution of the combination divided by scale, with the same options.
+        return _DaviesCDF(
+            self._lambda / scale, self._dofs, self._backend, self._atol, self._workers
+        )
+
+    def __getstate__(self):
+        # The executor stays with the caller, and the chi-squared variables of
+        # chi2comb are rebuilt from the weights.
+        state = self.__dict__.copy()
+        state["_workers"] = None
+        state.pop("_chi2s", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._backend == "chi2comb":
+            self._chi2s = _chi2s(self._lambda, self._dofs)
+
+    def _evaluate(self, Q, atol):
+        start = _start()
+        cdf = zeros(len(Q))
+        errno = zeros(len(Q), int)
+        if self._backend == "numpy":
+            # Statistics sharing a tolerance share an integration grid.
+            for tol in unique(atol):
+                idx = atol == tol
+                lim = _davies_lim(tol)
+                re = qf(Q[idx], self._lambda, self._dofs, lim=lim, atol=tol)
+                cdf[idx], errno[idx] = re
+        else:
+            from chi2comb import chi2comb_cdf
+
+            for i in range(len(Q)):
+                lim = _davies_lim(atol[i])
+                out = chi2comb_cdf(Q[i], self._chi2s, 0.0, lim=lim, atol=atol[i])
+                cdf[i] = out[0]
+                errno[i] = out[1]
+        _stop("davies_cdf", start, len(Q))
+        _count("davies_error", count_nonzero(errno))
+        return cdf, errno
+
+
+def _davies_lim(atol):
+    return int(max(_LIM, 10 / sqrt(atol)))
+
+
+def _chi2s(lambda_, dofs=None):
+    from chi2comb import ChiSquared
+
+    if dofs is None:
+        return [ChiSquared(w, 0.0, 1) for w in lambda_]
+    return [ChiSquared(w, 0.0, int(d)) for w, d in zip(lambda_, dofs)]
+
+
+def _as_float(w):
+    # Floating-point arrays, memory maps included, are kept as they are: they are
+    # only read, a block at a time where they are not float64.
+    if isinstance(w, np.ndarray) and w.dtype.kind == "f":
+        return w
+    return asarray(w, float)
+
+
+def _spectrum(w, factor=False):
+    # Read from the active cache, if any, under the hash of w.
+    def compute():
+        if factor:
+            return _lambda_factor(w)
+        return _lambda(w)
+
+    return _cache._cached("spectrum", compute, w, factor)
+
+
+def _lambda_factor(G):
+    return _lambda(_gram(G, True), overwrite=True)
+
+
+def _gram(w, factor):
+    # The nonzero eigenvalues of GGᵀ and GᵀG are the same, so we decompose the
+    # smaller of the two.
+    if not factor:
+        return w
+    G = np.atleast_2d(w)
+    if G.shape[0] > G.shape[1]:
+        return _crossprod(G)
+    return _crossprod(G.T)
+
+
+def _crossprod(G):
+    # GᵀG, accumulated over blocks of rows of G, so that G is never cast as a whole.
+    K = zeros((G.shape[1], G.shape[1]))
+    for i in range(0, G.shape[0], _BLOCK):
+        B = asarray(G[i : i + _BLOCK], float)
+        K += B.T @ B
+    return K
+
+
+def _trace_cumulants(K):
+    # Power sums of the eigenvalues, tr(Kⁱ) for i = 1, ..., 4, over blocks of rows
+    # of K instead of the whole of K².
+    c = zeros(4)
+    for i in range(0, K.shape[0], _BLOCK):
+        B = K[i : i + _BLOCK]
+        B2 = B @ K
+        c += [np.trace(B[:, i:]), np.sum(B * B), np.sum(B2 * B), np.sum(B2 * B2)]
+    return c
+
+
+def _truncated_spectrum(K, k=None, tol=None):
+    from scipy.sparse.linalg import eigsh
+
+    K = K if K.dtype == float else asarray(K, float)
+    n = K.shape[0]
+    c = _trace_cumulants(K)
+    k = 16 if k is None else int(k)
+
+    while True:
+        if k >= n - 1:
+            lambda_ = _lambda(K)
+            break
+        lambda1 = eigsh(K, min(k, n - 2), which="LA", return_eigenvectors=False)
+        lambda1 = np.sort(lambda1)
+        lambda_ = lambda1[lambda1 > c[0] / n / 100000]
+        remain = c[1] - sum(lambda_ ** 2)
+        if tol is None or remain <= tol * c[1]:
+            break
+        k *= 2
+
+    ntop = len(lambda_)
+    dofs = np.ones(ntop, int)
+    remain = c - np.array([sum(lambda_ ** i) for i in range(1, 5)])
+    if remain[0] > 0 and remain[1] > c[1] * finfo(float).eps:
+        # Scaled chi-squared variable matching the mean and, up to the rounding of
+        # its degrees of freedom, the variance of the discarded eigenvalues.
+        dof = max(int(round(remain[0] ** 2 / remain[1])), 1)
+        lambda_ = np.append(lambda_, remain[0] / dof)
+        dofs = np.append(dofs, dof)
+
+    approx = np.array([sum(dofs * lambda_ ** i) for i in range(1, 5)])
+    info = dict(
+        k=ntop,
+        remainder_var=float(max(remain[1], 0.0) / c[1]),
+        cumulant_error=float(max(abs(approx[1:] - c[1:]) / c[1:])),
+    )
+    return lambda_, dofs, c, info
+
+
+def _lambda(K, overwrite=False):
+    from scipy.linalg import eigvalsh
+
+    # LAPACK overwrites the matrix it decomposes. Unless it is ours to overwrite, a
+    # float64 copy is made, in Fortran order, and no other. K being symmetric, Kᵀ
+    # is the same matrix, already in Fortran order if K is in C order.
+    K = np.atleast_2d(K)
+    if overwrite and K.dtype == float and K.flags.c_contiguous:
+        K = K.T
+    else:
+        K = np.array(K, float, order="F")
+    lambda1 = eigvalsh(K, overwrite_a=True, check_finite=False)
     lambda1 = np.sort(lambda1)
     idx1 = where(lambda1 >= 0)[0]
 
@@ -105,22 +612,53 @@ def _lambda(K):
     return lambda1[idx2]
 
 
-def _liu_pvalue_mod_lambda(Q_all, lambda_, log_p=False):
+def _liu_pvalue_mod_lambda(Q_all, lambda_, log_p=False, param=None):
+    from scipy.stats import chi2
 
-    param = _liu_params_mod_lambda(lambda_)
+    if param is None:
+        param = _liu_params_mod_lambda(lambda_)
 
     Q_Norm = (Q_all - param["muQ"]) / param["sigmaQ"]
     Q_Norm1 = Q_Norm * param["sigmaX"] + param["muX"]
 
     if log_p:
-        msg = "Please, contact the developer with the input that causes this."
-        raise NotImplementedError(msg)
-        # Q_Norm1 = exp(Q_Norm1)
+        return _chi2_logsf(Q_Norm1 - param["d"], param["ll"])
     p_value = chi2.sf(Q_Norm1, df=param["ll"], loc=param["d"])
 
     return p_value
 
 
+def _chi2_logsf(x, df):
+    # Logarithm of the chi-squared survival function. Where it underflows, the upper
+    # incomplete gamma function Γ(𝑎, 𝑦), 𝑎 = df/2 and 𝑦 = x/2 > 𝑎 + 1, is evaluated
+    # in logarithms, by Lentz's algorithm on its continued fraction.
+    from scipy.special import gammaln
+    from scipy.stats import chi2
+
+    logsf = np.array(chi2.logsf(x, df), float, ndmin=1)
+    idx = flatnonzero(np.isneginf(logsf))
+    a = df / 2
+    y = asarray(x, float).ravel()[idx] / 2
+    tiny = finfo(float).tiny
+    b = y + 1 - a
+    c = full(len(y), 1 / tiny)
+    d = 1 / b
+    h = d.copy()
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = where(abs(d) < tiny, tiny, d)
+        c = b + an / c
+        c = where(abs(c) < tiny, tiny, c)
+        d = 1 / d
+        h *= d * c
+        if (abs(d * c - 1) < finfo(float).eps).all():
+            break
+    logsf[idx] = -y + a * log(y) - gammaln(a) + log(h)
+    return logsf.reshape(np.shape(x))[()]
+
+
 def _liu_params_mod_lambda(lambda_):
     # Helper function for getting the parameters for the null approximation
 
@@ -128,6 +666,10 @@ def _liu_params_mod_lambda(lambda_):
     for i in range(4):
         c1[i] = sum(lambda_ ** (i + 1))
 
+    return _liu_params_mod_cumulants(c1)
+
+
+def _liu_params_mod_cumulants(c1):
     muQ = c1[0]
     sigmaQ = sqrt(2 * c1[1])
     s1 = c1[2] / c1[1] ** (3 / 2)
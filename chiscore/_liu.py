@@ -1,5 +1,4 @@
-from numpy import asarray, maximum, sqrt, sum
-from scipy.stats import ncx2
+from numpy import asarray, errstate, maximum, sqrt, sum, where
 
 
 def liu_sf(t, lambs, dofs, deltas, kurtosis=False):
@@ -23,16 +22,25 @@ def liu_sf(t, lambs, dofs, deltas, kurtosis=False):
     Then ``kurtosis=True``, the approximation is done by matching the kurtosis, rather
     than the skewness, as derived in [2].
 
+    Its relative error grows in the far tail. There, :func:`saddlepoint_sf`
+    approximates the same distribution, and returns the logarithm of the survival
+    function if asked.
+
+    Many linear combinations can be approximated at once by passing one set of
+    weights per row of a two-dimensional ``lambs``. The leading dimension of ``t``
+    then indexes the rows, so that ``t`` can be a vector with one point per row or a
+    matrix with many points per row.
+
     Parameters
     ----------
     t : array_like
         Points at which the survival function will be applied, Pr(𝑋 > 𝑡).
     lambs : array_like
-        Weights λᵢ.
+        Weights λᵢ, or one set of weights per row.
     dofs : array_like
-        Degrees of freedom, hᵢ.
+        Degrees of freedom, hᵢ, broadcast against ``lambs``.
     deltas : array_like
-        Noncentrality parameters, 𝛿ᵢ.
+        Noncentrality parameters, 𝛿ᵢ, broadcast against ``lambs``.
     kurtosis : bool, optional
         ``True`` for using the modified approach proposed in [2]. ``False`` for using
         the original approach proposed in [1]. Defaults to ``False``.
@@ -41,9 +49,9 @@ def liu_sf(t, lambs, dofs, deltas, kurtosis=False):
     -------
     q : float, ndarray
         Approximated survival function applied to 𝑡: Pr(𝑋 > 𝑡).
-    dof : float
+    dof : float, ndarray
         Degrees of freedom of χ²(𝑙, 𝛿), 𝑙.
-    ncen : float
+    ncen : float, ndarray
         Noncentrality parameter of χ²(𝑙, 𝛿), 𝛿.
     info : dict
         Additional information: mu_q, sigma_q, mu_x, sigma_x, and t_star.
@@ -83,6 +91,8 @@ def liu_sf(t, lambs, dofs, deltas, kurtosis=False):
     [2] Lee, Seunggeun, Michael C. Wu, and Xihong Lin. "Optimal tests for rare variant
         effects in sequencing association studies." Biostatistics 13.4 (2012): 762-775.
     """
+    from scipy.stats import ncx2
+
     t = asarray(t, float)
     lambs = asarray(lambs, float)
     dofs = asarray(dofs, float)
@@ -90,24 +100,25 @@ def liu_sf(t, lambs, dofs, deltas, kurtosis=False):
 
     lambs = {i: lambs ** i for i in range(1, 5)}
 
-    c = {i: sum(lambs[i] * dofs) + i * sum(lambs[i] * deltas) for i in range(1, 5)}
+    c = {
+        i: sum(lambs[i] * dofs, -1) + i * sum(lambs[i] * deltas, -1)
+        for i in range(1, 5)
+    }
 
     s1 = c[3] / sqrt(c[2]) ** 3
     s2 = c[4] / c[2] ** 2
 
     s12 = s1 ** 2
-    if s12 > s2:
-        a = 1 / (s1 - sqrt(s12 - s2))
-        delta_x = s1 * a ** 3 - a ** 2
-        dof_x = a ** 2 - 2 * delta_x
+    skew = s12 > s2
+    with errstate(divide="ignore", invalid="ignore"):
+        a = 1 / (s1 - sqrt(where(skew, s12 - s2, 0)))
+    delta_x = where(skew, s1 * a ** 3 - a ** 2, 0)
+    if kurtosis:
+        a = where(skew, a, 1 / sqrt(s2))
+        dof_x = where(skew, a ** 2 - 2 * delta_x, 1 / s2)
     else:
-        delta_x = 0
-        if kurtosis:
-            a = 1 / sqrt(s2)
-            dof_x = 1 / s2
-        else:
-            a = 1 / s1
-            dof_x = 1 / s12
+        a = where(skew, a, 1 / s1)
+        dof_x = where(skew, a ** 2 - 2 * delta_x, 1 / s12)
 
     mu_q = c[1]
     sigma_q = sqrt(2 * c[2])
@@ -115,16 +126,23 @@ def liu_sf(t, lambs, dofs, deltas, kurtosis=False):
     mu_x = dof_x + delta_x
     sigma_x = sqrt(2 * (dof_x + 2 * delta_x))
 
-    t_star = (t - mu_q) / sigma_q
-    tfinal = t_star * sigma_x + mu_x
+    t_star = (t - _align(mu_q, t)) / _align(sigma_q, t)
+    tfinal = t_star * _align(sigma_x, t) + _align(mu_x, t)
 
-    q = ncx2.sf(tfinal, dof_x, maximum(delta_x, 1e-9))
+    q = ncx2.sf(tfinal, _align(dof_x, t), _align(maximum(delta_x, 1e-9), t))
 
     info = {
         "mu_q": mu_q,
         "sigma_q": sigma_q,
-        "mu_x": mu_x,
-        "sigma_x": sigma_x,
+        "mu_x": mu_x[()],
+        "sigma_x": sigma_x[()],
         "t_star": t_star,
     }
-    return (q, dof_x, delta_x, info)
+    return (q, dof_x[()], delta_x[()], info)
+
+
+def _align(v, t):
+    # One set of weights per leading entry of t.
+    if 0 < v.ndim < t.ndim:
+        return v.reshape(v.shape + (1,) * (t.ndim - v.ndim))
+    return v
@@ -0,0 +1,223 @@
+from numpy import asarray, atleast_1d, exp, ones
+
+from ._davies import (
+    _METHODS,
+    _as_float,
+    _DaviesCDF,
+    _gram,
+    _liu_params_mod_cumulants,
+    _liu_params_mod_lambda,
+    _liu_pvalue_mod_lambda,
+    _pvalue_method,
+    _spectrum,
+    _truncated_spectrum,
+)
+from ._saddlepoint import _saddlepoint_logsf
+
+
+class ChiSquaredMixture(object):
+    """
+    Null distribution of a linear combination of chi-squared variables.
+
+    The filtered eigenvalues of ``w``, their cumulants and the Liu parameters are
+    computed once, at construction. The survival functions can then be evaluated
+    cheaply as many times as needed.
+
+    Parameters
+    ----------
+    w : array_like
+        Weights of the linear combination, read in place if it is a floating-point
+        array, such as a ``float32`` memory map; see :func:`davies_pvalue`.
+    factor : bool, optional
+        ``True`` if ``w`` is a factor 𝙶 of the weights, 𝙶𝙶ᵀ. Defaults to ``False``.
+    k : int, optional
+        Number of leading eigenvalues to compute. The remaining ones are replaced by a
+        single scaled chi-squared variable that matches their exact mean and variance.
+        Defaults to ``None``, computing the whole spectrum.
+    tol : float, optional
+        Maximum fraction of the variance left to the remainder term. Defaults to
+        ``None``.
+    backend : str, optional
+        Implementation of Davies' method, ``"chi2comb"`` or ``"numpy"``. The latter
+        evaluates all the statistics of a call at once. Defaults to ``"chi2comb"``.
+    workers : int, Executor, optional
+        Number of threads over which the statistics of a call are split for Davies'
+        method, or an executor to run them on. Defaults to ``None``.
+
+    Attributes
+    ----------
+    truncation : dict, None
+        Number of computed eigenvalues ``k``, fraction of the variance assigned to the
+        remainder term ``remainder_var``, and the largest relative error on the second
+        to fourth cumulants ``cumulant_error``. ``None`` if the whole spectrum is used.
+
+    Example
+    -------
+
+    .. doctest::
+
+        >>> from numpy import diag
+        >>> from chiscore import ChiSquaredMixture
+        >>>
+        >>> null = ChiSquaredMixture(diag([0.5, 0.4, 0.1]))
+        >>> null.sf([1.0, 3.0])  # doctest: +FLOAT_CMP
+        array([0.37175388, 0.04093017])
+    """
+
+    def __init__(
+        self, w, factor=False, k=None, tol=None, backend="chi2comb", workers=None
+    ):
+        w = _as_float(w)
+        if k is None and tol is None:
+            self._lambda = _spectrum(w, factor)
+            self._dofs = None
+            self._param = _liu_params_mod_lambda(self._lambda)
+            self.truncation = None
+        else:
+            K = _gram(w, factor)
+            re = _truncated_spectrum(K, k, tol)
+            self._lambda, self._dofs, c, self.truncation = re
+            self._param = _liu_params_mod_cumulants(c)
+        self._cdf = _DaviesCDF(self._lambda, self._dofs, backend, workers=workers)
+
+    @property
+    def weights(self):
+        """
+        Eigenvalues kept as weights of the chi-squared variables.
+        """
+        return self._lambda
+
+    @property
+    def dofs(self):
+        """
+        Degrees of freedom of the chi-squared variables.
+        """
+        if self._dofs is None:
+            return ones(len(self._lambda), int)
+        return self._dofs
+
+    @property
+    def liu_params(self):
+        """
+        Parameters of the modified Liu approximation: ll, d, muQ, muX, sigmaQ, and
+        sigmaX.
+        """
+        return dict(self._param)
+
+    def sf(self, q, return_info=False, method="davies", threshold=1e-3, rtol=None):
+        """
+        Survival function estimated by Davies' method with Liu fallback.
+
+        Parameters
+        ----------
+        q : array_like
+            Test statistics.
+        return_info : bool, optional
+            ``True`` to also return the Liu p-values and the convergence flags.
+            Defaults to ``False``.
+        method : str, optional
+            ``"davies"``, ``"saddlepoint"`` or ``"auto"``; see
+            :func:`chiscore.davies_pvalue`. Defaults to ``"davies"``.
+        threshold : float, optional
+            Screening threshold of ``method="auto"``. Defaults to ``1e-3``.
+        rtol : float, optional
+            Relative accuracy targeted for the p-values of Davies' method; see
+            :func:`chiscore.davies_pvalue`. Defaults to ``None``.
+
+        Returns
+        -------
+        ndarray
+            Estimated p-values, aligned with ``q``.
+        dict
+            Returned only if ``return_info=True``.
+        """
+        if method not in _METHODS:
+            raise ValueError(
+                "Unrecognized method {}. Choose one of these: {}".format(
+                    method, _METHODS
+                )
+            )
+        q, lambda_, cdf, param = self._scaled(asarray(atleast_1d(q), float).ravel())
+        args = (cdf, self._dofs, param, method, threshold, rtol)
+        re = _pvalue_method(lambda_, q, *args)
+        if return_info:
+            return re["p_value"], re
+        return re["p_value"]
+
+    def liu_sf(self, q):
+        """
+        Survival function estimated by the modified Liu approximation.
+
+        Parameters
+        ----------
+        q : array_like
+            Test statistics.
+
+        Returns
+        -------
+        ndarray
+            Approximated p-values, aligned with ``q``.
+        """
+        q = asarray(atleast_1d(q), float).ravel()
+        return _liu_pvalue_mod_lambda(q, self._lambda, param=self._param)
+
+    def saddlepoint_sf(self, q, log=False):
+        """
+        Survival function estimated by the saddlepoint approximation.
+
+        Parameters
+        ----------
+        q : array_like
+            Test statistics.
+        log : bool, optional
+            ``True`` to return the logarithms of the p-values. Defaults to ``False``.
+
+        Returns
+        -------
+        ndarray
+            Approximated p-values, or their logarithms, aligned with ``q``.
+        """
+        q = asarray(atleast_1d(q), float).ravel()
+        logsf = _saddlepoint_logsf(q, self._lambda, self._dofs)[0]
+        if log:
+            return logsf
+        return exp(logsf)
+
+    def davies_sf(self, q, return_info=False):
+        """
+        Survival function estimated by Davies' method alone.
+
+        No fallback nor clipping is applied to the values.
+
+        Parameters
+        ----------
+        q : array_like
+            Test statistics.
+        return_info : bool, optional
+            ``True`` to also return the error codes of Davies' method. Defaults to
+            ``False``.
+
+        Returns
+        -------
+        ndarray
+            Estimated p-values, aligned with ``q``.
+        dict
+            Returned only if ``return_info=True``. ``errno`` holds the error codes,
+            ``0`` meaning success.
+        """
+        q, _, cdf, _ = self._scaled(asarray(atleast_1d(q), float).ravel())
+        cdf, errno = cdf(q)
+        if return_info:
+            return 1 - cdf, dict(errno=errno)
+        return 1 - cdf
+
+    def _scaled(self, q):
+        # As in davies_pvalue, the statistics and the weights are divided by the
+        # largest statistic, so that Davies' absolute tolerance applies to the same
+        # scale.
+        maxq = q.max()
+        scale = maxq if maxq > 0 else 1.0
+        param = dict(self._param)
+        param["muQ"] = param["muQ"] / scale
+        param["sigmaQ"] = param["sigmaQ"] / scale
+        return q / scale, self._lambda / scale, self._cdf.rescaled(scale), param
@@ -0,0 +1,267 @@
+from numpy import (
+    asarray,
+    atleast_1d,
+    atleast_2d,
+    errstate,
+    full,
+    inf,
+    ones,
+    random,
+    searchsorted,
+    sort,
+    sqrt,
+    where,
+    zeros,
+)
+
+from ._davies import _as_float, _spectrum
+from ._profile import _start, _stop
+
+# Draws of chi-squared variables held in memory at a time by a worker.
+_ELEMENTS = 2 ** 22
+
+
+def montecarlo_sf(
+    q,
+    lambs,
+    dofs=None,
+    rtol=1e-2,
+    chunk_size=2 ** 16,
+    max_samples=10 ** 7,
+    seed=None,
+    processes=1,
+    return_info=False,
+):
+    """
+    Monte Carlo estimate of Pr(∑λᵢχ²(dᵢ) > 𝑞).
+
+    Samples of the mixture are drawn in chunks of ``chunk_size``, each from its own
+    :class:`numpy.random.Generator`, seeded by a child of ``SeedSequence(seed)``.
+    The chunks are drawn until the relative standard error of every estimate is
+    below ``rtol``, or until ``max_samples`` have been drawn. The chunks are used in
+    order whatever the number of processes, so that the estimates only depend on
+    the seed.
+
+    Parameters
+    ----------
+    q : array_like
+        Test statistics.
+    lambs : array_like
+        Weights λᵢ.
+    dofs : array_like, optional
+        Degrees of freedom dᵢ. Defaults to ``None``, one degree each.
+    rtol : float, optional
+        Relative standard error at which the sampling stops. Defaults to ``1e-2``.
+    chunk_size : int, optional
+        Number of samples of a chunk. Defaults to ``65536``.
+    max_samples : int, optional
+        Maximum number of samples. Defaults to ``10_000_000``.
+    seed : int or SeedSequence, optional
+        Seed of the random streams. Defaults to ``None``, fresh entropy.
+    processes : int, optional
+        Number of worker processes drawing chunks. ``None`` uses the number of
+        processors. Defaults to ``1``, drawing in the calling process.
+    return_info : bool, optional
+        ``True`` to also return the number of samples and the standard errors.
+        Defaults to ``False``.
+
+    Returns
+    -------
+    float or ndarray
+        Estimated probabilities, the fraction of the samples above ``q``.
+    dict
+        Returned only if ``return_info=True``. ``samples`` is the number of samples
+        drawn, ``stderr`` the standard errors of the estimates, and ``converged``
+        whether each met ``rtol``.
+
+    Example
+    -------
+
+    .. doctest::
+
+        >>> from chiscore import montecarlo_sf
+        >>>
+        >>> pval = montecarlo_sf(2.0, [0.5, 0.4, 0.1], seed=0)
+    """
+    q = asarray(q, float)
+    lambs = asarray(lambs, float)
+    dofs = ones(len(lambs)) if dofs is None else asarray(dofs, float)
+    args = ("mixture", atleast_1d(q).ravel(), lambs, dofs)
+    re = _montecarlo(args, rtol, chunk_size, max_samples, seed, processes)
+    pvals = re[0].reshape(q.shape)
+    if q.ndim == 0:
+        pvals = float(pvals)
+    if return_info:
+        return pvals, re[1]
+    return pvals
+
+
+def montecarlo_optimal_pvalue(
+    q,
+    mu,
+    var,
+    kur,
+    w,
+    remain_var,
+    df,
+    trho,
+    grid,
+    factor=False,
+    rtol=1e-2,
+    chunk_size=2 ** 16,
+    max_samples=10 ** 7,
+    seed=None,
+    processes=1,
+    return_info=False,
+):
+    r"""Monte Carlo estimate of the p-value of the optimal test.
+
+    The p-value computed by :func:`optimal_davies_pvalue` is the probability
+
+        Pr(min_𝜌 (qₘᵢₙ(𝜌) - 𝜏(𝜌)𝜂) / (1 - 𝜌) < 𝜅),
+
+    for 𝜂 ~ χ²(1) and, independently, the mixture 𝜅 weighted by ``w``, standardized
+    so that its variance is ``var``, of which ``remain_var`` is not accounted by the
+    weights [1]. It is estimated by drawing both, chunk by chunk as in
+    :func:`montecarlo_sf`. The estimate does not depend on the integration of Davies'
+    method, and can replace it where it fails.
+
+    Parameters
+    ----------
+    q : array_like
+        Most significant of the independent test statistics, qₘᵢₙ(𝜌ᵥ), or rows of
+        them sharing the other parameters, as for
+        :func:`optimal_davies_pvalue_batch`.
+    mu : float
+        Mean of the linear combination of the chi-squared distributions.
+    var : float
+        Variance of the linear combination of the chi-squared distributions.
+    kur : float
+        Kurtosis, unused by the sampling.
+    w : array_like
+        Weights of the linear combination.
+    remain_var : float
+        Remaining variance assigned to a Normal distribution.
+    df : float
+        Overall degrees of freedom, unused by the sampling.
+    trho : array_like
+        Weight between the combination of chi-squared distributions and independent
+        chi-squared distributions.
+    grid : array_like
+        Grid parameters.
+    factor : bool, optional
+        ``True`` if ``w`` is a factor 𝙶 of the matrix whose eigenvalues are the
+        weights, 𝙶𝙶ᵀ. Defaults to ``False``.
+    rtol, chunk_size, max_samples, seed, processes, return_info
+        Sampling options; see :func:`montecarlo_sf`.
+
+    Returns
+    -------
+    float or ndarray
+        Estimated p-value, or p-values of the rows of ``q``.
+    dict
+        Returned only if ``return_info=True``; see :func:`montecarlo_sf`.
+
+    References
+    ----------
+    [1] Lee, Seunggeun, Michael C. Wu, and Xihong Lin. "Optimal tests for rare variant
+        effects in sequencing association studies." Biostatistics 13.4 (2012): 762-775.
+    """
+    q = asarray(q, float)
+    if factor:
+        w = _spectrum(_as_float(w), True)
+    else:
+        w = asarray(w, float)
+    sd1 = sqrt(float(var) - float(remain_var)) / sqrt(float(var))
+    trho = asarray(trho, float)
+    grid = asarray(grid, float)
+    args = ("optimal", atleast_2d(q), float(mu), sd1, w, trho, grid)
+    re = _montecarlo(args, rtol, chunk_size, max_samples, seed, processes)
+    pvals = re[0] if q.ndim > 1 else float(re[0][0])
+    if return_info:
+        return pvals, re[1]
+    return pvals
+
+
+def _montecarlo(args, rtol, chunk_size, max_samples, seed, processes):
+    # Fractions of exceedances, counted by _chunk over chunks drawn in order until
+    # all of them are within rtol, and information about the sampling.
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    from os import cpu_count
+
+    seeds = seed if isinstance(seed, random.SeedSequence) else random.SeedSequence(seed)
+    chunks = -(-int(max_samples) // int(chunk_size))
+    size = len(args[1])
+    counts = zeros(size, int)
+    samples = 0
+
+    start = _start()
+    if processes is None:
+        processes = cpu_count() or 1
+    if processes == 1:
+        for _ in range(chunks):
+            counts += _chunk(args, seeds.spawn(1)[0], chunk_size)
+            samples += chunk_size
+            if _converged(counts, samples, rtol).all():
+                break
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            pending = deque()
+            for i in range(chunks):
+                # Twice as many chunks as processes are kept in flight.
+                while len(pending) < 2 * processes and i + len(pending) < chunks:
+                    task = (args, seeds.spawn(1)[0], chunk_size)
+                    pending.append(executor.submit(_chunk, *task))
+                counts += pending.popleft().result()
+                samples += chunk_size
+                if _converged(counts, samples, rtol).all():
+                    break
+            for future in pending:
+                future.cancel()
+    _stop("montecarlo", start, samples)
+
+    pvals = counts / samples
+    stderr = sqrt(pvals * (1 - pvals) / samples)
+    info = dict(
+        samples=samples, stderr=stderr, converged=_converged(counts, samples, rtol)
+    )
+    return pvals, info
+
+
+def _converged(counts, samples, rtol):
+    # Relative standard error of the fractions, sqrt((1 - p) / (n⋅p)), below rtol.
+    p = counts / samples
+    with errstate(divide="ignore", invalid="ignore"):
+        rse = where(counts > 0, sqrt((1 - p) / where(counts > 0, counts, 1)), inf)
+    return rse <= rtol
+
+
+def _chunk(args, seed, size):
+    # Number of samples, among `size` drawn from the Generator seeded by `seed`,
+    # exceeding each statistic.
+    rng = random.default_rng(seed)
+    kind = args[0]
+    counts = zeros(len(args[1]), int)
+    weights = args[3] if kind == "mixture" else args[4]
+    step = max(_ELEMENTS // len(weights), 1)
+    for first in range(0, size, step):
+        n = min(step, size - first)
+        if kind == "mixture":
+            q, lambs, dofs = args[1:]
+            x = sort(rng.chisquare(dofs, (n, len(lambs))) @ lambs)
+            counts += n - searchsorted(x, q, "right")
+        else:
+            q, mu, sd1, w, trho, grid = args[1:]
+            kappa = mu + (rng.chisquare(1.0, (n, len(w))) @ w - mu) / sd1
+            eta = rng.chisquare(1.0, n)
+            counts += (_min1(q, eta, trho, grid) < kappa).sum(1)
+    return counts
+
+
+def _min1(q, eta, trho, grid):
+    # min over the grid of (q - trho⋅eta) / (1 - grid), for rows of q.
+    temp = q[:, None, :] - trho * eta[:, None]
+    with errstate(divide="ignore"):
+        temp = where(grid != 1.0, temp / (1 - grid), full(temp.shape, inf))
+    return temp.min(-1)
@@ -1,12 +1,84 @@
-from chi2comb import ChiSquared, chi2comb_cdf
-from numpy import asarray, divide, exp, full, inf, log, min, sqrt
-from scipy.integrate import quad
-from scipy.stats import chi2
+from numpy import (
+    arange,
+    asarray,
+    atleast_1d,
+    atleast_2d,
+    broadcast_to,
+    clip,
+    concatenate,
+    diff,
+    divide,
+    errstate,
+    exp,
+    flatnonzero,
+    full,
+    inf,
+    insert,
+    isnan,
+    linspace,
+    log,
+    maximum,
+    min,
+    minimum,
+    nan,
+    ndim,
+    ones,
+    pi,
+    repeat,
+    searchsorted,
+    sqrt,
+    where,
+    zeros,
+)
+
+from . import _cache, _profile
+from ._davies import (
+    _ATOL_RANGE,
+    _BACKENDS,
+    _METHODS,
+    _as_float,
+    _DaviesCDF,
+    _relative_atol,
+    _spectrum,
+)
+from ._profile import _count, _start, _stop
+from ._quadrature import gauss_kronrod, gauss_kronrod_many
+from ._saddlepoint import _chernoff_cdf, _SaddlepointCDF
 
 _EPSABS = 1e-12
+_INTEGRATORS = ["quad", "gk"]
+# Largest upper limit of the integrals of optimal_davies_pvalue_batch, the furthest
+# that _find_upper_bound goes: the chi-squared density is below 1e-18 beyond it.
+_UPPER = 80.0
+# Rows of statistics integrated together by optimal_davies_pvalue_batch, and
+# their absolute tolerance.
+_ROWS = 256
+_EPSABS_TABLE = 1e-9
+# Accuracy to which the cdf is tabulated by default, against values of the cdf ten
+# times more accurate.
+_TABLE_TOL = 1e-7
 
 
-def optimal_davies_pvalue(q, mu, var, kur, w, remain_var, df, trho, grid, pmin=None):
+def optimal_davies_pvalue(
+    q,
+    mu,
+    var,
+    kur,
+    w,
+    remain_var,
+    df,
+    trho,
+    grid,
+    pmin=None,
+    factor=False,
+    backend="chi2comb",
+    integrator="quad",
+    table=False,
+    method="davies",
+    threshold=1e-3,
+    return_info=False,
+    rtol=None,
+):
     r"""Joint significance of statistics derived from chi2-squared distributions.
 
     Parameters
@@ -32,56 +104,652 @@ def optimal_davies_pvalue(q, mu, var, kur, w, remain_var, df, trho, grid, pmin=N
         Grid parameters.
     pmin : float
         Boundary of the possible final p-values.
+    factor : bool, optional
+        ``True`` if ``w`` is a factor 𝙶 of the matrix whose eigenvalues are the
+        weights, 𝙶𝙶ᵀ. Defaults to ``False``.
+    backend : str, optional
+        Implementation of Davies' method, ``"chi2comb"`` or ``"numpy"``. Defaults to
+        ``"chi2comb"``.
+    integrator : str, optional
+        ``"quad"`` integrates one point at a time through :func:`scipy.integrate.quad`.
+        ``"gk"`` uses an adaptive Gauss–Kronrod rule that evaluates the nodes of all
+        the panels being refined at once, which pays off with ``backend="numpy"``.
+        Defaults to ``"quad"``.
+    table : bool, optional
+        ``True`` to tabulate the distribution function of the mixture once, over the
+        range reached by the integrand, and to interpolate it monotonically instead of
+        running Davies' method at every integration point. Defaults to ``False``.
+    method : str, optional
+        Estimation of the distribution function of the mixture inside the integral:
+        ``"davies"`` for Davies' method, ``"saddlepoint"`` for the saddlepoint
+        approximation. ``"auto"`` first estimates the p-value by Liu's
+        approximation, and integrates Davies' method only if it is below
+        ``threshold``. Defaults to ``"davies"``.
+    threshold : float, optional
+        Screening threshold of ``method="auto"``. Defaults to ``1e-3``.
+    return_info : bool, optional
+        ``True`` to also return the method that produced the p-value. Defaults to
+        ``False``.
+    rtol : float, optional
+        Relative accuracy targeted for the p-value, such as ``1e-3`` for about three
+        significant digits. The absolute tolerances of Davies' method and of the
+        integration are scaled to the p-value first estimated by Liu's
+        approximation, and tightened while the p-value found is smaller. Defaults to
+        ``None``, fixed absolute tolerances of ``1e-5`` and ``1e-12``, which are
+        wasted on large p-values and too loose for small ones.
 
     Returns
     -------
     float
         Estimated p-value.
+    dict
+        Returned only if ``return_info=True``. ``tier`` holds the method that
+        produced the p-value: ``"davies"``, ``"saddlepoint"``, or ``"liu"`` if it
+        comes from Liu's approximation, either by screening or as a fallback.
 
     References
     ----------
     [1] Lee, Seunggeun, Michael C. Wu, and Xihong Lin. "Optimal tests for rare variant
         effects in sequencing association studies." Biostatistics 13.4 (2012): 762-775.
     """
+    if integrator not in _INTEGRATORS:
+        raise ValueError(
+            "Unrecognized integrator {}. Choose one of these: {}".format(
+                integrator, _INTEGRATORS
+            )
+        )
+
+    if method not in _METHODS:
+        raise ValueError(
+            "Unrecognized method {}. Choose one of these: {}".format(method, _METHODS)
+        )
+
+    options = (factor, backend, integrator, table, method, threshold, rtol)
+    pvalue, tier = _optimal_davies_pvalue(
+        q, mu, var, kur, w, remain_var, df, trho, grid, pmin, *options
+    )
+    if return_info:
+        return pvalue, dict(tier=tier)
+    return pvalue
+
+
+def _optimal_davies_pvalue(
+    q,
+    mu,
+    var,
+    kur,
+    w,
+    remain_var,
+    df,
+    trho,
+    grid,
+    pmin,
+    factor,
+    backend,
+    integrator,
+    table,
+    method,
+    threshold,
+    rtol=None,
+):
+    # Returns the p-value and the method that produced it: "davies", "saddlepoint"
+    # or "liu".
     q = asarray(q, float)
     mu = float(mu)
     var = float(var)
     kur = float(kur)
 
-    w = asarray(w, float)
+    if factor:
+        w = _spectrum(_as_float(w), True)
+    else:
+        w = asarray(w, float)
     remain_var = float(remain_var)
     df = float(df)
     trho = asarray(trho, float)
     grid = asarray(grid, float)
 
+    liu = (q, mu, var, kur, w, remain_var, df, trho, grid, pmin, integrator)
+    if method == "auto":
+        pvalue = _skat_liu_pvalue(*liu)
+        if pvalue >= threshold:
+            return pvalue, "liu"
+        method = "davies"
+    elif rtol is not None:
+        pvalue = _skat_liu_pvalue(*liu)
+
+    # Without rtol, the tolerances are fixed. With it, half of the error budget
+    # goes to the cdf and half to the integration, both scaled to the p-value
+    # estimated by Liu's approximation, and tightened again while the p-value found
+    # is smaller. A pass that fails leaves the estimate of the previous one and ends
+    # the tightening; if the first fails, the tolerance is loosened ten times at a
+    # time instead, until a pass succeeds.
+    tol = None if rtol is None else float(_relative_atol(rtol * pvalue / 2))
+    previous = None
+    loosened = False
+    while True:
+        args = (q, mu, var, kur, w, remain_var, df, trho, grid)
+        pvalue, tier = _integrate(args, backend, integrator, table, method, tol)
+        if tier is None and previous is not None:
+            pvalue, method = previous
+            break
+        if tier is None and tol is not None and tol < _ATOL_RANGE[1]:
+            tol *= 10
+            loosened = True
+            continue
+        if tier is None:
+            method = "liu"
+            _count("optimal_fallback")
+            pvalue = _skat_liu_pvalue(*liu)
+            break
+        method = tier
+        if tol is None or loosened or tol <= max(rtol * pvalue / 2, _ATOL_RANGE[0]):
+            break
+        previous = pvalue, method
+        tol = float(_relative_atol(minimum(rtol * pvalue / 2, tol / 10)))
+
+    if pmin is not None:
+        if pmin * len(grid) < abs(pvalue):
+            pvalue = pmin * len(grid)
+    return pvalue, method
+
+
+def _integrate(args, backend, integrator, table, method, tol):
+    # P-value of the optimal test by integration of the cdf of the mixture, and
+    # method, or None if the integration failed.
+    from scipy.integrate import quad
+
+    q, mu, var, kur, w, remain_var, df, trho, grid = args
+    atol, epsabs = (10 ** -5, _EPSABS) if tol is None else (tol / 10, tol / 10)
+    if table and tol is None:
+        atol = _TABLE_TOL / 10
+
     lambda_threshold = sum(w) * 10 ** 4
-    chi2s = [ChiSquared(i, 0.0, 1) for i in w]
-    args = (q, mu, var, kur, lambda_threshold, remain_var, df, trho, grid, chi2s)
+    if method == "saddlepoint":
+        cdf = _CachedCDF(_SaddlepointCDF(w))
+    else:
+        cdf = _CachedCDF(_DaviesCDF(w, backend=backend, atol=atol))
+    args = (q, mu, var, kur, lambda_threshold, remain_var, df, trho, grid, cdf)
     try:
-        u = _find_upper_bound(args)
-        re = quad(
-            _davies_function, 0, u, args, limit=1000, epsabs=_EPSABS, full_output=1
+        u, cdf = _integral_setup(args, w, backend, method, table, tol)
+        args = args[:-1] + (cdf,)
+        start = _start()
+        if integrator == "quad":
+            re = quad(
+                _davies_function, 0, u, args, limit=1000, epsabs=epsabs, full_output=1
+            )
+        else:
+            re = _davies_integral(args, u, epsabs)
+        _stop("integral", start, re[2]["neval"])
+        _count("integral_limit", _not_converged(re))
+    except RuntimeError:
+        return None, None
+
+    if re[1] > max(1e-6, epsabs):
+        return None, None
+    return 1 - re[0], method
+
+
+def _integral_setup(args, w, backend, method, table, tol):
+    # Upper limit of the integral and the cdf, tabulated if `table`. Both are read
+    # from the active cache, if any, as the limit and the nodes of the table. The
+    # values of Davies' method are accurate to a tenth of the tolerance of the table,
+    # and those of the saddlepoint approximation to no absolute tolerance.
+    table_tol = _TABLE_TOL if tol is None else tol
+    atol = inf if method == "saddlepoint" else table_tol / 10
+
+    def compute():
+        u = _find_upper_bound(args, w)
+        x = y = zeros(0)
+        if table:
+            cdf = _cdf_table(u, *args, table_tol, atol)
+            if isinstance(cdf, _CDFTable):
+                x, y = cdf.nodes
+        return dict(u=u, x=x, y=y)
+
+    parts = args[:-1] + (w, backend, method, table, tol)
+    setup = _cache._cached("optimal", compute, *parts)
+    cdf = args[-1]
+    if len(setup["x"]) > 0:
+        cdf = _CDFTable.from_nodes(setup["x"], setup["y"], atol)
+    return float(setup["u"]), cdf
+
+
+def optimal_davies_pvalue_batch(
+    q,
+    mu,
+    var,
+    kur,
+    w,
+    remain_var,
+    df,
+    trho,
+    grid,
+    pmin=None,
+    factor=False,
+    backend="chi2comb",
+    method="davies",
+    threshold=1e-3,
+    return_info=False,
+):
+    r"""Optimal p-values of many statistics sharing one null distribution.
+
+    The rows of ``q`` are vectors qₘᵢₙ(𝜌ᵥ) that only differ by the data, such as
+    those of the permutations of a gene or of several phenotypes tested on it. All
+    the other parameters are shared. The distribution function of the mixture is
+    tabulated once, over the range reached by all of the rows, and the integrals of
+    the rows are computed together, blocks of rows at a time, by an adaptive
+    Gauss–Kronrod rule whose nodes, and the chi-squared density at them, are common
+    to all of them.
+
+    Parameters
+    ----------
+    q : array_like
+        Most significant of the independent test statistics, one row per test and
+        one column per value of the grid.
+    mu : float
+        Mean of the linear combination of the chi-squared distributions.
+    var : float
+        Variance of the linear combination of the chi-squared distributions.
+    kur : float
+        Kurtosis of the linear combination of the chi-squared distributions.
+    w : array_like
+        Weights of the linear combination.
+    remain_var : float
+        Remaining variance assigned to a Normal distribution.
+    df : float
+        Overall degrees of freedom.
+    trho : array_like
+        Weight between the combination of chi-squared distributions and independent
+        chi-squared distributions.
+    grid : array_like
+        Grid parameters.
+    pmin : float or array_like, optional
+        Boundary of the possible final p-values, shared or one per row. Defaults to
+        ``None``.
+    factor : bool, optional
+        ``True`` if ``w`` is a factor 𝙶 of the matrix whose eigenvalues are the
+        weights, 𝙶𝙶ᵀ. Defaults to ``False``.
+    backend : str, optional
+        Implementation of Davies' method, ``"chi2comb"`` or ``"numpy"``. Defaults to
+        ``"chi2comb"``.
+    method : str, optional
+        ``"davies"``, ``"saddlepoint"`` or ``"auto"``; see
+        :func:`optimal_davies_pvalue`. With ``"auto"``, only the rows whose p-value
+        estimated by Liu's approximation is below ``threshold`` are integrated.
+        Defaults to ``"davies"``.
+    threshold : float, optional
+        Screening threshold of ``method="auto"``. Defaults to ``1e-3``.
+    return_info : bool, optional
+        ``True`` to also return the method that produced each p-value. Defaults to
+        ``False``.
+
+    Returns
+    -------
+    ndarray
+        Estimated p-values, one per row of ``q``.
+    dict
+        Returned only if ``return_info=True``. ``tier`` holds, for each row,
+        ``"davies"``, ``"saddlepoint"``, or ``"liu"`` if its p-value comes from
+        Liu's approximation, either by screening or because its integral did not
+        converge.
+    """
+    if backend not in _BACKENDS:
+        raise ValueError(
+            "Unrecognized backend {}. Choose one of these: {}".format(
+                backend, _BACKENDS
+            )
+        )
+    if method not in _METHODS:
+        raise ValueError(
+            "Unrecognized method {}. Choose one of these: {}".format(method, _METHODS)
         )
-        pvalue = 1 - re[0]
-        if re[1] > 1e-6:
-            pvalue = _skat_liu_pvalue(
-                q, mu, var, kur, w, remain_var, df, trho, grid, pmin
+
+    q = atleast_2d(asarray(q, float))
+    if factor:
+        w = _spectrum(_as_float(w), True)
+    else:
+        w = asarray(w, float)
+    trho = asarray(trho, float)
+    grid = asarray(grid, float)
+    shared = (float(mu), float(var), float(kur), w, float(remain_var), float(df))
+    shared += (trho, grid)
+    liu = (float(mu), float(var), float(df), trho, grid)
+    if pmin is None:
+        bound = full(len(q), nan)
+    else:
+        bound = broadcast_to(asarray(pmin, float) * len(grid), (len(q),))
+
+    def bounded(pvalues):
+        return where(bound < abs(pvalues), bound, pvalues)
+
+    pvalues = full(len(q), nan)
+    tier = full(len(q), "liu", object)
+    todo = arange(len(q))
+    if method == "auto":
+        pvalues = bounded(_skat_liu_rows(q, *liu))
+        todo = flatnonzero(pvalues < threshold)
+        method = "davies"
+
+    if len(todo) > 0:
+        pvals, converged = _integrate_batch(q[todo], shared, backend, method)
+        if not converged.all():
+            _count("optimal_fallback", int((~converged).sum()))
+            pvals[~converged] = _skat_liu_rows(q[todo[~converged]], *liu)
+        pvalues[todo] = pvals
+        tier[todo[converged]] = method
+
+    pvalues = bounded(pvalues)
+    if return_info:
+        return pvalues, dict(tier=tier.astype(str))
+    return pvalues
+
+
+def _integrate_batch(q, shared, backend, method):
+    # P-values of the rows of q, by integration of the cdf of the mixture tabulated
+    # once for all of them, and whether each integral converged.
+    mu, var, kur, w, remain_var, df, trho, grid = shared
+    lambda_threshold = sum(w) * 10 ** 4
+    if method == "saddlepoint":
+        cdf = _SaddlepointCDF(w)
+    else:
+        cdf = _DaviesCDF(w, backend=backend, atol=_TABLE_TOL / 10)
+
+    # The mixture is nonnegative: its cdf vanishes where the standardized statistic
+    # is negative, from x = end onwards, where the integrals end.
+    alpha, beta, kinks = _envelope(q, trho, grid)
+    sd1 = sqrt(var - remain_var) / sqrt(var)
+    with errstate(divide="ignore", invalid="ignore"):
+        end = ((alpha - mu * (1 - 1 / sd1)) / beta).min(-1)
+    end = clip(end, 0.0, _UPPER)
+
+    pvalues = full(len(q), nan)
+    converged = zeros(len(q), bool)
+    args = (q, mu, var, kur, lambda_threshold, remain_var, df, trho, grid, cdf)
+    atol = inf if method == "saddlepoint" else _TABLE_TOL / 10
+    cdf = _cdf_table(end.max(), *args, _TABLE_TOL, atol)
+
+    args = (mu, var, lambda_threshold, remain_var, cdf)
+    for first in range(0, len(q), _ROWS):
+        rows = slice(first, first + _ROWS)
+        start = _start()
+        re = _rows_integral(alpha[rows], beta, kinks[rows], end[rows], *args)
+        _stop("integral", start, re[2]["neval"])
+        _count("integral_limit", int((~re[2]["converged"]).sum()))
+        pvalues[rows] = 1 - re[0]
+        converged[rows] = re[1] <= 1e-6
+    return pvalues, converged
+
+
+def _envelope(q, tau, r_all):
+    # For rows of statistics, min1 is the lower envelope of the lines
+    # (q - tau⋅x) / (1 - r) = alpha - beta⋅x, with kinks where two of them cross on
+    # it. Returns alpha, beta and the kinks, NaN for the crossings off the envelope.
+    with errstate(divide="ignore"):
+        inv = 1 / (1 - r_all)
+    alpha = where(r_all != 1.0, q * inv, inf)
+    beta = where(r_all != 1.0, tau * inv, 0.0)
+    with errstate(divide="ignore", invalid="ignore"):
+        rise = alpha[:, :, None] - alpha[:, None, :]
+        cross = rise / (beta[:, None] - beta[None, :])
+        cross = cross.reshape(len(q), -1)
+        env = (alpha[:, None, :] - beta * cross[..., None]).min(-1)
+        line = alpha.repeat(len(r_all), -1) - beta.repeat(len(r_all)) * cross
+        kinks = where(abs(line - env) <= 1e-9 * abs(env), cross, nan)
+    return alpha, beta, kinks
+
+
+def _rows_integral(alpha, beta, kinks, end, MuQ, VarQ, lambda_thr, VarRemain, cdf):
+    # Integrals of _davies_function from 0 to end for rows of statistics, on panels
+    # of their own. The kinks of min1 and the point from which the cdf is evaluated
+    # are where the integrands are not smooth: they break the intervals. The rows
+    # that evaluated the cdf where it could not be estimated get an infinite error.
+    sd1 = sqrt(VarQ - VarRemain) / sqrt(VarQ)
+    with errstate(divide="ignore", invalid="ignore"):
+        start = ((alpha - lambda_thr) / beta).min(-1)
+        points = [sqrt(concatenate([k, [s]])) for k, s in zip(kinks, start)]
+    failed = zeros(len(end), bool)
+
+    def integrand(t, i):
+        x = t ** 2
+        min1 = (alpha[i] - beta * x[:, None]).min(-1)
+        re = ones(len(x))
+        idx = flatnonzero(min1 <= lambda_thr)
+        cdf_re = cdf((min1[idx] - MuQ) * sd1 + MuQ)
+        re[idx] = maximum(cdf_re[0], 0)
+        failed[i[idx[cdf_re[1] != 0]]] = True
+        return re * sqrt(2 / pi) * exp(-x / 2)
+
+    # The change of variable x = t² removes the singularity of the chi-squared
+    # density at the origin, as in _davies_integral.
+    re = gauss_kronrod_many(
+        integrand, zeros(len(end)), sqrt(end), epsabs=_EPSABS_TABLE, points=points
+    )
+    re[1][failed] = inf
+    return re
+
+
+def _skat_liu_rows(q, MuQ, VarQ, Df, tau, r_all):
+    # _skat_liu_pvalue for rows of statistics, before its bound by pmin.
+    from scipy.special import chdtr
+
+    alpha, beta, kinks = _envelope(q, tau, r_all)
+    a = sqrt(2 * Df) / sqrt(VarQ)
+
+    def integrand(t, i):
+        x = t ** 2
+        min1 = (alpha[i] - beta * x[:, None]).min(-1)
+        with errstate(invalid="ignore"):
+            cdf = chdtr(Df, maximum(a * (min1 - MuQ) + Df, 0))
+        return cdf * sqrt(2 / pi) * exp(-x / 2)
+
+    start = _start()
+    with errstate(invalid="ignore"):
+        points = sqrt(kinks)
+    re = gauss_kronrod_many(
+        integrand, zeros(len(q)), full(len(q), sqrt(40.0)), _EPSABS, 2000, points
+    )
+    _stop("skat_liu", start, re[2]["neval"])
+    _count("integral_limit", int((~re[2]["converged"]).sum()))
+    return 1 - re[0]
+
+
+def optimal_davies_pvalue_many(
+    q,
+    mu,
+    var,
+    kur,
+    w,
+    remain_var,
+    df,
+    trho,
+    grid,
+    pmin=None,
+    factor=False,
+    backend="chi2comb",
+    integrator="quad",
+    table=False,
+    method="davies",
+    threshold=1e-3,
+    processes=None,
+    chunksize=None,
+    return_info=False,
+    rtol=None,
+):
+    r"""Optimal p-values of many independent problems, such as one per gene.
+
+    Each parameter is a sequence with one entry per problem: a list, or an array
+    stacked along its first axis. The problems are spread across a pool of worker
+    processes. A problem whose evaluation fails does not stop the others; its p-value
+    is set to NaN and its status reports the failure.
+
+    Parameters
+    ----------
+    q : sequence of array_like
+        Most significant of the independent test statistics of each problem.
+    mu : array_like
+        Means of the linear combinations of the chi-squared distributions.
+    var : array_like
+        Variances of the linear combinations of the chi-squared distributions.
+    kur : array_like
+        Kurtosis of the linear combinations of the chi-squared distributions.
+    w : sequence of array_like
+        Weights of the linear combinations, or their factors if ``factor=True``.
+    remain_var : array_like
+        Remaining variances assigned to Normal distributions.
+    df : array_like
+        Overall degrees of freedom.
+    trho : sequence of array_like
+        Weights between the combinations of chi-squared distributions and independent
+        chi-squared distributions.
+    grid : sequence of array_like
+        Grid parameters.
+    pmin : float or array_like, optional
+        Boundaries of the possible final p-values. Defaults to ``None``.
+    factor : bool, optional
+        ``True`` if the entries of ``w`` are factors; see
+        :func:`optimal_davies_pvalue`. Defaults to ``False``.
+    backend : str, optional
+        Implementation of Davies' method; see :func:`optimal_davies_pvalue`.
+        Defaults to ``"chi2comb"``.
+    integrator : str, optional
+        Integration rule; see :func:`optimal_davies_pvalue`. Defaults to ``"quad"``.
+    table : bool, optional
+        ``True`` to interpolate a table of the distribution function of each mixture;
+        see :func:`optimal_davies_pvalue`. Defaults to ``False``.
+    method : str, optional
+        ``"davies"``, ``"saddlepoint"`` or ``"auto"``; see
+        :func:`optimal_davies_pvalue`. Defaults to ``"davies"``.
+    threshold : float, optional
+        Screening threshold of ``method="auto"``. Defaults to ``1e-3``.
+    processes : int, optional
+        Number of worker processes. ``1`` evaluates the problems in the calling
+        process. Defaults to ``None``, the number of processors.
+    chunksize : int, optional
+        Number of problems sent to a worker at a time. Defaults to ``None``, splitting
+        the problems in about four chunks per worker.
+    return_info : bool, optional
+        ``True`` to also return the status of each problem. Defaults to ``False``.
+    rtol : float, optional
+        Relative accuracy targeted for the p-values; see
+        :func:`optimal_davies_pvalue`. Defaults to ``None``.
+
+    Returns
+    -------
+    ndarray
+        Estimated p-values, in input order.
+    dict
+        Returned only if ``return_info=True``. ``status`` holds, for each problem,
+        the method that produced its p-value, ``"davies"`` or ``"saddlepoint"``,
+        ``"liu"`` if the p-value fell back to Liu's approximation, or ``"error"`` if
+        it could not be computed, in which case ``message`` holds the reason.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from os import cpu_count
+
+    if integrator not in _INTEGRATORS:
+        raise ValueError(
+            "Unrecognized integrator {}. Choose one of these: {}".format(
+                integrator, _INTEGRATORS
+            )
+        )
+    if backend not in _BACKENDS:
+        raise ValueError(
+            "Unrecognized backend {}. Choose one of these: {}".format(
+                backend, _BACKENDS
             )
+        )
+    if method not in _METHODS:
+        raise ValueError(
+            "Unrecognized method {}. Choose one of these: {}".format(method, _METHODS)
+        )
 
-    except RuntimeError:
-        pvalue = _skat_liu_pvalue(q, mu, var, kur, w, remain_var, df, trho, grid, pmin)
+    params = [q, mu, var, kur, w, remain_var, df, trho, grid]
+    n = len(q)
+    if any(len(p) != n for p in params):
+        raise ValueError("All parameters must have one entry per problem.")
+    if pmin is None or ndim(pmin) == 0:
+        pmin = [pmin] * n
+    if processes is None:
+        processes = cpu_count() or 1
+    # Worker processes collect their own statistics, returned with their results,
+    # and use the cache of the calling process.
+    profiled = processes != 1 and len(_profile._active) > 0
+    store = _cache._active[-1] if processes != 1 and _cache._active else None
+    options = (factor, backend, integrator, table, method, threshold, rtol)
+    items = [p + (m, options, profiled, store) for p, m in zip(zip(*params), pmin)]
 
-    if pmin is not None:
-        if pmin * len(grid) < abs(pvalue):
-            pvalue = pmin * len(grid)
-    return pvalue
+    if processes == 1:
+        results = list(map(_optimal_item, items))
+    else:
+        if chunksize is None:
+            chunksize = max(n // (4 * processes), 1)
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_optimal_item, items, chunksize=chunksize))
+
+    for r in results:
+        if r[3] is not None:
+            for stats in _profile._active:
+                stats.update(r[3])
+
+    pvalues = asarray([r[0] for r in results], float)
+    if return_info:
+        status = asarray([r[1] for r in results])
+        return pvalues, dict(status=status, message=[r[2] for r in results])
+    return pvalues
+
+
+def _optimal_item(item):
+    *params, pmin, options, profiled, store = item
+    if store is not None:
+        with _cache.cache(store.path, store.max_size):
+            return _optimal_item(tuple(params) + (pmin, options, profiled, None))
+    if profiled:
+        with _profile.profile() as stats:
+            re = _optimal_item(tuple(params) + (pmin, options, False, None))
+        return re[:3] + (stats,)
+    try:
+        pvalue, method = _optimal_davies_pvalue(*params, pmin, *options)
+    except Exception as e:
+        return nan, "error", "{}: {}".format(type(e).__name__, e), None
+    return pvalue, method, None, None
 
 
 def _skat_liu_pvalue(
-    pmin_q, MuQ, VarQ, KerQ, lambda_, VarRemain, Df, tau, r_all, pmin=None
+    pmin_q,
+    MuQ,
+    VarQ,
+    KerQ,
+    lambda_,
+    VarRemain,
+    Df,
+    tau,
+    r_all,
+    pmin=None,
+    integrator="quad",
 ):
-    args = (pmin_q, MuQ, VarQ, KerQ, lambda_, VarRemain, Df, tau, r_all)
-    re = quad(_skat_liu_func, 0, 40, args, limit=2000, epsabs=_EPSABS, full_output=1)
+    # The integrand only depends on x through tau⋅x, so everything else is computed
+    # once: min((q - tau⋅x) / (1 - r)) is mapped onto the chi-squared scale as
+    # a⋅min(...) + b.
+    from scipy.integrate import quad
+
+    start = _start()
+    with errstate(divide="ignore"):
+        inv = 1 / (1 - r_all)
+    a = sqrt(2 * Df) / sqrt(VarQ)
+    args = (pmin_q, tau, inv, a, Df - MuQ * a, Df)
+
+    if integrator == "quad":
+        re = quad(
+            _skat_liu_func, 0, 40, args, limit=2000, epsabs=_EPSABS, full_output=1
+        )
+    else:
+
+        def integrand(t):
+            return _skat_liu_cdf(t ** 2, *args) * sqrt(2 / pi) * exp(-(t ** 2) / 2)
+
+        re = gauss_kronrod(integrand, 0, sqrt(40), epsabs=_EPSABS, limit=2000)
+    _stop("skat_liu", start, re[2]["neval"])
+    _count("integral_limit", _not_converged(re))
 
     pvalue = 1 - re[0]
 
@@ -92,36 +760,214 @@ def _skat_liu_pvalue(
     return pvalue
 
 
-def _find_upper_bound(args):
-    v = 0
-    u = 80.0
-    imax = 1000
-    while v <= 1e-14 and imax > 0:
-        u /= 2
-        v = _davies_function(u, *args)
-        imax -= 1
+def _find_upper_bound(args, w):
+    # Twice the largest of u = 40, 20, 10, ... at which the integrand exceeds 1e-14.
+    # The integrand is the cdf of the mixture weighted by w, evaluated at the
+    # standardized min1, times the chi-squared density; both decrease with u.
+    # Chernoff's bound on the cdf rules out, with no evaluation of it, the candidates
+    # at which even the bound keeps the integrand below 1e-14. Above lambda_thr the
+    # integrand is the density itself. The cdf is evaluated at the other candidates,
+    # from the largest down, until the integrand exceeds 1e-14.
+    pmin_q, MuQ, VarQ, KerQ, lambda_thr, VarRemain, Df, tau, r_all, cdf = args
+    u = 80.0 / 2.0 ** arange(1, 1001)
+    v = _chi2_df1_pdf(u)
+    min1 = _min1(u, pmin_q, tau, r_all)
+    sd1 = sqrt(VarQ - VarRemain) / sqrt(VarQ)
+    z = (min1 - MuQ) * sd1 + MuQ
+    evaluate = min1 <= lambda_thr
+    bound = v.copy()
+    bound[evaluate] *= _chernoff_cdf(z[evaluate], w)
+
+    start = _start()
+    neval = 0
+    for i in flatnonzero(bound > 1e-14):
+        if evaluate[i]:
+            neval += 1
+            dav_re = cdf(z[i : i + 1])
+            if dav_re[1][0] != 0:
+                msg = "Could not estimate the cdf value: {}".format(str(dav_re))
+                raise RuntimeError(msg)
+            v[i] *= max(dav_re[0][0], 0)
+        if v[i] > 1e-14:
+            _stop("upper_bound", start, neval)
+            return float(u[i] * 2)
+
+    raise RuntimeError("Could not find an upper bound.")
+
+
+class _CachedCDF(object):
+    # Remembers the values of a cdf, so that the points evaluated while searching
+    # for the upper bound are not evaluated again.
+
+    def __init__(self, cdf):
+        self._cdf = cdf
+        self._memo = {}
+
+    def __call__(self, Q):
+        Q = atleast_1d(Q).tolist()
+        new = [q for q in dict.fromkeys(Q) if q not in self._memo]
+        if len(new) > 0:
+            cdf, errno = self._cdf(asarray(new))
+            self._memo.update(zip(new, zip(cdf.tolist(), errno.tolist())))
+        re = [self._memo[q] for q in Q]
+        return asarray([r[0] for r in re]), asarray([r[1] for r in re], int)
+
+
+def _cdf_table(
+    u,
+    pmin_q,
+    MuQ,
+    VarQ,
+    KerQ,
+    lambda_thr,
+    VarRemain,
+    Df,
+    tau,
+    r_all,
+    cdf,
+    tol=1e-7,
+    atol=None,
+):
+    # The integrand only evaluates the cdf between the standardized statistics
+    # reached at x = u and at x = 0, capped by the threshold above which it is not
+    # evaluated, and over all of those ranges for rows of statistics.
+    min1 = minimum(_min1(asarray([u, 0.0]), pmin_q, tau, r_all), lambda_thr)
+    sd1 = sqrt(VarQ - VarRemain) / sqrt(VarQ)
+    z = (min1 - MuQ) * sd1 + MuQ
+    a, b = z[..., 0].min(), z[..., 1].max()
+    if not a < b:
+        return cdf
+    return _CDFTable(cdf, a, b, tol, atol)
+
+
+class _CDFTable(object):
+    # Distribution function interpolated by a monotone piecewise cubic over [a, b].
+    # Intervals are bisected until the interpolant predicts the value at their
+    # midpoint within tol, or until they are too narrow for the accuracy of the
+    # tabulated values to tell. Those checks only estimate the error of the table;
+    # `bound` guarantees it, given values of cdf within atol of the distribution
+    # function F, a tenth of tol by default. On each interval, the interpolant stays
+    # between the values at its ends, and F, nondecreasing, between the exact values
+    # there: they differ by at most the difference of the values plus 2⋅atol.
+    #
+    # The nodes where the cdf could not be estimated, and the midpoints of the
+    # intervals left unrefined once the table holds maxsize nodes, are NaN. The
+    # table gives an error code of 1 on the intervals either side of them.
+
+    def __init__(self, cdf, a, b, tol=1e-7, atol=None, size=33, maxsize=2 ** 13):
+        start = _start()
+        self.atol = tol / 10 if atol is None else atol
+        x = linspace(a, b, size)
+        y = _tabulate(cdf, x)
+        todo = ~isnan(y[:-1]) & ~isnan(y[1:])
+        while todo.any():
+            idx = flatnonzero(todo)
+            mid = (x[idx] + x[idx + 1]) / 2
+            if len(x) + len(idx) > maxsize:
+                x = insert(x, idx + 1, mid)
+                y = insert(y, idx + 1, nan)
+                break
+            ymid = _tabulate(cdf, mid)
+            self._fit(x, y)
+            err = abs(self._interp(mid) - ymid)
+
+            split = zeros(len(todo), bool)
+            split[idx] = (err > tol) & (x[idx + 1] - x[idx] > (b - a) * 2 ** -20)
+            todo = repeat(split, where(todo, 2, 1))
+            x = insert(x, idx + 1, mid)
+            y = insert(y, idx + 1, ymid)
+
+        _stop("cdf_table", start, len(x))
+        _count("cdf_table_failed", int(isnan(y).sum()))
+        self._fit(x, y)
+
+    @classmethod
+    def from_nodes(cls, x, y, atol):
+        # Table interpolating nodes tabulated before, to atol.
+        table = cls.__new__(cls)
+        table.atol = atol
+        table._fit(asarray(x), asarray(y))
+        return table
+
+    def _fit(self, x, y):
+        from scipy.interpolate import PchipInterpolator
+
+        ok = ~isnan(y)
+        self._a = x[0]
+        self._b = x[-1]
+        self._interp = None
+        if ok.sum() > 1:
+            self._interp = PchipInterpolator(x[ok], y[ok])
+        # Over the intervals the table gives values for, between two valid nodes.
+        step = abs(diff(y))
+        step = step[~isnan(step)]
+        self.bound = float(step.max()) + 2 * self.atol if len(step) > 0 else inf
+        self.nodes = (x, y)
+
+    def __call__(self, Q):
+        Q = clip(atleast_1d(Q), self._a, self._b)
+        x, y = self.nodes
+        j = clip(searchsorted(x, Q, "right"), 1, len(x) - 1)
+        errno = (isnan(y[j - 1]) | isnan(y[j])).astype(int)
+        if self._interp is None:
+            return zeros(len(Q)), errno
+        return self._interp(Q), errno
+
 
-    if imax == 0:
-        raise RuntimeError("Could not find an upper bound.")
-    return u * 2
+def _tabulate(cdf, x):
+    # Values of the cdf, NaN where it could not be estimated.
+    y, errno = cdf(x)
+    return where(errno == 0, y, nan)
+
+
+def _min1(x, pmin_q, tau, r_all):
+    # Rows of statistics, in pmin_q, give rows of results.
+    temp = pmin_q[..., None, :] - tau * x[:, None]
+    temp = divide(temp, 1 - r_all, out=full(temp.shape, inf), where=r_all != 1.0)
+    return temp.min(-1)
+
+
+def _davies_integral(args, u, epsabs=_EPSABS):
+    # The change of variable x = t² removes the singularity of the chi-squared
+    # density at the origin: f(t²)⋅2t = 2𝜙(t).
+    def integrand(t):
+        return _davies_cdf_vec(t ** 2, *args) * sqrt(2 / pi) * exp(-(t ** 2) / 2)
+
+    return gauss_kronrod(integrand, 0, sqrt(u), epsabs=epsabs, limit=1000)
 
 
 def _davies_function_vec(
-    x, pmin_q, MuQ, VarQ, KerQ, lambda_, VarRemain, Df, tau, r_all
+    x, pmin_q, MuQ, VarQ, KerQ, lambda_thr, VarRemain, Df, tau, r_all, cdf
 ):
-    y = []
-    for xi in x:
-        y.append(
-            _davies_function(
-                xi, pmin_q, MuQ, VarQ, KerQ, lambda_, VarRemain, Df, tau, r_all
-            )
-        )
+    args = (pmin_q, MuQ, VarQ, KerQ, lambda_thr, VarRemain, Df, tau, r_all, cdf)
+    x = asarray(x, float)
+    return _davies_cdf_vec(x, *args) * _chi2_df1_pdf(x)
 
-    return asarray(y, float)
+
+def _davies_cdf_vec(
+    x, pmin_q, MuQ, VarQ, KerQ, lambda_thr, VarRemain, Df, tau, r_all, cdf
+):
+    # Factor multiplying the chi-squared density in _davies_function, evaluated at
+    # every point of x at once.
+    min1 = _min1(x, pmin_q, tau, r_all)
+
+    re = ones(min1.shape)
+    idx = min1 <= lambda_thr
+    if idx.any():
+        sd1 = sqrt(VarQ - VarRemain) / sqrt(VarQ)
+        min1_st = (min1[idx] - MuQ) * sd1 + MuQ
+
+        dav_re = cdf(min1_st)
+        if (dav_re[1] != 0).any():
+            msg = "Could not estimate the cdf value: {}".format(str(dav_re))
+            raise RuntimeError(msg)
+        re[idx] = maximum(dav_re[0], 0)
+
+    return re
 
 
 def _davies_function(
-    x, pmin_q, MuQ, VarQ, KerQ, lambda_thr, VarRemain, Df, tau, r_all, chi2s
+    x, pmin_q, MuQ, VarQ, KerQ, lambda_thr, VarRemain, Df, tau, r_all, cdf
 ):
     temp1 = tau * x
 
@@ -139,7 +985,7 @@ def _davies_function(
         sd1 = sqrt(VarQ - VarRemain) / sqrt(VarQ)
         min1_st = min1_temp * sd1 + MuQ
 
-        dav_re = chi2comb_cdf(min1_st, chi2s, 0.0, lim=10000, atol=10 ** -5)
+        dav_re = [v[0] for v in cdf(min1_st)]
 
         temp = 1 - dav_re[0]
         if dav_re[1] != 0:
@@ -153,19 +999,29 @@ def _davies_function(
     return re
 
 
+def _not_converged(re):
+    # Whether quad, with full_output, or gauss_kronrod stopped before converging.
+    if isinstance(re[2], dict) and "converged" in re[2]:
+        return int(not re[2]["converged"])
+    return int(len(re) > 3)
+
+
 def _chi2_df1_pdf(x):
     # gammaln(1 / 2.0) + log(2) / 2.0
     a = 0.918938533204672669540968854562
     return exp(-0.5 * log(x) - x / 2.0 - a)
 
 
-def _skat_liu_func(x, pmin_q, MuQ, VarQ, KerQ, lambda_, VarRemain, Df, tau, r_all):
+def _skat_liu_func(x, pmin_q, tau, inv, a, b, Df):
+    return _skat_liu_cdf(x, pmin_q, tau, inv, a, b, Df) * _chi2_df1_pdf(x)
 
-    temp1 = tau * x
-
-    temp = (pmin_q - temp1) / (1 - r_all)
-    temp_min = min(temp)
 
-    temp_q = (temp_min - MuQ) / sqrt(VarQ) * sqrt(2 * Df) + Df
+def _skat_liu_cdf(x, pmin_q, tau, inv, a, b, Df):
+    # Accepts a scalar or a vector of points.
+    from scipy.special import chdtr
 
-    return chi2(df=Df).cdf(temp_q) * chi2(df=1).pdf(x)
+    x = asarray(x, float)
+    temp = (pmin_q - tau * x[..., None]) * inv
+    with errstate(invalid="ignore"):
+        temp_q = a * temp.min(-1) + b
+        return chdtr(Df, maximum(temp_q, 0))
@@ -0,0 +1,132 @@
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+
+# Statistics of the profile() contexts being entered. While it is empty, the
+# instrumented stages only pay for testing it.
+_active = []
+
+
+@contextmanager
+def profile():
+    """
+    Collect call counts and timings of the hot stages of the computations run inside
+    the context.
+
+    The stages are recorded under these names:
+
+    - ``davies_cdf``: evaluations of Davies' method, one item per statistic.
+    - ``davies_error``: statistics for which Davies' method reported an error.
+    - ``saddlepoint``: evaluations of the saddlepoint approximation.
+    - ``liu_fallback``: p-values replaced by Liu's approximation because Davies' or
+      the saddlepoint method failed.
+    - ``upper_bound``: searches for the upper limit of the optimal integral, one
+      item per evaluation of the cdf.
+    - ``cdf_table``: tabulations of the cdf, one item per tabulated point.
+    - ``cdf_table_failed``: points of the tables where the cdf could not be
+      estimated or the refinement stopped short.
+    - ``integral``: integrations of the optimal p-value, one item per evaluation of
+      the integrand.
+    - ``integral_limit``: integrations that did not converge within their limit.
+    - ``skat_liu``: integrations of the Liu approximation of the optimal p-value.
+    - ``optimal_fallback``: optimal p-values that fell back to it.
+    - ``montecarlo``: Monte Carlo estimates, one item per sample drawn.
+    - ``cache_hit`` and ``cache_miss``: lookups in the directory of :func:`cache`.
+
+    Recording costs essentially nothing outside of the context. Computations run
+    by the worker processes of :func:`optimal_davies_pvalue_many` are included.
+
+    Returns
+    -------
+    Profile
+        Statistics, filled in while the context runs.
+
+    Example
+    -------
+
+    .. doctest::
+
+        >>> from chiscore import davies_pvalue_batch, profile
+        >>>
+        >>> with profile() as stats:
+        ...     pvals = davies_pvalue_batch([1.0, 3.0], [[0.5, 0.1], [0.1, 0.4]])
+        >>> stats.items["davies_cdf"]
+        2
+    """
+    stats = Profile()
+    _active.append(stats)
+    try:
+        yield stats
+    finally:
+        _active.remove(stats)
+
+
+class Profile(object):
+    """
+    Statistics collected by :func:`profile`.
+
+    Attributes
+    ----------
+    calls : dict
+        Number of times each stage was entered.
+    items : dict
+        Number of items each stage processed, such as statistics or integrand
+        evaluations.
+    seconds : dict
+        Time spent in each stage. Stages that only count events have none.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.items = {}
+        self.seconds = {}
+        self._lock = Lock()
+
+    def add(self, stage, items=1, seconds=None, calls=1):
+        with self._lock:
+            self.calls[stage] = self.calls.get(stage, 0) + calls
+            self.items[stage] = self.items.get(stage, 0) + items
+            if seconds is not None:
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def update(self, other):
+        for stage in other.calls:
+            seconds = other.seconds.get(stage)
+            self.add(stage, other.items[stage], seconds, other.calls[stage])
+
+    def __repr__(self):
+        row = "{:<18} {:>10} {:>12} {:>12}"
+        lines = [row.format("stage", "calls", "items", "seconds")]
+        for stage in sorted(self.calls):
+            calls, items = self.calls[stage], self.items[stage]
+            seconds = self.seconds.get(stage)
+            seconds = "" if seconds is None else "{:.4g}".format(seconds)
+            lines.append(row.format(stage, calls, items, seconds))
+        return "\n".join(lines)
+
+    def __getstate__(self):
+        return (self.calls, self.items, self.seconds)
+
+    def __setstate__(self, state):
+        self.calls, self.items, self.seconds = state
+        self._lock = Lock()
+
+
+def _start():
+    # Start time of a stage, or None while nothing is collected.
+    if _active:
+        return perf_counter()
+    return None
+
+
+def _stop(stage, start, items=1):
+    if start is not None:
+        seconds = perf_counter() - start
+        for stats in _active:
+            stats.add(stage, items, seconds)
+
+
+def _count(stage, items=1):
+    if _active and items > 0:
+        for stats in _active:
+            stats.add(stage, items)
@@ -0,0 +1,381 @@
+"""
+Davies' method [1] for the distribution of a linear combination of chi-squared
+variables, evaluated at many points at once.
+
+The integration parameters of the algorithm depend on the evaluation point only
+through the convergence factor and the integration interval. Points are therefore
+integrated together on a shared grid, taking the most conservative of those
+parameters, and the characteristic function is evaluated once per grid node for all
+of them.
+
+References
+----------
+[1] Davies, Robert B. "Algorithm AS 155: The distribution of a linear combination of
+    χ² random variables." Journal of the Royal Statistical Society. Series C (Applied
+    Statistics) 29.3 (1980): 323-333.
+"""
+from math import floor, pi
+
+from numpy import (
+    arange,
+    arctan,
+    argsort,
+    asarray,
+    atleast_1d,
+    exp,
+    full,
+    log,
+    log1p,
+    ones_like,
+    sin,
+    sqrt,
+    where,
+    zeros,
+    zeros_like,
+)
+
+_LOG28 = 0.0866
+_BLOCK = 2 ** 20
+
+
+class _CountError(Exception):
+    pass
+
+
+def qf(q, lambs, dofs=None, deltas=None, sigma=0.0, lim=10000, atol=1e-6):
+    """
+    Cumulative distribution function of 𝑋 = ∑λᵢχ²(hᵢ, 𝛿ᵢ) + 𝜎𝑍 at many points.
+
+    Parameters
+    ----------
+    q : array_like
+        Points at which the cdf is evaluated, Pr(𝑋 < 𝑞).
+    lambs : array_like
+        Weights λᵢ.
+    dofs : array_like, optional
+        Degrees of freedom hᵢ. Defaults to ones.
+    deltas : array_like, optional
+        Noncentrality parameters 𝛿ᵢ. Defaults to zeros.
+    sigma : float, optional
+        Coefficient 𝜎 of the standard normal variable 𝑍. Defaults to ``0``.
+    lim : int, optional
+        Maximum number of integration terms. Defaults to ``10000``.
+    atol : float, optional
+        Absolute error tolerance. Defaults to ``1e-6``.
+
+    Returns
+    -------
+    cdf : ndarray
+        Estimated cdf values.
+    errno : ndarray
+        Error codes, as defined in [1]: ``0`` for success, ``1`` if the required
+        accuracy was not achieved, ``2`` if round-off error is possibly significant,
+        ``3`` for invalid parameters, and ``4`` if the integration parameters could
+        not be located.
+    """
+    q = asarray(atleast_1d(q), float).ravel()
+    lambs = asarray(lambs, float).ravel()
+    dofs = ones_like(lambs) if dofs is None else asarray(dofs, float).ravel()
+    deltas = zeros_like(lambs) if deltas is None else asarray(deltas, float).ravel()
+
+    cdf = full(len(q), -1.0)
+    errno = zeros(len(q), int)
+
+    if any(dofs < 0) or any(deltas < 0):
+        errno[:] = 3
+        return cdf, errno
+
+    qf_ = _QF(lambs, dofs, deltas, float(sigma), int(lim))
+    if qf_.sd == 0.0:
+        cdf[:] = q > 0.0
+        return cdf, errno
+
+    if qf_.lmin == 0.0 and qf_.lmax == 0.0 and sigma == 0.0:
+        errno[:] = 3
+        return cdf, errno
+
+    # The convergence factor is only tried away from the origin, where its error
+    # bound is finite.
+    zero = q == 0.0
+    for mask in [zero, ~zero]:
+        idx = where(mask)[0]
+        if len(idx) > 0:
+            _solve(qf_, q, idx, float(atol), cdf, errno)
+
+    return cdf, errno
+
+
+def _solve(qf_, q, idx, atol, cdf, errno):
+    # Integrates the points in idx together. Points that could not be integrated
+    # within the limits of the shared grid are split in two groups, each given its
+    # own grid, until single points are reached.
+    try:
+        cdf[idx], errno[idx] = qf_.copy().run(q[idx], atol)
+    except _CountError:
+        errno[idx] = 4
+
+    bad = idx[(errno[idx] == 1) | (errno[idx] == 4)]
+    if len(idx) > 1 and len(bad) > 0:
+        bad = bad[argsort(q[bad], kind="stable")]
+        half = (len(bad) + 1) // 2
+        _solve(qf_, q, bad[:half], atol, cdf, errno)
+        if half < len(bad):
+            _solve(qf_, q, bad[half:], atol, cdf, errno)
+
+
+class _QF(object):
+    def __init__(self, lb, n, nc, sigma, lim):
+        self.lb = lb
+        self.n = n
+        self.nc = nc
+        self.lim = lim
+        self.count = 0
+        self.sigsq = sigma ** 2
+        self.th = argsort(-abs(lb), kind="stable")
+
+        self.sd = sqrt(self.sigsq + sum(lb ** 2 * (2 * n + 4 * nc)))
+        self.mean = sum(lb * (n + nc))
+        self.lmax = max(lb.max(), 0.0)
+        self.lmin = min(lb.min(), 0.0)
+
+    def copy(self):
+        other = _QF.__new__(_QF)
+        other.__dict__.update(self.__dict__)
+        return other
+
+    def counter(self):
+        self.count += 1
+        if self.count > self.lim:
+            raise _CountError()
+
+    def errbd(self, u):
+        # Bound on the tail probability of the distribution.
+        self.counter()
+        xconst = u * self.sigsq
+        sum1 = u * xconst
+        u = 2.0 * u
+        x = u * self.lb
+        y = 1.0 - x
+        xconst += sum(self.lb * (self.nc / y + self.n) / y)
+        sum1 += sum(self.nc * (x / y) ** 2 + self.n * (x ** 2 / y + log1p(-x) + x))
+        return _exp1(-0.5 * sum1), xconst
+
+    def ctff(self, accx, u2):
+        # Cut-off point beyond which the tail probability is below accx.
+        u1 = 0.0
+        c1 = self.mean
+        rb = 2.0 * (self.lmax if u2 > 0.0 else self.lmin)
+        e, c2 = self.errbd(u2 / (1.0 + u2 * rb))
+        while e > accx:
+            u1 = u2
+            c1 = c2
+            u2 = 2.0 * u2
+            e, c2 = self.errbd(u2 / (1.0 + u2 * rb))
+        while (c1 - self.mean) / (c2 - self.mean) < 0.9:
+            u = (u1 + u2) / 2.0
+            e, xconst = self.errbd(u / (1.0 + u * rb))
+            if e > accx:
+                u1 = u
+                c1 = xconst
+            else:
+                u2 = u
+                c2 = xconst
+        return c2, u2
+
+    def truncation(self, u, tausq):
+        # Bound on the integration error due to truncation at u.
+        self.counter()
+        sum2 = (self.sigsq + tausq) * u ** 2
+        u = 2.0 * u
+        x = (u * self.lb) ** 2
+        big = x > 1.0
+        sum1 = 0.5 * sum(self.nc * x / (1.0 + x))
+        prod1 = 2.0 * sum2 + sum(self.n[~big] * log1p(x[~big]))
+        prod2 = prod1 + sum(self.n[big] * log(x[big]))
+        prod3 = prod1 + sum(self.n[big] * log1p(x[big]))
+        s = sum(self.n[big])
+
+        x = _exp1(-sum1 - 0.25 * prod2) / pi
+        y = _exp1(-sum1 - 0.25 * prod3) / pi
+        err1 = 1.0 if s == 0 else x * 2.0 / s
+        err2 = 2.5 * y if prod3 > 1.0 else 1.0
+        err1 = min(err1, err2)
+        x = 0.5 * sum2
+        err2 = 1.0 if x <= y else y / x
+        return min(err1, err2)
+
+    def findu(self, ut, accx):
+        # Truncation point achieving the accuracy accx.
+        u = ut / 4.0
+        if self.truncation(u, 0.0) > accx:
+            u = ut
+            while self.truncation(u, 0.0) > accx:
+                ut *= 4.0
+                u = ut
+        else:
+            ut = u
+            u = u / 4.0
+            while self.truncation(u, 0.0) <= accx:
+                ut = u
+                u = u / 4.0
+        for divis in [2.0, 1.4, 1.2, 1.1]:
+            u = ut / divis
+            if self.truncation(u, 0.0) <= accx:
+                ut = u
+        return ut
+
+    def cfe(self, c):
+        # Bound on the error due to the convergence factor, one value per point.
+        self.counter()
+        axl = abs(c)
+        sxl = where(c > 0.0, 1.0, -1.0)
+        sum1 = zeros(len(c))
+        done = zeros(len(c), bool)
+        for j in range(len(self.lb) - 1, -1, -1):
+            t = self.th[j]
+            active = ~done & (self.lb[t] * sxl > 0.0)
+            if not any(active):
+                continue
+            lj = abs(self.lb[t])
+            axl1 = axl - lj * (self.n[t] + self.nc[t])
+            axl2 = lj / _LOG28
+            go = active & (axl1 > axl2)
+            stop = active & ~go
+            axl = where(go, axl1, axl)
+            if any(stop):
+                rest = sum(self.n[self.th[:j]] + self.nc[self.th[:j]])
+                axl = where(stop & (axl > axl2), axl2, axl)
+                sum1 = where(stop, (axl - axl1) / lj + rest, sum1)
+                done |= stop
+        fail = sum1 > 100.0
+        return where(fail, 1.0, 2.0 ** (sum1 / 4.0) / (pi * axl ** 2)), fail
+
+    def integrate(self, c, nterm, interv, tausq, mainx):
+        # Contributions of nterm + 1 grid nodes to every point. The points only shift
+        # the phase of the characteristic function, so each node is evaluated once for
+        # all of them.
+        intl = zeros(len(c))
+        ersm = zeros(len(c))
+        inpi = interv / pi
+        nblock = max(_BLOCK // len(self.lb), 1)
+        cblock = max(_BLOCK // nblock, 1)
+        for start in range(0, nterm + 1, nblock):
+            u = (arange(start, min(start + nblock, nterm + 1)) + 0.5) * interv
+            x = 2.0 * u[:, None] * self.lb
+            y = x ** 2
+            sum3 = -0.5 * self.sigsq * u ** 2 - 0.25 * (log1p(y) @ self.n)
+            y = self.nc * x / (1.0 + y)
+            z = self.n * arctan(x) + y
+            sum1 = z.sum(1)
+            sum2 = abs(z).sum(1)
+            sum3 -= 0.5 * (x * y).sum(1)
+
+            amp = inpi * _exp1(sum3) / u
+            if not mainx:
+                amp *= 1.0 - _exp1(-0.5 * tausq * u ** 2)
+
+            for i in range(0, len(c), cblock):
+                phase = 0.5 * sum1 - c[i : i + cblock, None] * u
+                intl[i : i + cblock] += sin(phase) @ amp
+            ersm += abs(c) * (u @ amp) + 0.5 * (sum2 @ amp)
+        return intl, ersm
+
+    def run(self, c, acc):
+        self.intl = zeros(len(c))
+        self.ersm = zeros(len(c))
+        cdf = full(len(c), -1.0)
+        errno = zeros(len(c), int)
+        todo = ones_like(c, bool)
+
+        acc1 = acc
+        xlim = float(self.lim)
+        almx = max(self.lmax, -self.lmin)
+        utx = 16.0 / self.sd
+        up = 4.5 / self.sd
+        un = -up
+
+        # Truncation point with no convergence factor.
+        utx = self.findu(utx, 0.5 * acc1)
+
+        # Does the convergence factor help?
+        if all(c != 0.0) and almx > 0.07 * self.sd:
+            bound, fail = self.cfe(c)
+            if not any(fail):
+                tausq = 0.25 * acc1 / bound.max()
+                if self.truncation(utx, tausq) < 0.2 * acc1:
+                    self.sigsq += tausq
+                    utx = self.findu(utx, 0.25 * acc1)
+        acc1 = 0.5 * acc1
+
+        while True:
+            # Find the range of the distribution, settling the points outside it.
+            cu, up = self.ctff(acc1, up)
+            cdf[todo & (c > cu)] = 1.0
+            todo &= c <= cu
+            cl, un = self.ctff(acc1, un)
+            cdf[todo & (c < cl)] = 0.0
+            todo &= c >= cl
+            if not any(todo):
+                return cdf, errno
+
+            # Integration interval, the finest required by the remaining points.
+            ct = c[todo]
+            intv = 2.0 * pi / max((cu - ct).max(), (ct - cl).max())
+
+            # Number of terms required for main and auxiliary integrations.
+            xnt = utx / intv
+            xntm = 3.0 / sqrt(acc1)
+            if xnt <= xntm * 1.5:
+                break
+
+            if xntm > xlim:
+                errno[todo] = 1
+                return cdf, errno
+
+            ntm = int(floor(xntm + 0.5))
+            intv1 = utx / ntm
+            x = 2.0 * pi / intv1
+            if x <= abs(ct).max():
+                break
+
+            # Convergence factor for the auxiliary integration.
+            bound1, fail1 = self.cfe(ct - x)
+            bound2, fail2 = self.cfe(ct + x)
+            if any(fail1 | fail2):
+                break
+            tausq = 0.33 * acc1 / (1.1 * (bound1 + bound2).max())
+
+            acc1 = 0.67 * acc1
+            intl, ersm = self.integrate(ct, ntm, intv1, tausq, False)
+            self.intl[todo] += intl
+            self.ersm[todo] += ersm
+            xlim -= xntm
+            self.sigsq += tausq
+
+            # Truncation point with the new convergence factor.
+            utx = self.findu(utx, 0.25 * acc1)
+            acc1 = 0.75 * acc1
+
+        # Main integration.
+        if xnt > xlim:
+            errno[todo] = 1
+            return cdf, errno
+
+        nt = int(floor(xnt + 0.5))
+        intl, ersm = self.integrate(c[todo], nt, intv, 0.0, True)
+        self.intl[todo] += intl
+        self.ersm[todo] += ersm
+        cdf[todo] = 0.5 - self.intl[todo]
+
+        # Test whether round-off error could be significant, allowing for radix 8
+        # or 16 machines.
+        up = self.ersm
+        x = up + acc / 10.0
+        for rat in [1.0, 2.0, 4.0, 8.0]:
+            errno[todo & (rat * x == rat * up)] = 2
+
+        return cdf, errno
+
+
+def _exp1(x):
+    return where(x < -50.0, 0.0, exp(x))
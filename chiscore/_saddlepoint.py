@@ -0,0 +1,222 @@
+from numpy import (
+    abs,
+    arange,
+    asarray,
+    atleast_1d,
+    errstate,
+    exp,
+    expm1,
+    finfo,
+    flatnonzero,
+    full,
+    isfinite,
+    log,
+    log1p,
+    minimum,
+    ones_like,
+    pi,
+    sign,
+    sqrt,
+    sum,
+    where,
+    zeros,
+)
+
+from ._profile import _start, _stop
+
+
+def saddlepoint_sf(t, lambs, dofs=None, deltas=None, log=False):
+    """
+    Saddlepoint approximation to linear combination of noncentral chi-squared
+    variables.
+
+    Let
+
+        𝑋 = ∑λᵢχ²(hᵢ, 𝛿ᵢ)
+
+    be a linear combination of noncentral chi-squared random variables with positive
+    weights λᵢ. Its cumulant generating function is
+
+        𝐾(𝑠) = ∑ -hᵢ/2⋅log(1 - 2λᵢ𝑠) + 𝛿ᵢλᵢ𝑠/(1 - 2λᵢ𝑠).
+
+    The saddlepoint 𝑠̂ solves 𝐾′(𝑠̂) = 𝑡, and the Lugannani–Rice formula [1, 2]
+
+        Pr(𝑋 > 𝑡) ≈ 1 - Φ(𝑤) + 𝜙(𝑤)(1/𝑣 - 1/𝑤),
+
+    with 𝑤 = sign(𝑠̂)√(2(𝑠̂𝑡 - 𝐾(𝑠̂))) and 𝑣 = 𝑠̂√𝐾″(𝑠̂), keeps a small relative
+    error far into the upper tail. Written in terms of the Mills ratio, its logarithm
+    is finite well below the smallest representable probability.
+
+    Parameters
+    ----------
+    t : array_like
+        Points at which the survival function will be applied, Pr(𝑋 > 𝑡).
+    lambs : array_like
+        Positive weights λᵢ.
+    dofs : array_like, optional
+        Degrees of freedom, hᵢ. Defaults to ``None``, one degree each.
+    deltas : array_like, optional
+        Noncentrality parameters, 𝛿ᵢ. Defaults to ``None``, central variables.
+    log : bool, optional
+        ``True`` to return the logarithm of the survival function. Defaults to
+        ``False``.
+
+    Returns
+    -------
+    float, ndarray
+        Approximated survival function applied to 𝑡, or its logarithm.
+
+    Example
+    -------
+
+    .. doctest::
+
+        >>> from chiscore import saddlepoint_sf
+        >>>
+        >>> saddlepoint_sf(2000.0, [0.5, 0.4, 0.1], log=True)  # doctest: +FLOAT_CMP
+        -2003.3135857020825
+
+    References
+    ----------
+    [1] Lugannani, R., & Rice, S. (1980). Saddle point approximation for the
+        distribution of the sum of independent random variables. Advances in applied
+        probability, 12(2), 475-490.
+    [2] Kuonen, D. (1999). Saddlepoint approximations for distributions of quadratic
+        forms in normal variables. Biometrika, 86(4), 929-935.
+    """
+    t = asarray(t, float)
+    logsf = _saddlepoint_logsf(t.ravel(), lambs, dofs, deltas)[0].reshape(t.shape)
+    if log:
+        return logsf[()]
+    return exp(logsf)[()]
+
+
+def _saddlepoint_logsf(t, lambs, dofs=None, deltas=None):
+    # Logarithm of the Lugannani–Rice approximation at every point of the vector t,
+    # and whether the saddlepoint equation was solved there.
+    from scipy.special import erfcx, ndtr
+
+    start = _start()
+    lambs = asarray(lambs, float)
+    dofs = ones_like(lambs) if dofs is None else asarray(dofs, float)
+    deltas = zeros(len(lambs)) if deltas is None else asarray(deltas, float)
+
+    logsf = zeros(len(t))
+    ok = t > 0
+    s, converged = _saddlepoint(t[ok], lambs, dofs, deltas)
+    k0, _, k2 = _cgf(s, lambs, dofs, deltas)
+
+    with errstate(divide="ignore", invalid="ignore", over="ignore"):
+        w = sign(s) * sqrt(2 * abs(s * t[ok] - k0))
+        v = s * sqrt(k2)
+        upper = -(w ** 2) / 2 - log(2 * pi) / 2
+        upper += log(sqrt(pi / 2) * erfcx(w / sqrt(2)) + 1 / v - 1 / w)
+        lower = log(ndtr(-w) + exp(-(w ** 2) / 2) / sqrt(2 * pi) * (1 / v - 1 / w))
+        re = where(w > 0, upper, lower)
+
+    # At the mean both 1/𝑣 and 1/𝑤 diverge; their difference tends to -𝜅₃/(6𝜅₂^³ᐟ²).
+    c2 = 2 * sum(lambs ** 2 * (dofs + 2 * deltas))
+    c3 = 8 * sum(lambs ** 3 * (dofs + 3 * deltas))
+    near = abs(s) * sqrt(c2) < 1e-5
+    re[near] = log(1 / 2 - c3 / (6 * sqrt(2 * pi) * c2 ** 1.5))
+
+    logsf[ok] = re
+    status = full(len(t), True)
+    status[ok] = converged & isfinite(re) & (re <= 0)
+    _stop("saddlepoint", start, len(t))
+    return logsf, status
+
+
+class _SaddlepointCDF(object):
+    # Distribution function with the interface of _DaviesCDF. The error code is 1
+    # where the saddlepoint equation could not be solved.
+
+    def __init__(self, lambda_, dofs=None):
+        self._lambda = lambda_
+        self._dofs = dofs
+
+    def __call__(self, Q):
+        Q = atleast_1d(asarray(Q, float))
+        logsf, converged = _saddlepoint_logsf(Q, self._lambda, self._dofs)
+        return -expm1(logsf), where(converged, 0, 1)
+
+
+def _chernoff_cdf(t, lambs):
+    # Chernoff's bound on Pr(𝑋 ≤ 𝑡) for 𝑋 = ∑λᵢχ²(1), exp(𝐾(𝑠) - 𝑠𝑡) for any 𝑠 ≤ 0,
+    # taken at the saddlepoint, which minimizes it below the mean. Pr(𝑋 ≤ 𝑡) is 0
+    # for 𝑡 ≤ 0, and bounded by 1 from the mean up.
+    t = asarray(t, float)
+    lambs = asarray(lambs, float)
+    dofs = ones_like(lambs)
+    deltas = zeros(len(lambs))
+    bound = where(t > 0, 1.0, 0.0)
+    idx = flatnonzero((t > 0) & (t < sum(lambs)))
+    s = minimum(_saddlepoint(t[idx], lambs, dofs, deltas)[0], 0.0)
+    k0 = _cgf(s, lambs, dofs, deltas)[0]
+    bound[idx] = exp(minimum(k0 - s * t[idx], 0.0))
+    return bound
+
+
+def _cgf(s, lambs, dofs, deltas):
+    # Cumulant generating function and its first two derivatives.
+    x = 2 * lambs * s[:, None]
+    k0 = sum(-dofs / 2 * log1p(-x) + deltas * x / (2 * (1 - x)), -1)
+    return (k0,) + _derivatives(s, lambs, dofs, deltas)
+
+
+def _derivatives(s, lambs, dofs, deltas):
+    # First two derivatives of the cumulant generating function, in terms of
+    # 𝑎ᵢ = λᵢ/(1 - 2λᵢ𝑠): 𝐾′ = ∑ hᵢ𝑎ᵢ + 𝛿ᵢ𝑎ᵢ²/λᵢ and 𝐾″ = ∑ 2hᵢ𝑎ᵢ² + 4𝛿ᵢ𝑎ᵢ³/λᵢ.
+    a = lambs / (1 - 2 * lambs * s[:, None])
+    a2 = a * a
+    k1 = a @ dofs
+    k2 = 2 * (a2 @ dofs)
+    if deltas.any():
+        with errstate(divide="ignore", invalid="ignore"):
+            d = where(lambs != 0, deltas / lambs, 0.0)
+        k1 += a2 @ d
+        k2 += 4 * ((a2 * a) @ d)
+    return k1, k2
+
+
+def _saddlepoint(t, lambs, dofs, deltas, maxiter=200):
+    # Newton's method on 𝐾′(𝑠) = 𝑡, safeguarded by bisection. 𝐾′ increases from 0 to
+    # infinity over (-∞, 1/(2λₘₐₓ)). Only the points not yet converged are iterated.
+    # 𝐾′(0) is the mean: the points above it are bracketed by [0, 1/(2λₘₐₓ)).
+    mean = sum(lambs * (dofs + deltas))
+    var = 2 * sum(lambs ** 2 * (dofs + 2 * deltas))
+    hi = full(len(t), 1 / (2 * lambs.max()))
+    lo = where(t > mean, 0.0, -1 / (2 * lambs.max()))
+    idx = flatnonzero(t <= mean)
+    while len(idx) > 0:
+        idx = idx[_derivatives(lo[idx], lambs, dofs, deltas)[0] > t[idx]]
+        lo[idx] *= 4
+
+    # The iterations start from the saddlepoint of the scaled chi-squared variable
+    # of the same mean and variance, 𝑎χ²(ℎ) with 𝑎 = var/(2⋅mean).
+    s = (1 - mean / t) / (var / mean)
+    s = where((s > lo) & (s < hi), s, (lo + hi) / 2)
+    converged = zeros(len(t), bool)
+    idx = arange(len(t))
+    # Near the mean, the approximation depends on 𝑠 relative to its own size:
+    # 𝐾′(𝑠) - 𝑡 is resolved relative to 𝑡 - mean, down to its rounding errors, and
+    # to those of 𝑠, which 𝐾″ amplifies next to the pole.
+    eps = finfo(float).eps
+    tol = 1e-12 * abs(t - mean) + 4 * eps * t
+    for _ in range(maxiter):
+        k1, k2 = _derivatives(s[idx], lambs, dofs, deltas)
+        f = k1 - t[idx]
+        done = abs(f) <= tol[idx] + 4 * eps * abs(s[idx]) * k2
+        converged[idx[done]] = True
+        idx, f, k2 = idx[~done], f[~done], k2[~done]
+        if len(idx) == 0:
+            break
+        si = s[idx]
+        hi[idx] = where(f > 0, si, hi[idx])
+        lo[idx] = where(f > 0, lo[idx], si)
+        with errstate(divide="ignore", invalid="ignore"):
+            step = si - f / k2
+        inside = (step > lo[idx]) & (step < hi[idx]) & isfinite(step)
+        s[idx] = where(inside, step, (lo[idx] + hi[idx]) / 2)
+
+    return s, converged
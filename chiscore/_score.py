@@ -0,0 +1,226 @@
+from numpy import (
+    asarray,
+    atleast_1d,
+    errstate,
+    minimum,
+    sqrt,
+    stack,
+    sum,
+    where,
+    zeros,
+)
+from numpy.linalg import eigvalsh
+
+from . import _cache
+from ._davies import _as_float, _crossprod, _lambda
+from ._optimal import optimal_davies_pvalue
+
+# Grid of [1]: 𝜌 = 0, 0.1², 0.2², 0.3², 0.4², 0.5², 0.5 and 1.
+_GRID = (0.0, 0.01, 0.04, 0.09, 0.16, 0.25, 0.5, 1.0)
+# 𝚁(1) is singular, and the integrand divides by 1 - 𝜌: [1] uses 0.999 instead.
+_RHO_MAX = 0.999
+# Relative size below which a variance is taken for rounding errors.
+_EPS = 1e-10
+# Keys of the positional arguments of optimal_davies_pvalue.
+_PARAMS = ["qmin", "MuQ", "VarQ", "KerQ", "eigh", "vareta", "Df", "tau_rho", "rho_list"]
+
+
+def optimal_score_pvalue(
+    score,
+    cov,
+    grid=None,
+    factor=False,
+    backend="chi2comb",
+    integrator="quad",
+    table=False,
+    method="davies",
+    threshold=1e-3,
+    return_info=False,
+    rtol=None,
+):
+    r"""SKAT-O p-value of a score vector [1].
+
+    For each 𝜌 of the grid, the statistic
+
+        𝑄(𝜌) = (1 - 𝜌)⋅∑ⱼ𝑢ⱼ² + 𝜌⋅(∑ⱼ𝑢ⱼ)² = 𝐮ᵀ𝚁(𝜌)𝐮,    𝚁(𝜌) = (1 - 𝜌)𝙸 + 𝜌𝟏𝟏ᵀ,
+
+    follows a mixture of chi-squared variables weighted by the eigenvalues of
+    𝚁(𝜌)^½𝙺𝚁(𝜌)^½ when 𝐮 ~ 𝓝(𝟎, 𝙺). The smallest of their p-values, approximated
+    by Liu's method, is the test statistic. The parameters of its null distribution
+    are derived from 𝙺, and its p-value is integrated by
+    :func:`optimal_davies_pvalue`.
+
+    The spectra of the whole grid are computed as one stack of 𝑝×𝑝 matrices, and
+    the statistics and their p-values as vectors over the grid. Where 𝙺 has rank one,
+    as for a single variant or identical ones, all the statistics are multiples of
+    one chi-squared variable, and their common p-value is returned, as the 𝜌 = 0
+    test of [1]. A covariance under which ∑ⱼ𝑢ⱼ has no variance raises a
+    :class:`ValueError`.
+
+    Parameters
+    ----------
+    score : array_like
+        Score vector 𝐮 of 𝑝 variants.
+    cov : array_like
+        Covariance 𝙺 of the scores under the null hypothesis, of size 𝑝×𝑝.
+    grid : array_like, optional
+        Values of 𝜌, in [0, 1]. Those above 0.999 are replaced by 0.999, as in [1].
+        Defaults to ``None``, the grid 0, 0.1², 0.2², 0.3², 0.4², 0.5², 0.5, 1 of [1].
+    factor : bool, optional
+        ``True`` if ``cov`` is a factor 𝙶 of the covariance, 𝙺 = 𝙶ᵀ𝙶, of 𝑝 columns,
+        such as the weighted genotypes with the covariates projected out. It is read
+        in blocks of rows, and can be a memory map. Defaults to ``False``.
+    backend, integrator, table, method, threshold, rtol
+        Options of :func:`optimal_davies_pvalue`.
+    return_info : bool, optional
+        ``True`` to also return the statistics and the parameters of the integral.
+        Defaults to ``False``.
+
+    Returns
+    -------
+    float
+        Estimated p-value.
+    dict
+        Returned only if ``return_info=True``. ``tier`` is the method that produced
+        the p-value, as for :func:`optimal_davies_pvalue`; ``Q`` and ``pvalues`` are
+        𝑄(𝜌) and their Liu p-values over the grid; ``params`` holds the arguments of
+        :func:`optimal_davies_pvalue` under the keys of ``chiscore/_data/bound.npz``:
+        ``qmin``, ``MuQ``, ``VarQ``, ``KerQ``, ``eigh``, ``vareta``, ``Df``,
+        ``tau_rho``, ``rho_list`` and ``T``, the smallest p-value.
+
+    Example
+    -------
+
+    .. doctest::
+
+        >>> from numpy import random
+        >>> from chiscore import optimal_score_pvalue
+        >>>
+        >>> random.seed(0)
+        >>> G = random.randn(100, 5)
+        >>> score = G.T @ random.randn(100)
+        >>> pvalue = optimal_score_pvalue(score, G, factor=True)
+
+    References
+    ----------
+    [1] Lee, Seunggeun, Michael C. Wu, and Xihong Lin. "Optimal tests for rare variant
+        effects in sequencing association studies." Biostatistics 13.4 (2012): 762-775.
+    """
+    score = asarray(score, float).ravel()
+    cov = _as_float(cov)
+    K = _crossprod(cov) if factor else asarray(cov, float)
+    if K.shape != (len(score), len(score)):
+        raise ValueError(
+            "The covariance has shape {}, but there are {} scores.".format(
+                K.shape, len(score)
+            )
+        )
+    grid = atleast_1d(_GRID if grid is None else grid)
+    grid = minimum(asarray(grid, float), _RHO_MAX)
+
+    Q, pvalues, params = _optimal_params(score, K, grid)
+    if len(params["eigh"]) == 0:
+        # All the statistics are multiples of one chi-squared variable, whose
+        # p-value Liu's method gives exactly.
+        pvalue, info = float(params["T"]), dict(tier="liu")
+    else:
+        args = [params[k] for k in _PARAMS]
+        pvalue, info = optimal_davies_pvalue(
+            *args,
+            pmin=params["T"],
+            backend=backend,
+            integrator=integrator,
+            table=table,
+            method=method,
+            threshold=threshold,
+            return_info=True,
+            rtol=rtol,
+        )
+    if return_info:
+        info.update(Q=Q, pvalues=pvalues, params=params)
+        return pvalue, info
+    return pvalue
+
+
+def _optimal_params(score, K, grid):
+    from scipy.special import chdtrc, chdtri
+
+    null = _cache._cached("score", lambda: _null_params(K, grid), K, grid)
+    c1, eigh, t = null["c1"], null["eigh"], float(null["t"])
+    Q = (1 - grid) * sum(score ** 2) + grid * sum(score) ** 2
+    muQ = c1[:, 0]
+    sigmaQ = sqrt(2 * c1[:, 1])
+    df = _liu_df(c1)
+    pvalues = chdtrc(df, (Q - muQ) / sigmaQ * sqrt(2 * df) + df)
+    pmin = pvalues.min()
+    qmin = (chdtri(df, pmin) - df) / sqrt(2 * df) * sigmaQ + muQ
+
+    vareta = float(null["vareta"])
+    MuQ = sum(eigh)
+    VarQ = 2 * sum(eigh ** 2) + vareta
+    with errstate(invalid="ignore"):
+        KerQ = sum(eigh ** 4) / sum(eigh ** 2) ** 2 * 12
+    tau = grid * t + (1 - grid) * float(null["ss"]) / t
+
+    params = dict(
+        qmin=qmin,
+        MuQ=MuQ,
+        VarQ=VarQ,
+        KerQ=KerQ,
+        eigh=eigh,
+        vareta=vareta,
+        Df=12 / KerQ,
+        tau_rho=tau,
+        rho_list=grid,
+        T=pmin,
+    )
+    return Q, pvalues, params
+
+
+def _null_params(K, grid):
+    # Parameters depending on the covariance only: the power sums of the spectra
+    # over the grid, and the decomposition of [1].
+    p = K.shape[0]
+    s = K.sum(0)
+    t = s.sum()
+    if not t > _EPS * p * K.trace():
+        raise ValueError("The sum of the scores has no variance.")
+
+    # 𝚁(𝜌)^½ = 𝑎𝙸 + 𝑐𝟏𝟏ᵀ, so that 𝚁(𝜌)^½𝙺𝚁(𝜌)^½ = 𝑎²𝙺 + 𝑎𝑐(𝐬𝟏ᵀ + 𝟏𝐬ᵀ) + 𝑐²𝑡𝟏𝟏ᵀ
+    # with 𝐬 = 𝙺𝟏 and 𝑡 = 𝟏ᵀ𝙺𝟏.
+    a = sqrt(1 - grid)
+    c = (sqrt(1 - grid + p * grid) - a) / p
+    M = (a ** 2)[:, None, None] * K
+    M += (a * c)[:, None, None] * (s[:, None] + s[None, :])
+    M += (c ** 2 * t)[:, None, None]
+    lambs = _filter(eigvalsh(M))
+    c1 = stack([sum(lambs ** i, -1) for i in range(1, 5)], -1)
+
+    # Decomposition of 𝑄(𝜌) of [1]: the projection of 𝐮 on 𝟏, and the mixture of
+    # the rest, weighted by the spectrum of 𝚆 = 𝙺 - 𝐬𝐬ᵀ/𝑡. Their covariance adds
+    # 4⋅𝐬ᵀ𝚆𝐬/𝑡 to the variance.
+    W = K - s[:, None] * s[None, :] / t
+    if W.trace() <= _EPS * K.trace():
+        # 𝙺 = 𝐬𝐬ᵀ/𝑡 has rank one, as for a single variant or identical ones, and 𝑄(𝜌)
+        # has no mixture part: no eigenvalues are returned.
+        return dict(c1=c1, eigh=zeros(0), vareta=0.0, t=t, ss=s @ s)
+    vareta = 4 * (s @ W @ s) / t
+    eigh = _lambda(W, overwrite=True)
+    return dict(c1=c1, eigh=eigh, vareta=vareta, t=t, ss=s @ s)
+
+
+def _filter(lambs):
+    # Eigenvalues kept by _lambda, row by row, with the others set to zero.
+    keep = lambs >= 0
+    mean = sum(where(keep, lambs, 0), -1) / keep.sum(-1)
+    return where(lambs > mean[:, None] / 100000, lambs, 0.0)
+
+
+def _liu_df(c1):
+    # Degrees of freedom of _liu_params_mod_cumulants, for rows of cumulants.
+    s1 = c1[:, 2] / c1[:, 1] ** (3 / 2)
+    s2 = c1[:, 3] / c1[:, 1] ** 2
+    with errstate(invalid="ignore", divide="ignore"):
+        a = 1 / (s1 - sqrt(s1 ** 2 - s2))
+        d = s1 * a ** 3 - a ** 2
+    return where(s1 ** 2 > s2, a ** 2 - 2 * d, 1 / s2)
@@ -0,0 +1,101 @@
+from collections import deque
+
+from ._davies import davies_pvalue_batch
+from ._liu import liu_sf
+from ._optimal import optimal_davies_pvalue
+
+_METHODS = ["davies", "liu", "optimal"]
+
+
+def iter_pvalues(problems, method="davies", prefetch=None, workers=None, options=None):
+    """
+    P-values of a stream of independent problems, yielded in order.
+
+    Problems are read ahead from ``problems`` and computed by a pool of threads,
+    while the caller consumes the results and the upstream iterator produces the
+    next ones. At most ``prefetch`` problems are held at any time, so memory does
+    not grow with the length of the stream.
+
+    Parameters
+    ----------
+    problems : iterable
+        Problems, each a tuple of positional arguments. ``method="davies"`` expects
+        ``(q, w)`` pairs, as :func:`davies_pvalue_batch`. ``method="liu"`` expects
+        ``(t, lambs, dofs, deltas)``, as :func:`liu_sf`. ``method="optimal"``
+        expects the arguments of :func:`optimal_davies_pvalue`.
+    method : str, optional
+        ``"davies"``, ``"liu"`` or ``"optimal"``. Defaults to ``"davies"``.
+    prefetch : int, optional
+        Maximum number of problems read ahead of the one being yielded. Defaults to
+        ``None``, twice the number of workers.
+    workers : int, optional
+        Number of threads. Defaults to ``None``, a single thread, which still lets
+        the computation overlap with the production of the problems.
+    options : dict, optional
+        Keyword arguments passed to the function of ``method``, such as
+        ``{"method": "auto"}``. Defaults to ``None``.
+
+    Returns
+    -------
+    generator
+        P-values, one per problem: an array aligned with ``q`` for
+        ``method="davies"``, and the same output as :func:`liu_sf`'s first element or
+        :func:`optimal_davies_pvalue` for the other methods.
+
+    Example
+    -------
+
+    .. doctest::
+
+        >>> from numpy import diag
+        >>> from chiscore import iter_pvalues
+        >>>
+        >>> problems = ((q, diag([0.5, 0.4, 0.1])) for q in [1.0, 3.0])
+        >>> for pval in iter_pvalues(problems):
+        ...     print(pval)  # doctest: +FLOAT_CMP
+        [0.37175388]
+        [0.04093017]
+    """
+    if method not in _METHODS:
+        raise ValueError(
+            "Unrecognized method {}. Choose one of these: {}".format(method, _METHODS)
+        )
+    return _iter_pvalues(problems, method, prefetch, workers, options)
+
+
+def _iter_pvalues(problems, method, prefetch, workers, options):
+    from concurrent.futures import ThreadPoolExecutor
+
+    func = _function(method)
+    options = {} if options is None else dict(options)
+    workers = 1 if workers is None else workers
+    prefetch = 2 * workers if prefetch is None else max(prefetch, 1)
+
+    pending = deque()
+    problems = iter(problems)
+    executor = ThreadPoolExecutor(workers)
+    try:
+        while True:
+            for problem in problems:
+                pending.append(executor.submit(func, *problem, **options))
+                if len(pending) >= prefetch:
+                    break
+            if len(pending) == 0:
+                return
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def _function(method):
+    if method == "davies":
+        return davies_pvalue_batch
+    if method == "liu":
+        return _liu_pvalue
+    return optimal_davies_pvalue
+
+
+def _liu_pvalue(*args, **kwargs):
+    return liu_sf(*args, **kwargs)[0]
@@ -0,0 +1,117 @@
+import os
+
+from numpy import arange, load, random
+from numpy.testing import assert_, assert_allclose, assert_equal
+
+from chiscore import (
+    cache,
+    davies_pvalue_batch,
+    optimal_davies_pvalue,
+    optimal_davies_pvalue_many,
+    optimal_score_pvalue,
+    profile,
+)
+from chiscore._cache import Cache, _active, _hash
+from chiscore._data import data_file
+
+_KEYS = ["qmin", "MuQ", "VarQ", "KerQ", "eigh", "vareta", "Df", "tau_rho", "rho_list"]
+
+
+def test_cache_spectrum(tmp_path):
+    random.seed(0)
+    G = random.randn(50, 6)
+    q = [1.0, 20.0, 80.0]
+    expected = davies_pvalue_batch(q, G, factor=True, backend="numpy")
+
+    with cache(tmp_path) as store:
+        with profile() as stats:
+            pvals = davies_pvalue_batch(q, G, factor=True, backend="numpy")
+            cached = davies_pvalue_batch(q, G, factor=True, backend="numpy")
+            davies_pvalue_batch(q, G[:-1], factor=True, backend="numpy")
+    assert_equal(len(_active), 0)
+    assert_equal(store.path, os.fspath(tmp_path))
+    assert_allclose(pvals, expected)
+    assert_allclose(cached, expected)
+    assert_equal(stats.items["cache_miss"], 2)
+    assert_equal(stats.items["cache_hit"], 1)
+    assert_equal(len([f for f in os.listdir(tmp_path) if f.endswith(".npy")]), 2)
+
+    assert_equal(_hash([G, True]), _hash([G.astype(float), True]))
+    assert_(_hash([G, True]) != _hash([G, False]))
+    assert_(_hash([G, True]) != _hash([G.T, True]))
+    assert_equal(_hash([1.0, None]), _hash([arange(1.0, 2.0)[0], None]))
+
+
+def test_cache_optimal(tmp_path):
+    with data_file("bound.npz") as filepath:
+        data = dict(load(filepath))
+    args = [data[k] for k in _KEYS]
+    options = dict(backend="numpy", integrator="gk", table=True)
+    expected = optimal_davies_pvalue(*args, **options)
+
+    with cache(tmp_path):
+        with profile() as stats:
+            pval = optimal_davies_pvalue(*args, **options)
+            cached = optimal_davies_pvalue(*args, **options)
+    assert_allclose(pval, expected)
+    assert_allclose(cached, expected, rtol=1e-10)
+    assert_equal(stats.items["cache_hit"], 1)
+    assert_equal(stats.calls["upper_bound"], 1)
+    assert_equal(stats.calls["cdf_table"], 1)
+
+    params = [[a] * 2 for a in args]
+    with cache(tmp_path):
+        with profile() as stats:
+            pvals = optimal_davies_pvalue_many(*params, processes=2, **options)
+    assert_allclose(pvals, [expected] * 2, rtol=1e-10)
+    assert_equal(stats.items["cache_hit"], 2)
+
+
+def test_cache_score(tmp_path):
+    random.seed(1)
+    G = random.randn(100, 5)
+    score = G.T @ random.randn(100)
+    expected = optimal_score_pvalue(score, G, factor=True, backend="numpy")
+
+    with cache(tmp_path):
+        pval = optimal_score_pvalue(score, G, factor=True, backend="numpy")
+        with profile() as stats:
+            score = G.T @ random.randn(100)
+            optimal_score_pvalue(score, G, factor=True, backend="numpy")
+    assert_allclose(pval, expected)
+    assert_equal(stats.items["cache_hit"], 1)
+
+
+def test_cache_eviction(tmp_path):
+    store = Cache(tmp_path / "cache")
+    other = tmp_path / "cache" / "other.npy"
+    other.write_bytes(b"0" * 5000)
+
+    names = ["entry-{}".format(c * 64) for c in "abcd"]
+    for i, name in enumerate(names):
+        store.save(name, arange(100.0) + i)
+        os.utime(os.path.join(store.path, name + ".npy"), (i, i))
+    assert_equal(store.load(names[0]), arange(100.0))
+    assert_(store.load("entry-" + "e" * 64) is None)
+
+    # Files being written by other processes are left alone, unless stale.
+    writing = tmp_path / "cache" / ".entry-writing.tmp"
+    stale = tmp_path / "cache" / ".entry-stale.tmp"
+    writing.write_bytes(b"0" * 5000)
+    stale.write_bytes(b"0" * 5000)
+    os.utime(stale, (0, 0))
+
+    store.max_size = 2000
+    store.evict()
+    files = sorted(os.listdir(store.path))
+    assert_equal(
+        files, [writing.name, names[0] + ".npy", names[3] + ".npy", "other.npy"]
+    )
+    writing.unlink()
+
+    store.save(names[1], dict(a=arange(3.0), b=1.0))
+    assert_equal(store.load(names[1])["a"], arange(3.0))
+    assert_equal(store.load(names[1])["b"], 1.0)
+
+    store.clear()
+    assert_equal(os.listdir(store.path), ["other.npy"])
@@ -0,0 +1,118 @@
+import os
+import shutil
+
+import pytest
+from numpy import array, diag, linspace, load, loadtxt, save, savez
+from numpy.testing import assert_, assert_allclose, assert_equal
+
+from chiscore import davies_pvalue_batch, optimal_davies_pvalue
+from chiscore._cli import main
+from chiscore._data import data_file
+
+
+def _read(filepath):
+    return loadtxt(filepath, delimiter="\t", skiprows=1, dtype=str)
+
+
+def test_cli_davies(tmp_path):
+    w = diag([0.5, 0.4, 0.1])
+    q = linspace(0.5, 8.0, 11)
+    save(tmp_path / "q.npy", q)
+    save(tmp_path / "w.npy", w)
+    out = str(tmp_path / "out.tsv")
+
+    args = [str(tmp_path / "q.npy"), str(tmp_path / "w.npy"), "-o", out]
+    assert_equal(main(["davies"] + args + ["--chunk-size", "4"]), 0)
+    rows = _read(out)
+    assert_equal(rows[:, 0], [str(i) for i in range(11)])
+    assert_allclose(rows[:, 1].astype(float), davies_pvalue_batch(q, w), rtol=1e-5)
+    assert_equal(rows[:, 2], "davies")
+
+    # An interrupted run leaves complete chunks and, possibly, a partial line.
+    with open(out) as f:
+        lines = f.readlines()
+    with open(out, "w") as f:
+        f.writelines(lines[:5] + [lines[5][:3]])
+    assert_equal(main(["davies"] + args + ["--method", "auto"]), 0)
+    rows = _read(out)
+    assert_equal(rows[:, 0], [str(i) for i in range(11)])
+    assert_equal(rows[:4, 2], "davies")
+    assert_equal(rows[4:, 2][:3], "liu")
+
+
+def test_cli_optimal(tmp_path):
+    with data_file(["danilo_nan.npz", "bound.npz"]) as filepaths:
+        os.mkdir(tmp_path / "genes")
+        for fp in filepaths:
+            shutil.copy(fp, tmp_path / "genes")
+        data = [dict(load(fp)) for fp in filepaths]
+
+    keys = ["qmin", "MuQ", "VarQ", "KerQ", "eigh", "vareta", "Df", "tau_rho"]
+    keys += ["rho_list"]
+    expected = [optimal_davies_pvalue(*[d[k] for k in keys], d["T"]) for d in data]
+
+    out = str(tmp_path / "genes.tsv")
+    assert_equal(main(["optimal", str(tmp_path / "genes"), "-o", out]), 0)
+    rows = _read(out)
+    assert_equal(rows[:, 0], ["bound", "danilo_nan"])
+    assert_allclose(rows[:, 1].astype(float), expected[::-1])
+
+    os.mkdir(tmp_path / "stacked")
+    for k in keys + ["T"]:
+        save(tmp_path / "stacked" / (k + ".npy"), array([d[k] for d in data]))
+    out = str(tmp_path / "stacked.tsv")
+    args = ["optimal", str(tmp_path / "stacked"), "-o", out, "--workers", "1"]
+    assert_equal(main(args), 0)
+    assert_allclose(_read(out)[:, 1].astype(float), expected)
+
+    # Without T, there is no bound by pmin; with a small one, it binds.
+    expected = [optimal_davies_pvalue(*[d[k] for k in keys]) for d in data]
+    savez(tmp_path / "stacked.npz", **{k: array([d[k] for d in data]) for k in keys})
+    out = str(tmp_path / "npz.tsv")
+    assert_equal(main(["optimal", str(tmp_path / "stacked.npz"), "-o", out]), 0)
+    assert_allclose(_read(out)[:, 1].astype(float), expected)
+
+    stacked = {k: array([d[k] for d in data]) for k in keys}
+    savez(tmp_path / "pmin.npz", T=[1e-4, 1e-2], **stacked)
+    out = str(tmp_path / "pmin.tsv")
+    assert_equal(main(["optimal", str(tmp_path / "pmin.npz"), "-o", out]), 0)
+    assert_allclose(_read(out)[:, 1].astype(float), [8e-4, 8e-2])
+
+
+def test_cli_cache(tmp_path):
+    w = diag([0.5, 0.4, 0.1])
+    q = linspace(0.5, 8.0, 5)
+    save(tmp_path / "q.npy", q)
+    save(tmp_path / "w.npy", w)
+
+    args = ["davies", str(tmp_path / "q.npy"), str(tmp_path / "w.npy")]
+    args += ["--cache", str(tmp_path / "cache"), "--backend", "numpy"]
+    for name in ["a.tsv", "b.tsv"]:
+        assert_equal(main(args + ["-o", str(tmp_path / name)]), 0)
+    assert_equal(len(os.listdir(tmp_path / "cache")), 1)
+    a, b = _read(tmp_path / "a.tsv"), _read(tmp_path / "b.tsv")
+    assert_equal(a, b)
+    expected = davies_pvalue_batch(q, w, backend="numpy")
+    assert_allclose(a[:, 1].astype(float), expected, rtol=1e-5)
+
+
+def test_cli_arguments(tmp_path, capsys):
+    G = linspace(0.1, 1.0, 12).reshape(4, 3)
+    save(tmp_path / "q.npy", linspace(0.5, 8.0, 3))
+    save(tmp_path / "G.npy", G)
+    out = str(tmp_path / "out.tsv")
+    args = ["davies", str(tmp_path / "q.npy"), str(tmp_path / "G.npy"), "-o", out]
+
+    for option in [["--method", "dvies"], ["--backend", "scipy"]]:
+        with pytest.raises(SystemExit) as e:
+            main(args + option)
+        assert_equal(e.value.code, 2)
+        assert_("invalid choice" in capsys.readouterr().err)
+    with pytest.raises(SystemExit):
+        main(["optimal", str(tmp_path), "-o", out, "--integrator", "simpson"])
+
+    assert_equal(main(args + ["--factor", "--backend", "numpy"]), 0)
+    expected = davies_pvalue_batch(
+        linspace(0.5, 8.0, 3), G, factor=True, backend="numpy"
+    )
+    assert_allclose(_read(out)[:, 1].astype(float), expected, rtol=1e-5)
@@ -1,8 +1,13 @@
-from numpy import load
-from numpy.testing import assert_allclose
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from chiscore import davies_pvalue
+from numpy import array, diag, eye, finfo, float32, load, log, memmap, random
+from numpy.testing import assert_, assert_allclose, assert_equal
+from scipy.stats import chi2
+
+from chiscore import davies_pvalue, davies_pvalue_batch, profile
 from chiscore._data import data_file
+from chiscore._davies import _liu_pvalue_mod_lambda
 
 
 def test_davies_pvalue():
@@ -10,3 +15,145 @@ def test_davies_pvalue():
         data = load(filepath, allow_pickle=True)
 
     assert_allclose(davies_pvalue(*data["args"]), data["pval"])
+
+
+def test_davies_pvalue_batch():
+    w = diag([0.5, 0.4, 0.1])
+    q = [1.0, 1.5, 3.0, 6.0]
+
+    pvals, info = davies_pvalue_batch(q, w, return_info=True)
+    assert_allclose(pvals, [davies_pvalue(qi, w) for qi in q], rtol=1e-5)
+    assert_equal(info["is_converge"], [1, 1, 1, 1])
+    assert_equal(info["p_val_liu"].shape, (4,))
+
+
+def test_davies_pvalue_factor():
+    random.seed(0)
+    G = random.randn(50, 4)
+    q = [20.0, 100.0, 300.0]
+
+    pvals = davies_pvalue_batch(q, G, factor=True)
+    assert_allclose(pvals, davies_pvalue_batch(q, G @ G.T), rtol=1e-5)
+    assert_allclose(davies_pvalue(q[1], G.T, factor=True), pvals[1], rtol=1e-5)
+
+
+def test_davies_pvalue_float32(tmp_path):
+    random.seed(0)
+    G = random.randn(20000, 8)
+    q = [2e4, 1e5, 3e5]
+    pvals = davies_pvalue_batch(q, G, factor=True)
+
+    G32 = memmap(tmp_path / "G.dat", float32, "w+", shape=G.shape)
+    G32[:] = G
+    G32.flush()
+    G32 = memmap(tmp_path / "G.dat", float32, "r", shape=G.shape)
+
+    tracemalloc.start()
+    try:
+        re = davies_pvalue_batch(q, G32, factor=True)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert_allclose(re, pvals, rtol=1e-4)
+    # Not even a float32 copy of the factor.
+    assert_(peak < G32.nbytes / 4)
+
+    K = (G.T @ G).astype(float32)
+    assert_allclose(davies_pvalue_batch(q, K), pvals, rtol=1e-4)
+    re = davies_pvalue_batch(q, K, k=4, tol=1e-12)
+    assert_allclose(re, davies_pvalue_batch(q, G.T @ G, k=4, tol=1e-12), rtol=1e-4)
+
+
+def test_davies_pvalue_numpy_backend():
+    with data_file("davies_pvalue.npz") as filepath:
+        data = load(filepath, allow_pickle=True)
+
+    assert_allclose(davies_pvalue(*data["args"], backend="numpy"), data["pval"])
+
+    w = diag([0.5, 0.4, 0.1])
+    q = [1.0, 1.5, 3.0, 6.0]
+    pvals = davies_pvalue_batch(q, w, backend="numpy")
+    assert_allclose(pvals, davies_pvalue_batch(q, w), atol=1e-6)
+
+
+def test_davies_pvalue_saddlepoint():
+    w = diag([0.5, 0.4, 0.1])
+    q = [1.0, 3.0, 2000.0]
+
+    pvals, info = davies_pvalue_batch(q, w, method="saddlepoint", return_info=True)
+    assert_allclose(pvals[:2], davies_pvalue_batch(q[:2], w), rtol=2e-2)
+    assert_equal(pvals[2], finfo(float).tiny)
+    assert_allclose(info["p_val_log"][2], -2003.3135857020825)
+    assert_equal(info["is_converge"], [1, 1, 1])
+
+    liu = _liu_pvalue_mod_lambda(array(q[:2]), array([0.5, 0.4, 0.1]), log_p=True)
+    assert_allclose(liu, log(info["p_val_liu"][:2]))
+    # Equal weights: 2⋅𝑋 follows χ²(2), whose log p-value is -𝑞 far below the
+    # smallest float.
+    liu = _liu_pvalue_mod_lambda(array([2.0, 1e4]), array([0.5, 0.5]), log_p=True)
+    assert_allclose(liu, [-2.0, -1e4])
+
+
+def test_davies_pvalue_auto():
+    w = diag([0.5, 0.4, 0.1])
+    q = [1.0, 3.0, 8.0]
+
+    with profile() as stats:
+        pvals, info = davies_pvalue_batch(q, w, method="auto", return_info=True)
+    assert_equal(info["tier"], ["liu", "liu", "davies"])
+    assert_allclose(pvals[:2], info["p_val_liu"][:2])
+    assert_allclose(pvals[2], davies_pvalue(q[2], w))
+    # Liu's p-values are far from the threshold, or below it.
+    assert_equal(stats.items.get("saddlepoint", 0), 0)
+
+    with profile() as stats:
+        pvals, info = davies_pvalue_batch(
+            q, w, method="auto", threshold=0.1, return_info=True
+        )
+    assert_equal(info["tier"], ["liu", "davies", "davies"])
+    assert_equal(stats.items["saddlepoint"], 1)
+
+
+def test_davies_pvalue_workers():
+    random.seed(0)
+    G = random.randn(50, 4)
+    q = random.rand(9) * 300
+
+    pvals = davies_pvalue_batch(q, G, factor=True)
+    assert_allclose(davies_pvalue_batch(q, G, factor=True, workers=4), pvals)
+    with ThreadPoolExecutor(2) as executor:
+        assert_allclose(davies_pvalue_batch(q, G, factor=True, workers=executor), pvals)
+    with ProcessPoolExecutor(2) as executor:
+        assert_allclose(davies_pvalue_batch(q, G, factor=True, workers=executor), pvals)
+        re = davies_pvalue_batch(q, G, factor=True, backend="numpy", workers=executor)
+        assert_allclose(re, davies_pvalue_batch(q, G, factor=True, backend="numpy"))
+
+
+def test_davies_pvalue_rtol():
+    # Equal weights: 2⋅𝑋 follows χ²(4).
+    w = eye(4) / 2
+    q = array([0.5, 3.0, 10.0, 15.0, 20.0])
+    pvals = chi2(4).sf(2 * q)
+
+    for backend in ["chi2comb", "numpy"]:
+        with profile() as stats:
+            re = davies_pvalue_batch(q, w, backend=backend, rtol=1e-3)
+        assert_allclose(re, pvals, rtol=1e-3)
+        assert_equal(stats.items["davies_cdf"], len(q))
+
+    re = davies_pvalue_batch(q, w, workers=2, method="auto", rtol=1e-3)
+    assert_allclose(re, pvals, rtol=1e-3)
+    assert_allclose(davies_pvalue(20.0, w, rtol=1e-6), pvals[-1], rtol=1e-5)
+
+    # Unequal weights need Davies' auxiliary integration, whose number of terms
+    # grows as the tolerance tightens.
+    w = diag([0.5, 0.4, 0.1])
+    pval = 1.1875506e-07
+    for backend in ["chi2comb", "numpy"]:
+        default = davies_pvalue_batch([15.0], w, backend=backend)[0]
+        re, info = davies_pvalue_batch(
+            [15.0], w, backend=backend, rtol=1e-3, return_info=True
+        )
+        assert_equal(info["is_converge"], [1])
+        assert_(abs(re[0] - pval) <= abs(default - pval))
+        assert_allclose(re, pval, rtol=1e-3)
@@ -0,0 +1,56 @@
+import subprocess
+import sys
+
+import pytest
+from numpy import load
+from numpy.testing import assert_equal
+
+from chiscore._data import data_file
+
+_HEAVY = [
+    "chi2comb",
+    "scipy.integrate",
+    "scipy.interpolate",
+    "scipy.sparse",
+    "scipy.special",
+    "scipy.stats",
+]
+# Bound of the import time of chiscore, in microseconds, numpy excluded.
+_IMPORT_TIME = 250000
+
+
+def test_import_is_light():
+    code = "import sys, chiscore; print(' '.join(sorted(sys.modules)))"
+    out = subprocess.run(
+        [sys.executable, "-c", code], stdout=subprocess.PIPE, check=True
+    )
+    modules = out.stdout.decode().split()
+    assert "chiscore" in modules
+    assert_equal([m for m in _HEAVY if m in modules], [])
+
+
+def test_import_time():
+    # Cumulative import times, in microseconds, reported by -X importtime.
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import chiscore"],
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    cumulative = {}
+    for line in out.stderr.decode().splitlines()[1:]:
+        fields = line.split("|")
+        cumulative[fields[2].strip()] = int(fields[1])
+    # Beyond numpy, which it needs, chiscore and its other imports take a fraction
+    # of what scipy.integrate or scipy.stats alone would.
+    assert cumulative["chiscore"] - cumulative.get("numpy", 0) < _IMPORT_TIME
+
+
+def test_data_file():
+    with data_file(["bound.npz", "inf.npz"]) as (bound, inf):
+        with load(bound) as data:
+            assert "qmin" in data.files
+        with load(inf) as data:
+            assert "qmin" in data.files
+
+    with pytest.raises(ValueError):
+        data_file("none.npz")
@@ -1,4 +1,4 @@
-from numpy.testing import assert_allclose
+from numpy.testing import assert_allclose, assert_equal
 
 from chiscore import liu_sf
 
@@ -50,3 +50,24 @@ def test_liu_sf_kurtosis():
     assert_allclose(info["mu_x"], 21.854229647821185)
     assert_allclose(info["sigma_x"], 8.016617956704831)
     assert_allclose(info["t_star"], -1.4766413632627227)
+
+
+def test_liu_sf_batch():
+    lambs = [[0.5, 0.4, 0.1], [0.35, 0.15, 0.0], [0.7, 0.3, 0.0]]
+    dofs = [[1, 2, 1], [1, 1, 1], [2, 1, 1]]
+    deltas = [[1, 0.6, 0.8], [6, 2, 0], [1.160032, 2, 0]]
+    t = [[2.0, 6.0], [3.5, 1.0], [0.2, 13.3]]
+
+    for kurtosis in [False, True]:
+        (q, dof_x, delta_x, info) = liu_sf(t, lambs, dofs, deltas, kurtosis)
+        assert_equal(q.shape, (3, 2))
+        for i in range(3):
+            r = liu_sf(t[i], lambs[i], dofs[i], deltas[i], kurtosis)
+            assert_allclose(q[i], r[0])
+            assert_allclose([dof_x[i], delta_x[i]], r[1:3])
+            assert_allclose(info["t_star"][i], r[3]["t_star"])
+
+        q = liu_sf([2.0, 3.5, 0.2], lambs, dofs, deltas, kurtosis)[0]
+        for i in range(3):
+            r = liu_sf(t[i][0], lambs[i], dofs[i], deltas[i], kurtosis)
+            assert_allclose(q[i], r[0])
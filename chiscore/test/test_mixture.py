@@ -0,0 +1,73 @@
+from numpy import array, diag, linspace, load, log, random, trace
+from numpy.testing import assert_allclose, assert_equal
+
+from chiscore import ChiSquaredMixture, davies_pvalue, davies_pvalue_batch
+from chiscore._data import data_file
+
+
+def test_mixture_sf():
+    w = diag([0.5, 0.4, 0.1])
+    q = [1.0, 1.5, 3.0, 6.0]
+
+    null = ChiSquaredMixture(w)
+    assert_allclose(null.weights, [0.1, 0.4, 0.5])
+    assert_allclose(null.sf(q), davies_pvalue_batch(q, w), rtol=1e-5)
+
+    pvals, info = null.davies_sf(q, return_info=True)
+    assert_allclose(pvals, null.sf(q), rtol=1e-5)
+    assert_equal(info["errno"], [0, 0, 0, 0])
+
+    assert_allclose(
+        null.liu_sf(q),
+        [0.3678794411714425, 0.2131957064298535, 0.04149514268378, 0.00157193606660],
+    )
+
+    assert_allclose(null.saddlepoint_sf(q), null.sf(q), rtol=3e-2)
+    assert_allclose(null.saddlepoint_sf(q, log=True), log(null.saddlepoint_sf(q)))
+
+    pvals, info = null.sf(q + [8.0], return_info=True, method="auto")
+    assert_equal(info["tier"], ["liu", "liu", "liu", "liu", "davies"])
+    assert_allclose(pvals, list(null.liu_sf(q)) + [null.sf(8.0)[0]])
+
+
+def test_mixture_davies_pvalue():
+    with data_file("davies_pvalue.npz") as filepath:
+        data = load(filepath, allow_pickle=True)
+
+    q, w = data["args"]
+    null = ChiSquaredMixture(w)
+    assert_allclose(null.sf(q), davies_pvalue(q, w), rtol=1e-5)
+    assert_allclose(null.liu_params["muQ"], null.weights.sum())
+
+
+def test_mixture_davies_sf_scale():
+    # As in davies_pvalue, Davies' method runs on the statistics divided by the
+    # largest one.
+    w = diag([0.5, 0.4, 0.1]) * 1e4
+    q = array([0.5, 3.0, 8.0]) * 1e4
+    for backend in ["chi2comb", "numpy"]:
+        null = ChiSquaredMixture(w, backend=backend)
+        pvals, info = null.davies_sf(q, return_info=True)
+        assert_equal(info["errno"], [0, 0, 0])
+        assert_equal(pvals, davies_pvalue_batch(q, w, backend=backend))
+        assert_equal(null.sf(q), pvals)
+        assert_equal(null.davies_sf(q[1]), davies_pvalue(q[1], w, backend=backend))
+
+
+def test_mixture_truncated():
+    random.seed(0)
+    G = random.randn(300, 60) * linspace(3, 0.1, 60)
+    K = G @ G.T
+    q = trace(K) * array([0.8, 1.0, 1.5, 2.0])
+
+    exact = ChiSquaredMixture(K)
+    null = ChiSquaredMixture(G, factor=True, k=20)
+    assert_equal(null.truncation["k"], 20)
+    assert_equal(len(null.weights), 21)
+    assert_allclose(sum(null.dofs * null.weights), trace(K))
+    assert_allclose(null.truncation["remainder_var"], 0.0992194400819)
+    assert_allclose(null.sf(q), exact.sf(q), rtol=0.02)
+
+    null = ChiSquaredMixture(K, k=4, tol=0.01)
+    assert null.truncation["remainder_var"] <= 0.01
+    assert_allclose(null.sf(q), exact.sf(q), rtol=1e-3)
@@ -0,0 +1,51 @@
+from numpy import load
+from numpy.testing import assert_, assert_allclose, assert_array_less, assert_equal
+from scipy.stats import chi2
+
+from chiscore import montecarlo_optimal_pvalue, montecarlo_sf
+from chiscore._data import data_file
+
+
+def test_montecarlo_sf():
+    q = [1.0, 5.0, 12.0]
+    pvals, info = montecarlo_sf(q, [1.0, 1.0, 1.0], seed=0, return_info=True)
+    assert_array_less(abs(pvals - chi2(3).sf(q)), 4 * info["stderr"])
+    assert_array_less(info["stderr"] / pvals, 1e-2)
+    assert_equal(info["converged"], [True, True, True])
+    assert_(info["samples"] < 10 ** 7)
+
+    pval = montecarlo_sf(4.0, [2.0], [2.0], rtol=2e-2, chunk_size=1000, seed=1)
+    assert_(isinstance(pval, float))
+    assert_allclose(pval, chi2(2).sf(2.0), rtol=0.1)
+
+    pvals, info = montecarlo_sf(q, [1.0, 1.0, 1.0], max_samples=1000, return_info=True)
+    assert_equal(info["samples"], 2 ** 16)
+    assert_equal(info["converged"], [True, True, False])
+
+
+def test_montecarlo_sf_processes():
+    args = ([2.0, 30.0], [0.5, 0.4, 0.1])
+    kwargs = dict(rtol=5e-2, chunk_size=2000, seed=3, return_info=True)
+    pvals, info = montecarlo_sf(*args, **kwargs)
+    assert_equal(montecarlo_sf(*args, **kwargs)[0], pvals)
+
+    pvals2, info2 = montecarlo_sf(*args, processes=2, **kwargs)
+    assert_equal(pvals2, pvals)
+    assert_equal(info2["samples"], info["samples"])
+
+
+def test_montecarlo_optimal_pvalue():
+    with data_file("bound.npz") as filepath:
+        data = dict(load(filepath))
+
+    keys = ["qmin", "MuQ", "VarQ", "KerQ", "eigh", "vareta", "Df", "tau_rho"]
+    args = [data[k] for k in keys + ["rho_list"]]
+    pval, info = montecarlo_optimal_pvalue(*args, seed=0, return_info=True)
+    assert_(isinstance(pval, float))
+    assert_(abs(pval - data["pvalue"]) < 4 * info["stderr"][0])
+
+    q = [data["qmin"], data["qmin"] * 2]
+    args[0] = q
+    pvals = montecarlo_optimal_pvalue(*args, rtol=5e-2, seed=0)
+    assert_equal(pvals.shape, (2,))
+    assert_(pvals[1] < pvals[0])
@@ -1,8 +1,22 @@
-from numpy import load
-from numpy.testing import assert_allclose
+from numpy import array, concatenate, diag, diff, isnan, linspace, load, sqrt, where
+from numpy.testing import assert_, assert_allclose, assert_equal
+from scipy.stats import chi2
 
-from chiscore import optimal_davies_pvalue
+from chiscore import (
+    optimal_davies_pvalue,
+    optimal_davies_pvalue_batch,
+    optimal_davies_pvalue_many,
+)
 from chiscore._data import data_file
+from chiscore._davies import _DaviesCDF
+from chiscore._optimal import (
+    _CachedCDF,
+    _CDFTable,
+    _find_upper_bound,
+    _skat_liu_cdf,
+    _skat_liu_pvalue,
+    _skat_liu_rows,
+)
 
 
 def test_optimal_davies_pvalue():
@@ -68,6 +82,291 @@ def test_optimal_davies_inf():
     assert_allclose(pval, 8e-30)
 
 
+def test_optimal_davies_pvalue_factor():
+    q = [1.5, 3.0]
+    G = diag(sqrt([10.0, 0.2, 0.1, 0.3]))
+    args = (-0.5, 1.0, 3.0)
+    tail = (0.5, 3.4, [5.1, 0.2], [0.0, 0.01])
+
+    pval = optimal_davies_pvalue(q, *args, G, *tail, factor=True)
+    assert_allclose(pval, optimal_davies_pvalue(q, *args, diag(G) ** 2, *tail))
+
+
+def test_optimal_davies_pvalue_numpy_backend():
+    with data_file("optimal_davies_pvalue.npz") as filepath:
+        data = load(filepath, allow_pickle=True)
+
+    pval = optimal_davies_pvalue(*data["args"], backend="numpy")
+    assert_allclose(pval, 0.9547608685218306)
+
+
+def test_optimal_davies_pvalue_gauss_kronrod():
+    with data_file("optimal_davies_pvalue.npz") as filepath:
+        data = load(filepath, allow_pickle=True)
+
+    pval = optimal_davies_pvalue(*data["args"], backend="numpy", integrator="gk")
+    assert_allclose(pval, 0.9547608685218306, rtol=1e-7)
+
+    with data_file("bound.npz") as filepath:
+        data = dict(load(filepath))
+
+    args = (
+        data["qmin"],
+        data["MuQ"],
+        data["VarQ"],
+        data["KerQ"],
+        data["eigh"],
+        data["vareta"],
+        data["Df"],
+        data["tau_rho"],
+        data["rho_list"],
+    )
+    # The change of variable lets the integral converge where quad falls back to
+    # Liu's approximation; the reference comes from a dense trapezoidal rule.
+    pval = optimal_davies_pvalue(*args, backend="numpy", integrator="gk")
+    assert_allclose(pval, 0.2180636654, rtol=1e-6)
+
+
+def test_optimal_davies_pvalue_many():
+    problems = []
+    for filename in ["danilo_nan.npz", "bound.npz"]:
+        with data_file(filename) as filepath:
+            data = dict(load(filepath))
+        problems.append(
+            [
+                data["qmin"],
+                data["MuQ"],
+                data["VarQ"],
+                data["KerQ"],
+                data["eigh"],
+                data["vareta"],
+                data["Df"],
+                data["tau_rho"],
+                data["rho_list"],
+            ]
+        )
+    # The grid of the last problem does not match its statistics.
+    problems.append(problems[0][:-1] + [problems[0][-1][:-1]])
+
+    pvals, info = optimal_davies_pvalue_many(
+        *zip(*problems), backend="numpy", integrator="gk", processes=2, return_info=True
+    )
+    for i in range(2):
+        pval = optimal_davies_pvalue(*problems[i], backend="numpy", integrator="gk")
+        assert_allclose(pvals[i], pval)
+    assert_equal(isnan(pvals), [False, False, True])
+    assert_equal(info["status"], ["davies", "davies", "error"])
+    assert_equal(info["message"][:2], [None, None])
+
+
+def test_optimal_davies_pvalue_table():
+    with data_file("optimal_davies_pvalue.npz") as filepath:
+        data = load(filepath, allow_pickle=True)
+
+    pval = optimal_davies_pvalue(*data["args"], table=True)
+    assert_allclose(pval, 0.9547608685218306, rtol=1e-7)
+
+    pval = optimal_davies_pvalue(*data["args"], backend="numpy", table=True)
+    assert_allclose(pval, 0.9547608685218306, rtol=1e-7)
+
+
+def test_cdf_table():
+    cdf = _DaviesCDF([2.0] * 5, backend="numpy")
+    table = _CDFTable(cdf, 0.0, 40.0, atol=1e-6)
+
+    q = linspace(0.0, 40.0, 1001)
+    assert_allclose(table(q)[0], chi2(5).cdf(q / 2), atol=1e-5)
+    assert_equal(table(q)[1], 0)
+    assert_(table.bound < 0.1)
+
+    # The bound holds between the nodes, where the table is furthest from them.
+    x = table.nodes[0]
+    q = concatenate([(x[:-1] + x[1:]) / 2, x[:-1] + diff(x) / 10])
+    assert_(abs(table(q)[0] - chi2(5).cdf(q / 2)).max() <= table.bound)
+
+
+def test_cdf_table_failed():
+    davies = _DaviesCDF([2.0] * 5, backend="numpy")
+
+    def cdf(Q):
+        re, errno = davies(Q)
+        return re, where(Q > 30.0, 1, errno)
+
+    q = linspace(0.0, 40.0, 1001)
+    re, errno = _CDFTable(cdf, 0.0, 40.0)(q)
+    assert_equal(errno[q < 29.0], 0)
+    assert_equal(errno[q > 31.0], 1)
+    assert_allclose(re[q < 29.0], chi2(5).cdf(q[q < 29.0] / 2), atol=1e-5)
+
+    # Out of nodes, the intervals left to refine are flagged, not the whole table.
+    table = _CDFTable(davies, 0.0, 40.0, maxsize=100)
+    errno = table(q)[1]
+    assert_(errno.any() and not errno.all())
+    assert_allclose(table(q)[0][errno == 0], chi2(5).cdf(q[errno == 0] / 2), atol=1e-5)
+
+
+def test_find_upper_bound():
+    with data_file("bound.npz") as filepath:
+        data = dict(load(filepath))
+
+    w = data["eigh"]
+    calls = []
+
+    def cdf(Q):
+        calls.append(len(Q))
+        return _DaviesCDF(w, atol=1e-5)(Q)
+
+    cdf = _CachedCDF(cdf)
+    args = (
+        data["qmin"],
+        float(data["MuQ"]),
+        float(data["VarQ"]),
+        float(data["KerQ"]),
+        sum(w) * 10 ** 4,
+        float(data["vareta"]),
+        float(data["Df"]),
+        data["tau_rho"],
+        data["rho_list"],
+        cdf,
+    )
+    assert_equal(_find_upper_bound(args, w), 2.5)
+    # Chernoff's bound rules out the larger candidates: the cdf is evaluated once.
+    assert_equal(calls, [1])
+
+    # The values found are remembered.
+    assert_equal(_find_upper_bound(args, w), 2.5)
+    assert_equal(calls, [1])
+
+
+def test_skat_liu_pvalue():
+    with data_file("bound.npz") as filepath:
+        data = dict(load(filepath))
+
+    args = (
+        data["qmin"],
+        data["MuQ"],
+        data["VarQ"],
+        data["KerQ"],
+        data["eigh"],
+        data["vareta"],
+        data["Df"],
+        data["tau_rho"],
+        data["rho_list"],
+    )
+    assert_allclose(_skat_liu_pvalue(*args), 0.22029543318607503)
+    # quad stops short of its tolerance on this integrand; the reference comes from
+    # a dense trapezoidal rule.
+    pval = _skat_liu_pvalue(*args, integrator="gk")
+    assert_allclose(pval, 0.220277766, rtol=1e-7)
+
+    x = linspace(0.0, 40.0, 101)
+    r = data["rho_list"]
+    consts = (data["qmin"], data["tau_rho"], 1 / (1 - r), 0.5, 1.0, 3.0)
+    expected = [_skat_liu_cdf(xi, *consts) for xi in x]
+    assert_allclose(_skat_liu_cdf(x, *consts), expected)
+
+
+def test_optimal_davies_pvalue_saddlepoint():
+    with data_file("optimal_davies_pvalue.npz") as filepath:
+        data = load(filepath, allow_pickle=True)
+
+    pval = optimal_davies_pvalue(*data["args"], method="saddlepoint")
+    assert_allclose(pval, 0.9547608685218306, rtol=1e-3)
+
+
+def test_optimal_davies_pvalue_auto():
+    with data_file("optimal_davies_pvalue.npz") as filepath:
+        data = load(filepath, allow_pickle=True)
+
+    pval, info = optimal_davies_pvalue(*data["args"], method="auto", return_info=True)
+    assert_equal(info["tier"], "liu")
+    assert_allclose(pval, 0.9547608685218306, rtol=1e-3)
+
+    pval, info = optimal_davies_pvalue(
+        *data["args"], method="auto", threshold=1.0, return_info=True
+    )
+    assert_equal(info["tier"], "davies")
+    assert_allclose(pval, 0.9547608685218306)
+
+
+def test_optimal_davies_pvalue_rtol():
+    with data_file("bound.npz") as filepath:
+        data = dict(load(filepath))
+
+    args = (
+        data["qmin"],
+        data["MuQ"],
+        data["VarQ"],
+        data["KerQ"],
+        data["eigh"],
+        data["vareta"],
+        data["Df"],
+        data["tau_rho"],
+        data["rho_list"],
+    )
+    # The default tolerances fall back to Liu's approximation on this problem.
+    pval, info = optimal_davies_pvalue(*args, rtol=1e-4, return_info=True)
+    assert_allclose(pval, 0.2180636654, rtol=1e-4)
+    assert_equal(info["tier"], "davies")
+
+    pval = optimal_davies_pvalue(*args, integrator="gk", rtol=1e-4)
+    assert_allclose(pval, 0.2180636654, rtol=1e-4)
+
+    # The integration fails at the tolerances of rtol=1e-6, but not at looser ones:
+    # the p-value is still Davies'.
+    pval, info = optimal_davies_pvalue(
+        *args, backend="numpy", rtol=1e-6, return_info=True
+    )
+    assert_allclose(pval, 0.2180636654, rtol=1e-6)
+    assert_equal(info["tier"], "davies")
+
+
+def test_optimal_davies_pvalue_batch():
+    with data_file("bound.npz") as filepath:
+        data = dict(load(filepath, allow_pickle=True))
+    keys = ["MuQ", "VarQ", "KerQ", "eigh", "vareta", "Df", "tau_rho", "rho_list"]
+    args = [data[k] for k in keys]
+    q = data["qmin"] * linspace(0.8, 2.0, 7)[:, None]
+
+    for method in ["davies", "saddlepoint"]:
+        pvals, info = optimal_davies_pvalue_batch(
+            q, *args, backend="numpy", method=method, return_info=True
+        )
+        expected = [
+            optimal_davies_pvalue(
+                qi, *args, backend="numpy", integrator="gk", table=True, method=method
+            )
+            for qi in q
+        ]
+        assert_allclose(pvals, expected, atol=1e-6)
+        assert_equal(info["tier"], [method] * len(q))
+
+    pvals = optimal_davies_pvalue_batch(q[:3], *args, pmin=[1.0, 1e-3, None])
+    assert_allclose(pvals[1], 1e-3 * len(args[-1]))
+    assert_allclose(pvals[[0, 2]], optimal_davies_pvalue_batch(q[[0, 2]], *args))
+
+    pvals, info = optimal_davies_pvalue_batch(
+        q, *args, backend="numpy", method="auto", threshold=0.1, return_info=True
+    )
+    liu = _skat_liu_rows(q, data["MuQ"], data["VarQ"], data["Df"], *args[-2:])
+    assert_equal(info["tier"] == "liu", liu >= 0.1)
+    assert_allclose(pvals[liu >= 0.1], liu[liu >= 0.1])
+
+
+def test_skat_liu_rows():
+    with data_file("bound.npz") as filepath:
+        data = dict(load(filepath, allow_pickle=True))
+    keys = ["MuQ", "VarQ", "KerQ", "eigh", "vareta", "Df", "tau_rho", "rho_list"]
+    args = [data[k] for k in keys]
+    q = data["qmin"] * array([[0.8], [2.0]])
+
+    # The kinks of the integrand, at the crossings of the lines whose minimum it
+    # takes, are breakpoints: the error of quad, without them, is about 2e-5.
+    pvals = _skat_liu_rows(q, data["MuQ"], data["VarQ"], data["Df"], *args[-2:])
+    assert_allclose(pvals, [0.48377568595641196, 0.025404612526410242], rtol=1e-10)
+    assert_allclose(pvals, [_skat_liu_pvalue(qi, *args) for qi in q], atol=1e-4)
+
+
 def main():
     q = [1.5, 3.0]
     mu = -0.5
@@ -0,0 +1,61 @@
+from numpy import load
+from numpy.testing import assert_, assert_allclose, assert_equal
+
+from chiscore import (
+    davies_pvalue_batch,
+    optimal_davies_pvalue,
+    optimal_davies_pvalue_many,
+    profile,
+)
+from chiscore._data import data_file
+from chiscore._profile import _active
+
+_KEYS = ["qmin", "MuQ", "VarQ", "KerQ", "eigh", "vareta", "Df", "tau_rho", "rho_list"]
+
+
+def test_profile_davies():
+    w = [[0.5, 0.1], [0.1, 0.4]]
+    q = [1.0, 3.0, 1e4]
+
+    with profile() as stats:
+        pvals = davies_pvalue_batch(q, w)
+        davies_pvalue_batch(q, w, method="saddlepoint")
+    assert_equal(len(_active), 0)
+    assert_allclose(pvals, davies_pvalue_batch(q, w))
+
+    assert_equal(stats.calls["davies_cdf"], 1)
+    assert_equal(stats.items["davies_cdf"], 3)
+    assert_equal(stats.items["saddlepoint"], 3)
+    assert_equal(stats.items["liu_fallback"], 1)
+    assert_("davies_cdf" in stats.seconds)
+    assert_("liu_fallback" not in stats.seconds)
+    assert_("davies_cdf" in repr(stats))
+
+    with profile() as outer:
+        with profile() as inner:
+            davies_pvalue_batch(q, w, workers=2)
+        davies_pvalue_batch(q, w)
+    assert_equal(inner.items["davies_cdf"], 3)
+    assert_equal(outer.items["davies_cdf"], 6)
+
+
+def test_profile_optimal():
+    with data_file("bound.npz") as filepath:
+        data = dict(load(filepath, allow_pickle=True))
+    args = [data[k] for k in _KEYS]
+
+    with profile() as stats:
+        pval = optimal_davies_pvalue(*args)
+    assert_allclose(pval, 0.22029543318607503)
+    assert_equal(stats.calls["optimal_fallback"], 1)
+    assert_equal(stats.calls["skat_liu"], 1)
+    assert_equal(stats.calls["integral"], 1)
+    assert_(stats.items["integral"] > 0)
+    assert_equal(stats.items["upper_bound"], 1)
+    assert_(stats.items["davies_cdf"] > stats.items["upper_bound"])
+
+    params = [[a] * 2 for a in args]
+    with profile() as many:
+        optimal_davies_pvalue_many(*params, processes=2)
+    assert_equal(many.calls["optimal_fallback"], 2)
+    assert_equal(many.items["integral"], 2 * stats.items["integral"])
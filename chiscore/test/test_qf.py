@@ -0,0 +1,37 @@
+from numpy import linspace, random
+from numpy.testing import assert_allclose, assert_equal
+from scipy.stats import chi2
+
+from chiscore._qf import qf
+
+
+def test_qf_chi2():
+    q = linspace(0.0, 30.0, 50)
+    cdf, errno = qf(q, [2.0] * 5, atol=1e-8)
+    assert_equal(errno, 0)
+    assert_allclose(cdf, chi2(5).cdf(q / 2.0), atol=1e-8)
+
+    cdf, errno = qf(q, [0.5, 0.5], dofs=[3, 1])
+    assert_equal(errno, 0)
+    assert_allclose(cdf, chi2(4).cdf(q / 0.5), atol=1e-6)
+
+
+def test_qf_batch():
+    random.seed(0)
+    lambs = random.rand(30) ** 3
+    q = linspace(0.0, 4 * lambs.sum(), 40)
+
+    cdf, errno = qf(q, lambs)
+    for i in range(len(q)):
+        r = qf(q[i], lambs)
+        assert_equal(errno[i], r[1][0])
+        assert_allclose(cdf[i], r[0][0], atol=1e-6)
+
+
+def test_qf_errno():
+    assert_equal(qf([1.0], [0.5, 0.4], dofs=[-1, 1])[1], [3])
+    cdf, errno = qf([0.0, 1.0, 2.0], [0.0, 0.0])
+    assert_equal(cdf, [0.0, 1.0, 1.0])
+    assert_equal(errno, [0, 0, 0])
+    cdf, errno = qf([1e-6, 1.0], [1.0], lim=10)
+    assert_equal(errno, [4, 4])
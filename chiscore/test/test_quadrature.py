@@ -0,0 +1,39 @@
+from numpy import arange, exp, inf, pi, sin, sqrt
+from numpy.testing import assert_, assert_allclose
+
+from chiscore._quadrature import gauss_kronrod, gauss_kronrod_many
+
+
+def test_gauss_kronrod():
+    value, abserr, info = gauss_kronrod(sin, 0, pi)
+    assert_allclose(value, 2.0, rtol=1e-12)
+    assert_(info["converged"])
+
+    value = gauss_kronrod(lambda x: exp(-(x ** 2)), 0, 10, points=[1.0, 2.0])[0]
+    assert_allclose(value, sqrt(pi) / 2, rtol=1e-12)
+
+    value, abserr, info = gauss_kronrod(lambda x: 1 / sqrt(x), 0, 1, epsabs=1e-8)
+    assert_allclose(value, 2.0, atol=1e-7)
+
+
+def test_gauss_kronrod_many():
+    k = arange(1.0, 5.0)
+
+    def f(x, i):
+        return exp(-k[i] * x ** 2)
+
+    value, abserr, info = gauss_kronrod_many(f, [0, 0, 0, 1], [10, 10, 10, 1])
+    assert_allclose(value, list(sqrt(pi / k[:3]) / 2) + [0], rtol=1e-12)
+    assert_(info["converged"].all())
+
+    points = [[0.5], [], [20.0], []]
+    value = gauss_kronrod_many(lambda x, i: 1 / sqrt(x), [0] * 4, [1] * 4, 1e-8, 30)
+    assert_(not value[2]["converged"].any())
+    value = gauss_kronrod_many(f, [0] * 4, [10] * 4, points=points)[0]
+    assert_allclose(value, sqrt(pi / k) / 2, rtol=1e-12)
+
+
+def test_gauss_kronrod_limit():
+    value, abserr, info = gauss_kronrod(lambda x: 1 / x, 0, 1, limit=30)
+    assert_(not info["converged"])
+    assert_(abserr > 0 or abserr == inf)
@@ -0,0 +1,22 @@
+from numpy import array, log
+from numpy.testing import assert_, assert_allclose
+from scipy.stats import chi2, ncx2
+
+from chiscore import saddlepoint_sf
+
+
+def test_saddlepoint_sf():
+    q = array([0.1, 1.0, 10.0, 50.0, 200.0, 2000.0])
+    assert_allclose(saddlepoint_sf(q, [2.0] * 5), chi2(5).sf(q / 2), rtol=3e-2)
+    assert_allclose(saddlepoint_sf(q, [1.0], [3], [2.0]), ncx2(3, 2.0).sf(q), rtol=3e-2)
+
+    logp = saddlepoint_sf(q, [2.0] * 5, log=True)
+    assert_allclose(logp, chi2(5).logsf(q / 2), rtol=2e-2)
+    assert_allclose(logp[-1], chi2(5).logsf(1000.0), rtol=1e-4)
+
+
+def test_saddlepoint_sf_extreme():
+    # Far below the smallest positive float, where only the log is finite.
+    logp = saddlepoint_sf(3000.0, [0.5, 0.4, 0.1], log=True)
+    assert_(logp < log(1e-300) * 2)
+    assert_allclose(saddlepoint_sf([0.0, -1.0], [0.5, 0.4, 0.1]), [1.0, 1.0])
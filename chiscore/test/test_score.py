@@ -0,0 +1,130 @@
+import pytest
+from numpy import array, eye, float32, random, sqrt
+from numpy.linalg import cholesky, eigvalsh
+from numpy.testing import assert_, assert_allclose, assert_equal
+from scipy.stats import chi2
+
+from chiscore import optimal_davies_pvalue, optimal_score_pvalue
+from chiscore._davies import _liu_params_mod_cumulants
+
+_GRID = [0.0, 0.01, 0.04, 0.09, 0.16, 0.25, 0.5, 0.999]
+
+
+def _skat_optimal_params(score, Z, grid):
+    # Loops of the SKAT R package over the grid, from the factor Z of the covariance.
+    p = Z.shape[1]
+    pvals, moments = [], []
+    for r in grid:
+        Z2 = Z @ cholesky((1 - r) * eye(p) + r)
+        lamb = _get_lambda(Z2.T @ Z2)
+        param = _liu_params_mod_cumulants([sum(lamb ** i) for i in range(1, 5)])
+        muQ, varQ, df = param["muQ"], param["sigmaQ"] ** 2, param["ll"]
+        Q = (1 - r) * sum(score ** 2) + r * sum(score) ** 2
+        pvals.append(chi2(df).sf((Q - muQ) / sqrt(varQ) * sqrt(2 * df) + df))
+        moments.append((muQ, varQ, df))
+
+    pmin = min(pvals)
+    qmin = [
+        (chi2(df).isf(pmin) - df) / sqrt(2 * df) * sqrt(varQ) + muQ
+        for muQ, varQ, df in moments
+    ]
+
+    z_mean = Z.mean(1)
+    cof1 = z_mean @ Z / sum(z_mean ** 2)
+    Z_item1 = z_mean[:, None] * cof1[None, :]
+    Z_item2 = Z - Z_item1
+    lamb = _get_lambda(Z_item2.T @ Z_item2)
+    vareta = ((Z_item1.T @ Z_item1) * (Z_item2.T @ Z_item2)).sum() * 4
+    KerQ = sum(lamb ** 4) / sum(lamb ** 2) ** 2 * 12
+    tau = [(p ** 2 * r + sum(cof1 ** 2) * (1 - r)) * sum(z_mean ** 2) for r in grid]
+    params = dict(
+        qmin=array(qmin),
+        MuQ=sum(lamb),
+        VarQ=sum(lamb ** 2) * 2 + vareta,
+        KerQ=KerQ,
+        eigh=lamb,
+        vareta=vareta,
+        Df=12 / KerQ,
+        tau_rho=array(tau),
+        rho_list=array(grid),
+        T=pmin,
+    )
+    return array(pvals), params
+
+
+def _get_lambda(K):
+    lamb = eigvalsh(K)
+    return lamb[lamb > lamb[lamb >= 0].mean() / 100000]
+
+
+def _problem(seed, n=200, p=12, effect=0.0):
+    random.seed(seed)
+    Z = random.randn(n, p) + random.randn(n, 1)
+    Z -= Z.mean(0)
+    y = random.randn(n) + effect * Z.sum(1)
+    return Z.T @ y, Z
+
+
+def test_optimal_score_pvalue():
+    for seed, effect in [(0, 0.0), (1, 0.01), (2, 0.02)]:
+        score, Z = _problem(seed, effect=effect)
+        pvals, params = _skat_optimal_params(score, Z, _GRID)
+
+        pvalue, info = optimal_score_pvalue(score, Z.T @ Z, return_info=True)
+        assert_allclose(info["pvalues"], pvals, rtol=1e-8)
+        assert_equal(sorted(info["params"]), sorted(params))
+        for key, value in params.items():
+            assert_allclose(info["params"][key], value, rtol=1e-8, err_msg=key)
+
+        keys = ["qmin", "MuQ", "VarQ", "KerQ", "eigh", "vareta", "Df", "tau_rho"]
+        args = [params[k] for k in keys + ["rho_list"]]
+        expected = optimal_davies_pvalue(*args, pmin=params["T"])
+        assert_allclose(pvalue, expected, rtol=1e-6)
+
+        re = optimal_score_pvalue(score.astype(float32), Z.astype(float32), factor=True)
+        assert_allclose(re, expected, rtol=1e-3)
+
+
+def test_optimal_score_pvalue_grid():
+    score, Z = _problem(3, effect=0.01)
+    pvals, params = _skat_optimal_params(score, Z, [0.0, 0.5, 0.999])
+
+    pvalue, info = optimal_score_pvalue(score, Z, [0, 0.5, 1], True, return_info=True)
+    assert_allclose(info["params"]["rho_list"], [0.0, 0.5, 0.999])
+    assert_allclose(info["pvalues"], pvals, rtol=1e-8)
+    assert_allclose(info["params"]["qmin"], params["qmin"], rtol=1e-8)
+    assert_equal(info["tier"], "davies")
+
+    with pytest.raises(ValueError):
+        optimal_score_pvalue(score[:-1], Z, factor=True)
+
+
+def test_optimal_score_pvalue_rank_one():
+    pvalue, info = optimal_score_pvalue([3.0], [[4.0]], return_info=True)
+    assert_allclose(pvalue, chi2(1).sf(9.0 / 4.0))
+    assert_allclose(info["pvalues"], chi2(1).sf(9.0 / 4.0))
+    assert_equal(info["tier"], "liu")
+
+    random.seed(4)
+    a = random.randn(100)
+    Z = array([a, a, a]).T
+    score = Z.T @ random.randn(100)
+    pvalue = optimal_score_pvalue(score, Z, factor=True)
+    assert_allclose(pvalue, chi2(1).sf(score[0] ** 2 / (a @ a)))
+
+    with pytest.raises(ValueError):
+        optimal_score_pvalue([1.0, -1.0], array([a, -a]).T, factor=True)
+
+
+def test_optimal_score_pvalue_collinear():
+    score, Z = _problem(5, p=6, effect=0.01)
+    Z[:, 1] = Z[:, 0]
+    score = Z.T @ random.randn(200)
+    pvals, params = _skat_optimal_params(score, Z, _GRID)
+
+    pvalue, info = optimal_score_pvalue(
+        score, Z, factor=True, backend="numpy", return_info=True
+    )
+    assert_allclose(info["pvalues"], pvals, rtol=1e-8)
+    assert_allclose(info["params"]["eigh"], params["eigh"], rtol=1e-8)
+    assert_(0 < pvalue <= 1)
@@ -0,0 +1,34 @@
+from numpy import diag, random
+from numpy.testing import assert_allclose, assert_equal
+
+from chiscore import davies_pvalue_batch, iter_pvalues, liu_sf
+
+
+def test_iter_pvalues():
+    random.seed(0)
+    w = diag([0.5, 0.4, 0.1])
+    q = random.rand(20) * 5
+    read = []
+
+    def problems():
+        for qi in q:
+            read.append(qi)
+            yield qi, w
+
+    pvals = []
+    for pval in iter_pvalues(problems(), prefetch=3, workers=2):
+        assert len(read) <= len(pvals) + 4
+        pvals.append(pval[0])
+    assert_allclose(pvals, davies_pvalue_batch(q, w))
+
+    options = {"method": "auto"}
+    pvals = list(iter_pvalues(((qi, w) for qi in q), options=options))
+    assert_allclose(pvals, [[p] for p in davies_pvalue_batch(q, w, method="auto")])
+
+
+def test_iter_pvalues_liu():
+    lambs = [0.5, 0.4, 0.1]
+    problems = [(t, lambs, [1, 2, 1], [1, 0.6, 0.8]) for t in [1.0, 2.0]]
+    pvals = list(iter_pvalues(problems, method="liu", workers=2))
+    assert_equal(len(pvals), 2)
+    assert_allclose(pvals[1], liu_sf(*problems[1])[0])